@@ -1,59 +1,561 @@
 """
 AI Module
-Implements the minimax algorithm for intelligent gameplay
+Implements the minimax algorithm with alpha-beta pruning for intelligent gameplay
+
+Small boards are searched to the end. Larger boards use a depth-limited
+search that scores the frontier with a line-count heuristic and only
+considers moves next to existing marks.
+
+With a time limit the search deepens iteratively: one pass per depth
+limit, each searching the previous pass's best move first, until the
+deadline. It always has a best move so far and returns within a few
+milliseconds of the deadline. Difficulty levels cap both depth and time.
 """
 
+import time
+import zlib
+
+from transposition_table import TranspositionTable, EXACT, LOWER, UPPER
+from search_stats import SearchStats, RootMoveStats
+
+# Score of a win found at depth 0; wins further away score one less per ply
+WIN_SCORE = 1000000
+# Scores beyond this threshold are wins/losses rather than heuristic values
+WIN_THRESHOLD = WIN_SCORE - 1000
+# Heuristic value of a line holding n marks of one player and none of the other
+LINE_WEIGHTS = (0,) + tuple(10 ** n for n in range(19))
+# Depth limit used when none is given, by number of cells (None = full search)
+DEFAULT_DEPTHS = ((9, None), (16, 6), (49, 4))
+DEFAULT_LARGE_DEPTH = 3
+# Bump when a change to the search alters the moves or scores it returns;
+# stored results such as the opening book are then rebuilt
+SEARCH_VERSION = 1
+# Difficulty level -> (max_depth, time_limit in seconds); None means no cap
+DIFFICULTY_LEVELS = {
+    'easy': (1, 0.1),
+    'medium': (2, 0.25),
+    'hard': (4, 0.5),
+    'expert': (None, 1.0),
+}
+# Nodes between clock checks while a deadline is set (a power of two)
+DEADLINE_CHECK_NODES = 256
+
+
+class SearchTimeout(Exception):
+    """Raised inside minimax to abandon a pass at the deadline"""
+
+
+class MoveAnalysis:
+    """
+    Evaluation of one move for the side to move
+    result is 'win', 'loss' or 'draw' when the search proved it, with plies
+    the number of moves until the game ends (counting this one), or None
+    for a heuristic score from a depth-limited search
+    """
+    __slots__ = ('move', 'score', 'result', 'plies')
+
+    def __init__(self, move, score, result, plies):
+        self.move = move
+        self.score = score
+        self.result = result
+        self.plies = plies
+
+    def __repr__(self):
+        return (f"MoveAnalysis(move={self.move}, score={self.score}, "
+                f"result={self.result!r}, plies={self.plies})")
+
+
+def search_fingerprint():
+    """Checksum of everything that determines search results at default depth"""
+    settings = (SEARCH_VERSION, WIN_SCORE, LINE_WEIGHTS, DEFAULT_DEPTHS, DEFAULT_LARGE_DEPTH)
+    return zlib.crc32(repr(settings).encode())
+
+
+def default_depth(game_board):
+    """Search depth used for a board when no max_depth is configured"""
+    cells = game_board.size * game_board.size
+    for max_cells, depth in DEFAULT_DEPTHS:
+        if cells <= max_cells:
+            return depth
+    return DEFAULT_LARGE_DEPTH
+
+
+def _lookup_score(value):
+    """Convert a lookup-table value to a search score
+    The table scores a win with the next move as WIN_VALUE and the search
+    as WIN_SCORE; both lose one point per extra ply"""
+    from lookup_table import WIN_VALUE
+    if value > 0:
+        return value + WIN_SCORE - WIN_VALUE
+    if value < 0:
+        return value - WIN_SCORE + WIN_VALUE
+    return 0
+
+
+def _to_table_score(score, depth):
+    """Make a depth-dependent win score relative to the node it was found at"""
+    if score > WIN_THRESHOLD:
+        return score + depth
+    if score < -WIN_THRESHOLD:
+        return score - depth
+    return score
+
+
+def _from_table_score(score, depth):
+    """Convert a node-relative table score back to the current depth"""
+    if score > WIN_THRESHOLD:
+        return score - depth
+    if score < -WIN_THRESHOLD:
+        return score + depth
+    return score
+
+
 class TicTacToeAI:
-    def __init__(self, player='O', opponent='X'):
+    # Engine name used in game records
+    name = 'minimax'
+
+    def __init__(self, player='O', opponent='X', max_depth=None,
+                 table_size=100000, table_policy='lru', use_lookup=True,
+                 use_book=True, root_hook=None, profile_path=None,
+                 time_limit=None, difficulty=None):
+        if difficulty is not None:
+            if difficulty not in DIFFICULTY_LEVELS:
+                raise ValueError(f"Unknown difficulty: {difficulty}")
+            max_depth, time_limit = DIFFICULTY_LEVELS[difficulty]
         self.player = player
         self.opponent = opponent
-        
+        self.max_depth = max_depth
+        self.difficulty = difficulty
+        # Seconds per move; None searches to the depth limit however long it takes
+        self.time_limit = time_limit
+        self.deadline = None
+        self.table = TranspositionTable(table_size, table_policy)
+        # Precomputed 3x3 perfect play; None if the file is missing or stale.
+        # Imported here so engines that never use it don't pay for it
+        self.lookup = None
+        if use_lookup:
+            import lookup_table
+            self.lookup = lookup_table.get_default_table()
+        # Opening books are loaded on the first probe for a board shape
+        self.use_book = use_book
+        self.killers = {}
+        self.history = {}
+        self.nodes_searched = 0
+        self.cutoffs = 0
+        self.terminal_nodes = 0
+        self.evaluations = 0
+        self.max_ply = 0
+        self.stop_requested = False
+        # Instrumentation: statistics of the last get_best_move call, an
+        # optional root_hook(move, score, seconds) called after each root
+        # move, and an optional file to write a cProfile dump of each search
+        self.last_stats = None
+        self.root_hook = root_hook
+        self.profile_path = profile_path
+        self.node_hook = None
+
+    def set_node_hook(self, hook):
+        """
+        Call hook(game_board, depth, is_maximizing) at every searched node
+        Pass None to remove it. The hook wraps minimax on this instance
+        only, so the search itself has no check for it when none is set.
+        """
+        self.node_hook = hook
+        if hook is None:
+            self.__dict__.pop('minimax', None)
+            return
+        search = type(self).minimax
+
+        def minimax(game_board, depth, is_maximizing,
+                    alpha=float('-inf'), beta=float('inf'), limit=None):
+            hook(game_board, depth, is_maximizing)
+            return search(self, game_board, depth, is_maximizing, alpha, beta, limit)
+
+        self.minimax = minimax
+
+    def trace_to(self, path):
+        """Write one line per searched node (depth, side, position key) to path;
+        returns the open file, which the caller closes after the search"""
+        trace = open(path, 'w')
+
+        def hook(game_board, depth, is_maximizing):
+            trace.write(f"{depth} {'max' if is_maximizing else 'min'} "
+                        f"{game_board.position_key():x}\n")
+
+        self.set_node_hook(hook)
+        return trace
+
+    def stop(self):
+        """Ask a search running on another thread to return early
+        The search returns its best move so far: at once under a time limit,
+        otherwise once it finishes the root move it is on"""
+        self.stop_requested = True
+
+    def choose_move(self, game_board, time_budget=None):
+        """Player interface (see players.py): search for at most time_budget
+        seconds, or time_limit if none is given"""
+        if time_budget is None:
+            return self.get_best_move(game_board)
+        time_limit = self.time_limit
+        self.time_limit = time_budget
+        try:
+            return self.get_best_move(game_board)
+        finally:
+            self.time_limit = time_limit
+
     def get_best_move(self, game_board):
-        """Find the best move using minimax algorithm"""
-        best_score = float('-inf')
+        """
+        Find the best move using alpha-beta search
+        The window is shared across root moves; among equally scored moves
+        the first one in row-major order is returned
+        Statistics for the call are left in last_stats
+        """
+        if self.profile_path is None:
+            return self.search(game_board)
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(self.search, game_board)
+        finally:
+            profiler.dump_stats(self.profile_path)
+
+    def search(self, game_board):
+        """Body of get_best_move, without the optional profiler"""
+        start = time.perf_counter()
+        stats = self.last_stats = SearchStats()
+        self.nodes_searched = 0
+        self.cutoffs = 0
+        self.terminal_nodes = 0
+        self.evaluations = 0
+        self.max_ply = 0
+        self.stop_requested = False
+        move = self.probe_tables(game_board, stats)
+        if move is not None:
+            stats.wall_time = time.perf_counter() - start
+            return move
+
+        self.killers = {}
+        self.history = {}
+        deadline = None if self.time_limit is None else start + self.time_limit
         best_move = None
-        
-        for row, col in game_board.get_empty_cells():
-            # Try this move
-            temp_board = game_board.copy()
-            temp_board.make_move(row, col, self.player)
-            
-            score = self.minimax(temp_board, 0, False)
-            
-            if score > best_score:
-                best_score = score
-                best_move = (row, col)
-                
+        hits, misses = self.table.hits, self.table.misses
+        root_hook = self.root_hook
+
+        # Search on a private copy with make/unmake, so no node allocates
+        board = game_board.copy()
+        moves = self.order_moves(board, self.candidate_moves(board), -1)
+        try:
+            for limit in self.iteration_limits(board, deadline is not None):
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                evaluations = self.evaluations
+                iteration_best = None
+                best_score = float('-inf')
+                scores = {}
+                stats.root_moves = []
+                try:
+                    for move in moves:
+                        if self.stop_requested and (iteration_best is not None or best_move is not None):
+                            break
+                        move_start = time.perf_counter()
+                        move_nodes = self.nodes_searched
+                        board.make_move(move[0], move[1], self.player)
+
+                        # Lower the bound by one for moves that precede the current
+                        # best in row-major order, so a tie is still resolved exactly
+                        if iteration_best is None:
+                            alpha = float('-inf')
+                        elif move < iteration_best:
+                            alpha = best_score - 1
+                        else:
+                            alpha = best_score
+                        score = self.minimax(board, 0, False, alpha, float('inf'), limit)
+                        board.pop()
+                        seconds = time.perf_counter() - move_start
+                        scores[move] = score
+                        stats.root_moves.append(
+                            RootMoveStats(move, score, seconds, self.nodes_searched - move_nodes))
+                        if root_hook is not None:
+                            root_hook(move, score, seconds)
+
+                        if score > best_score or (score == best_score and move < iteration_best):
+                            best_score = score
+                            iteration_best = move
+                except SearchTimeout:
+                    stats.timed_out = True
+                    # The copy is discarded, so the moves left on it don't matter
+
+                # The previous best is searched first, so even a cut-short pass
+                # only changes the move when another one beat it at this depth
+                if iteration_best is not None:
+                    best_move = iteration_best
+                    stats.best_score = best_score
+                if stats.timed_out or self.stop_requested:
+                    break
+                stats.iterations += 1
+                # No frontier position was evaluated: deeper passes would
+                # give the same scores
+                if self.evaluations == evaluations:
+                    break
+                moves = sorted(moves, key=lambda move: (move != best_move, -scores[move]))
+                # The first pass always completes, so there is a move to return
+                self.deadline = deadline
+        finally:
+            self.deadline = None
+
+        stats.nodes = self.nodes_searched
+        stats.terminal_nodes = self.terminal_nodes
+        stats.evaluations = self.evaluations
+        stats.max_depth = self.max_ply
+        stats.cutoffs = self.cutoffs
+        stats.cache_hits = self.table.hits - hits
+        stats.cache_misses = self.table.misses - misses
+        stats.best_move = best_move
+        stats.wall_time = time.perf_counter() - start
         return best_move
-        
-    def minimax(self, game_board, depth, is_maximizing):
+
+    def probe_tables(self, game_board, stats):
+        """The move from the precomputed table or an opening book, or None
+        if neither covers the position; hits are noted in stats"""
+        # Perfect play needs no search when the position is in the table
+        if self.lookup is not None and self.max_depth is None:
+            move = self.lookup.best_move(game_board, self.player)
+            if move is not None:
+                stats.lookup_hit = True
+                stats.best_move = move
+                _, value = self.lookup.probe(game_board.masks['X'], game_board.masks['O'])
+                stats.best_score = _lookup_score(value)
+                return move
+
+        # Early positions on larger boards may be in a prebuilt opening book
+        if self.use_book and self.max_depth is None:
+            import opening_book
+            book = opening_book.get_book(game_board.size, game_board.win_length)
+            move = None if book is None else book.best_move(game_board, self.player)
+            if move is not None:
+                stats.book_hit = True
+                stats.best_move = move
+                _, stats.best_score = book.probe(game_board.masks['X'], game_board.masks['O'])
+                return move
+        return None
+
+    def iteration_limits(self, game_board, timed):
+        """
+        Depth limits of the passes for one search
+        Untimed searches make a single pass at max_depth (or the default
+        depth for the board). Timed ones deepen one ply per pass, up to
+        max_depth if set and otherwise to the end of the game.
+        """
+        if not timed:
+            return [self.max_depth or default_depth(game_board)]
+        empty = game_board.geometry.cells - game_board.occupied.bit_count()
+        if self.max_depth is None or self.max_depth >= empty:
+            return list(range(1, empty)) + [None]
+        return list(range(1, self.max_depth + 1))
+
+    def score_moves(self, game_board):
+        """
+        Exact search score of every candidate move for this player
+        Returns [(move, score)] in search order. Each move gets a full
+        window, so this is slower than get_best_move, which only proves
+        which move is best.
+        """
+        self.killers = {}
+        self.history = {}
+        limit = self.max_depth or default_depth(game_board)
+        board = game_board.copy()
+        scores = []
+        for move in self.order_moves(board, self.candidate_moves(board), -1):
+            board.make_move(move[0], move[1], self.player)
+            scores.append((move, self.minimax(board, 0, False, float('-inf'), float('inf'), limit)))
+            board.pop()
+        return scores
+
+    def analyze(self, game_board):
         """
-        Minimax algorithm with depth consideration
-        Returns the best score for the current board state
+        Score every candidate move for the side to move, whichever side
+        this AI plays; returns [MoveAnalysis] in row-major order
+        Each move gets a full window, but they all share the transposition
+        table, so a subtree proven under one move is not searched again
+        under another. The table also outlives the call: after a move, most
+        of the new position's analysis is already in it. stop() from
+        another thread cuts the analysis short, and then None is returned.
         """
+        self.nodes_searched = 0
+        self.stop_requested = False
+        limit = self.max_depth or default_depth(game_board)
+        board = game_board.copy()
+        # Scores are kept from this AI's side, as in the table, and flipped
+        # when the opponent is to move
+        own_turn = board.current_player == self.player
+        symbol = self.player if own_turn else self.opponent
+        empty = board.geometry.cells - board.occupied.bit_count()
+        analysis = []
+        # No time limit, but the search still polls for stop()
+        self.deadline = float('inf')
+        try:
+            for move in self.order_moves(board, self.candidate_moves(board), -1):
+                board.make_move(move[0], move[1], symbol)
+                score = self.minimax(board, 0, not own_turn, float('-inf'), float('inf'), limit)
+                board.pop()
+                if not own_turn:
+                    score = -score
+                if score > WIN_THRESHOLD:
+                    result, plies = 'win', WIN_SCORE - score + 1
+                elif score < -WIN_THRESHOLD:
+                    result, plies = 'loss', WIN_SCORE + score + 1
+                elif limit is None:
+                    # With no win left for either side the board fills up
+                    result, plies = 'draw', empty
+                else:
+                    result, plies = None, None
+                analysis.append(MoveAnalysis(move, score, result, plies))
+        except SearchTimeout:
+            return None
+        finally:
+            self.deadline = None
+        return sorted(analysis, key=lambda entry: entry.move)
+
+    def get_best_moves(self, boards, size=3, win_length=None):
+        """
+        Best move for many boards at once
+        boards is an (N, size * size) array (0 empty, 1 X, 2 O); returns the
+        chosen cell index per board, -1 where there is no move. Needs NumPy.
+        """
+        import batch_eval
+        return batch_eval.best_moves(self, boards, size, win_length)
+
+    def candidate_moves(self, game_board):
+        """
+        Moves worth searching: every empty cell on small boards, otherwise
+        only empty cells next to an existing mark (the center if none)
+        """
+        geometry = game_board.geometry
+        if geometry.empty_cells is not None:
+            return game_board.get_empty_cells()
+        occupied = game_board.occupied
+        if not occupied:
+            center = game_board.size // 2
+            return [(center, center)]
+        frontier = geometry.neighborhood(occupied) & ~occupied
+        coords = geometry.coords
+        moves = []
+        while frontier:
+            low = frontier & -frontier
+            moves.append(coords[low.bit_length() - 1])
+            frontier ^= low
+        return moves
+
+    def order_moves(self, game_board, moves, depth):
+        """Order moves: killer move first, then cells on the most lines
+        (center, corners, edges on 3x3), with history scores breaking ties"""
+        killer = self.killers.get(depth)
+        history = self.history
+        size = game_board.size
+        line_counts = game_board.geometry.line_counts
+        return sorted(moves, key=lambda move: (
+            move != killer, -line_counts[move[0] * size + move[1]],
+            -history.get(move, 0)))
+
+    def evaluate(self, game_board):
+        """Heuristic score: open lines weighted by how many marks they hold"""
+        mine = game_board.masks[self.player]
+        theirs = game_board.masks[self.opponent]
+        score = 0
+        for line in game_board.geometry.lines:
+            if line & theirs:
+                if not line & mine:
+                    score -= LINE_WEIGHTS[(line & theirs).bit_count()]
+            elif line & mine:
+                score += LINE_WEIGHTS[(line & mine).bit_count()]
+        # Keep heuristic scores clear of the win/loss range
+        return max(-WIN_THRESHOLD + 1, min(WIN_THRESHOLD - 1, score))
+
+    def minimax(self, game_board, depth, is_maximizing,
+                alpha=float('-inf'), beta=float('inf'), limit=None):
+        """
+        Minimax algorithm with alpha-beta pruning and depth consideration
+        Returns the best score for the current board state, searching at
+        most limit plies below the root (None searches to the end)
+        """
+        self.nodes_searched += 1
+        if not self.nodes_searched & (DEADLINE_CHECK_NODES - 1) and self.deadline is not None:
+            if self.stop_requested or time.perf_counter() >= self.deadline:
+                raise SearchTimeout
+        if depth >= self.max_ply:
+            # Plies below the root, counting the root move itself
+            self.max_ply = depth + 1
+
         # Check terminal states
         if game_board.check_winner(self.player):
-            return 10 - depth
+            self.terminal_nodes += 1
+            return WIN_SCORE - depth
         if game_board.check_winner(self.opponent):
-            return depth - 10
+            self.terminal_nodes += 1
+            return depth - WIN_SCORE
         if game_board.is_full():
+            self.terminal_nodes += 1
             return 0
-            
+        if limit is not None and depth >= limit - 1:
+            self.evaluations += 1
+            return self.evaluate(game_board)
+
+        # Symmetric positions share an entry (large boards fall back to the
+        # Zobrist hash); win scores are stored relative to the node so they
+        # stay valid at any depth
+        draft = game_board.geometry.cells if limit is None else limit - 1 - depth
+        key = game_board.position_key() << 1 | is_maximizing
+        entry = self.table.get(key)
+        if entry is not None and entry[2] >= draft:
+            score, bound, _ = entry
+            score = _from_table_score(score, depth)
+            if bound == EXACT:
+                return score
+            if bound == LOWER:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score
+
+        original_alpha, original_beta = alpha, beta
+        moves = self.order_moves(game_board, self.candidate_moves(game_board), depth)
         if is_maximizing:
             # AI's turn - maximize score
             best_score = float('-inf')
-            for row, col in game_board.get_empty_cells():
-                temp_board = game_board.copy()
-                temp_board.make_move(row, col, self.player)
-                score = self.minimax(temp_board, depth + 1, False)
+            for move in moves:
+                game_board.make_move(move[0], move[1], self.player)
+                score = self.minimax(game_board, depth + 1, False, alpha, beta, limit)
+                game_board.pop()
                 best_score = max(score, best_score)
-            return best_score
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    self.record_cutoff(move, depth, draft)
+                    break
         else:
             # Opponent's turn - minimize score
             best_score = float('inf')
-            for row, col in game_board.get_empty_cells():
-                temp_board = game_board.copy()
-                temp_board.make_move(row, col, self.opponent)
-                score = self.minimax(temp_board, depth + 1, True)
+            for move in moves:
+                game_board.make_move(move[0], move[1], self.opponent)
+                score = self.minimax(game_board, depth + 1, True, alpha, beta, limit)
+                game_board.pop()
                 best_score = min(score, best_score)
-            return best_score
+                beta = min(beta, score)
+                if alpha >= beta:
+                    self.record_cutoff(move, depth, draft)
+                    break
+
+        if best_score <= original_alpha:
+            bound = UPPER
+        elif best_score >= original_beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.table.store(key, _to_table_score(best_score, depth), bound, draft)
+        return best_score
+
+    def record_cutoff(self, move, depth, draft):
+        """Remember a move that caused a beta cutoff"""
+        self.cutoffs += 1
+        self.killers[depth] = move
+        self.history[move] = self.history.get(move, 0) + draft * draft
@@ -0,0 +1,181 @@
+"""
+Batch Evaluation Module
+Vectorized evaluation of many boards at once with NumPy
+
+Boards are encoded as an (N, size * size) integer array in row-major cell
+order, with 0 = empty, 1 = X and 2 = O (the same digits as the base-3
+position index used by the lookup table). Winners are found with a single
+matrix product against a precomputed (cells, lines) line-membership
+matrix. Input is processed in fixed-size chunks, so working memory stays
+bounded however many boards are passed in; iter_evaluate() also bounds the
+output by yielding one chunk at a time.
+
+Requires NumPy.
+"""
+
+import numpy as np
+
+from game_logic import Geometry
+
+EMPTY = 0
+X = 1
+O = 2
+
+# Winner codes
+NO_WINNER = 0
+X_WINS = 1
+O_WINS = 2
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_line_matrices = {}
+
+
+def line_matrix(size, win_length):
+    """(cells, lines) float32 matrix with a 1 where a cell lies on a line"""
+    key = (size, win_length)
+    matrix = _line_matrices.get(key)
+    if matrix is None:
+        geometry = Geometry.get(size, win_length)
+        matrix = np.zeros((geometry.cells, len(geometry.lines)), dtype=np.float32)
+        for column, line in enumerate(geometry.lines):
+            for cell in range(geometry.cells):
+                if line >> cell & 1:
+                    matrix[cell, column] = 1
+        _line_matrices[key] = matrix
+    return matrix
+
+
+def _check_boards(boards, size):
+    boards = np.asarray(boards)
+    if boards.ndim != 2 or boards.shape[1] != size * size:
+        raise ValueError(f"Expected an (N, {size * size}) array, got shape {boards.shape}")
+    return boards
+
+
+class BatchResult:
+    """
+    Per-board results for a batch
+    winner: int8, NO_WINNER / X_WINS / O_WINS (X is checked first)
+    full, terminal: bool
+    legal: (N, cells) bool, True where a move may be played
+    """
+
+    def __init__(self, winner, full, terminal, legal):
+        self.winner = winner
+        self.full = full
+        self.terminal = terminal
+        self.legal = legal
+
+    def __len__(self):
+        return len(self.winner)
+
+    def legal_bits(self):
+        """Legal-move masks packed into one integer per board (bit i = cell i)"""
+        cells = self.legal.shape[1]
+        if cells > 64:
+            raise ValueError("Packed masks need at most 64 cells")
+        dtype = np.uint16 if cells <= 16 else np.uint32 if cells <= 32 else np.uint64
+        weights = (np.ones(cells, dtype=np.uint64) << np.arange(cells, dtype=np.uint64))
+        return (self.legal.astype(np.uint64) * weights).sum(axis=1).astype(dtype)
+
+
+def evaluate_chunk(boards, size=3, win_length=None):
+    """Evaluate one chunk of boards; returns a BatchResult"""
+    win_length = win_length or size
+    boards = _check_boards(boards, size)
+    lines = line_matrix(size, win_length)
+    x_win = ((boards == X).astype(np.float32) @ lines >= win_length).any(axis=1)
+    o_win = ((boards == O).astype(np.float32) @ lines >= win_length).any(axis=1)
+    winner = np.where(x_win, X_WINS, np.where(o_win, O_WINS, NO_WINNER)).astype(np.int8)
+    legal = boards == EMPTY
+    full = ~legal.any(axis=1)
+    terminal = full | (winner != NO_WINNER)
+    # No moves may be played once the game is over
+    legal &= ~terminal[:, None]
+    return BatchResult(winner, full, terminal, legal)
+
+
+def iter_evaluate(boards, size=3, win_length=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (start, BatchResult) per chunk, for streaming over huge inputs"""
+    boards = _check_boards(boards, size)
+    for start in range(0, len(boards), chunk_size):
+        yield start, evaluate_chunk(boards[start:start + chunk_size], size, win_length)
+
+
+def evaluate_boards(boards, size=3, win_length=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Evaluate all boards, chunk by chunk; returns one BatchResult"""
+    boards = _check_boards(boards, size)
+    count = len(boards)
+    cells = size * size
+    winner = np.empty(count, dtype=np.int8)
+    full = np.empty(count, dtype=bool)
+    terminal = np.empty(count, dtype=bool)
+    legal = np.empty((count, cells), dtype=bool)
+    for start, result in iter_evaluate(boards, size, win_length, chunk_size):
+        end = start + len(result)
+        winner[start:end] = result.winner
+        full[start:end] = result.full
+        terminal[start:end] = result.terminal
+        legal[start:end] = result.legal
+    return BatchResult(winner, full, terminal, legal)
+
+
+def encode_board(game_board):
+    """Encode a GameBoard as a 1-D int8 array"""
+    cells = game_board.geometry.cells
+    x_mask = game_board.masks['X']
+    o_mask = game_board.masks['O']
+    return np.array([X if x_mask >> i & 1 else O if o_mask >> i & 1 else EMPTY
+                     for i in range(cells)], dtype=np.int8)
+
+
+def position_indices(boards):
+    """Base-3 index of each board (small boards only)"""
+    cells = boards.shape[1]
+    if cells > 19:
+        raise ValueError("Base-3 indices need at most 19 cells")
+    powers = 3 ** np.arange(cells, dtype=np.int64)
+    return boards.astype(np.int64) @ powers
+
+
+def best_moves(ai, boards, size=3, win_length=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Best move cell index for ai.player on every board (-1 when there is none)
+    Each distinct position is searched only once per call; on 3x3 the
+    lookup table answers the AI's side-to-move positions without search
+    """
+    from game_logic import GameBoard
+
+    win_length = win_length or size
+    boards = _check_boards(boards, size)
+    cells = size * size
+    moves = np.full(len(boards), -1, dtype=np.int16)
+    solved = {}
+    for start in range(0, len(boards), chunk_size):
+        chunk = boards[start:start + chunk_size]
+        # Deduplicate on base-3 indices when they fit, else on whole rows
+        if cells <= 19:
+            keys = position_indices(chunk)
+            keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            unique = chunk[first]
+            keys = keys.tolist()
+        else:
+            unique, inverse = np.unique(chunk, axis=0, return_inverse=True)
+            keys = [row.tobytes() for row in unique]
+        results = evaluate_chunk(unique, size, win_length)
+        unique_moves = np.full(len(unique), -1, dtype=np.int16)
+        for row in np.flatnonzero(~results.terminal):
+            key = keys[row]
+            move = solved.get(key)
+            if move is None:
+                board = GameBoard(size, win_length)
+                for cell in np.flatnonzero(unique[row]).tolist():
+                    board.make_move(cell // size, cell % size,
+                                    'X' if unique[row, cell] == X else 'O')
+                board.current_player = ai.player
+                best = ai.get_best_move(board)
+                move = solved[key] = -1 if best is None else best[0] * size + best[1]
+            unique_moves[row] = move
+        moves[start:start + len(chunk)] = unique_moves[inverse.reshape(-1)]
+    return moves
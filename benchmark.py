@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+Times the board primitives and both AI code paths
+
+Benchmarks:
+- board.*            GameBoard primitives on a mid-game position
+- ai.search.*        TicTacToeAI alpha-beta search (copy-based, cold table)
+- ai.lookup.*        TicTacToeAI answering from the precomputed table
+- legacy.search.*    tictactoe.TicTacToe in-place (mutate-and-undo) search
+- startup.*          engine import and first move in a fresh interpreter
+- difficulty.*       p50/p99 move latency of each TicTacToeAI difficulty level
+- render.*           board canvas frames per second on large boards (needs a display)
+
+Search benchmarks run from every distinct opening: the empty board and the
+three canonical first moves (corner, edge, center). The legacy AI only
+plays O, so it skips the empty board. Difficulty latencies come from the
+same random mid-game positions on a 7x7 board (4 in a row), where the
+depth and time caps decide how long a move takes. Render benchmarks time
+a frame that redraws every cell (a reset) against one that redraws a
+single cell (a move); they are skipped when Tk cannot open a window.
+
+Results can be saved as JSON and compared against a saved baseline; the
+exit status is 1 if any benchmark slowed down by more than the threshold.
+
+Usage: python3 benchmark.py [--output FILE] [--baseline FILE] [--threshold 0.1]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from game_logic import GameBoard
+from ai_player import DIFFICULTY_LEVELS, TicTacToeAI
+
+# Run in a fresh interpreter; prints the import and first-move times in seconds
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+from engine import GameBoard, TicTacToeAI
+board = GameBoard()
+imported = time.perf_counter()
+TicTacToeAI('X', 'O').get_best_move(board)
+print(imported - start, time.perf_counter() - imported)
+"""
+
+# Opening name -> X's first move (None for the empty board)
+OPENINGS = {
+    'empty': None,
+    'corner': (0, 0),
+    'edge': (0, 1),
+    'center': (1, 1),
+}
+
+# Board shape and number of positions for the difficulty latencies
+LATENCY_BOARD = (7, 4)
+LATENCY_POSITIONS = 40
+# Board sizes for the render benchmarks
+RENDER_SIZES = (15, 19)
+
+
+def measure(func, min_time=0.2, repeat=5):
+    """Seconds per call of func: best of repeat runs of at least min_time"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def opening_board(move):
+    """A 3x3 board after X's opening move, with O to play"""
+    board = GameBoard()
+    if move is not None:
+        board.make_move(move[0], move[1], 'X')
+        board.switch_player()
+    return board
+
+
+def bench_primitives(results):
+    board = GameBoard()
+    for row, col, player in ((1, 1, 'X'), (0, 0, 'O'), (2, 2, 'X'), (0, 2, 'O')):
+        board.make_move(row, col, player)
+    primitives = {
+        'board.check_winner': lambda: board.check_winner('X'),
+        'board.is_full': board.is_full,
+        'board.get_empty_cells': board.get_empty_cells,
+        'board.copy': board.copy,
+    }
+    for name, func in primitives.items():
+        seconds = measure(func)
+        results[name] = {'ops_per_sec': 1 / seconds}
+
+
+def bench_modular(results):
+    for opening, move in OPENINGS.items():
+        board = opening_board(move)
+        player = board.current_player
+        opponent = 'O' if player == 'X' else 'X'
+
+        # Cold search: clear the transposition table before every call
+        ai = TicTacToeAI(player, opponent, use_lookup=False)
+
+        def search():
+            ai.table.clear()
+            ai.get_best_move(board)
+
+        seconds = measure(search)
+        results[f'ai.search.{opening}'] = {
+            'ops_per_sec': 1 / seconds,
+            'nodes': ai.nodes_searched,
+            'nodes_per_sec': ai.nodes_searched / seconds,
+        }
+
+        ai = TicTacToeAI(player, opponent)
+        if ai.lookup is not None:
+            seconds = measure(lambda: ai.get_best_move(board))
+            results[f'ai.lookup.{opening}'] = {'ops_per_sec': 1 / seconds}
+
+
+def bench_legacy(results):
+    try:
+        from tictactoe import TicTacToe
+    except ImportError as error:
+        print(f"Skipping legacy benchmarks: {error}", file=sys.stderr)
+        return
+    # The search methods only use the board passed in, so no window is needed
+    legacy = object.__new__(TicTacToe)
+    for opening, move in OPENINGS.items():
+        if move is None:
+            continue
+        board = [['' for _ in range(3)] for _ in range(3)]
+        board[move[0]][move[1]] = 'X'
+        seconds = measure(lambda: legacy.find_best_move(board))
+        results[f'legacy.search.{opening}'] = {
+            'ops_per_sec': 1 / seconds,
+            'nodes': legacy.nodes_searched,
+            'nodes_per_sec': legacy.nodes_searched / seconds,
+        }
+
+
+def bench_startup(results, runs=5):
+    """Cold engine import and first move (table lookup on 3x3), best of runs"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    import_time = first_move = float('inf')
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        seconds = [float(field) for field in output.split()]
+        import_time = min(import_time, seconds[0])
+        first_move = min(first_move, seconds[1])
+    results['startup.import'] = {'ops_per_sec': 1 / import_time}
+    results['startup.first_move'] = {'ops_per_sec': 1 / first_move}
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_positions(count, seed=0):
+    """Random positions 2 to 12 plies in that are still in play"""
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = GameBoard(*LATENCY_BOARD)
+        for _ in range(rng.randint(2, 12)):
+            symbol = board.current_player
+            board.push(rng.choice(board.get_empty_cells()))
+            if board.check_winner(symbol) or board.is_full():
+                break
+        else:
+            boards.append(board)
+    return boards
+
+
+def bench_difficulty(results, count=LATENCY_POSITIONS):
+    """Move latency of each difficulty level over the same positions"""
+    boards = latency_positions(count)
+    for level in DIFFICULTY_LEVELS:
+        ais = {'X': TicTacToeAI('X', 'O', use_book=False, difficulty=level),
+               'O': TicTacToeAI('O', 'X', use_book=False, difficulty=level)}
+        latencies = []
+        for board in boards:
+            start = time.perf_counter()
+            ais[board.current_player].get_best_move(board)
+            latencies.append(time.perf_counter() - start)
+        p50 = percentile(latencies, 0.5)
+        results[f'difficulty.{level}'] = {
+            'ops_per_sec': 1 / p50,
+            'p50_ms': p50 * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+        }
+
+
+def bench_render(results):
+    """Full and single-cell canvas frames; skipped without a display"""
+    try:
+        import tkinter
+    except ImportError:
+        return
+    try:
+        root = tkinter.Tk()
+    except tkinter.TclError:
+        return
+    from board_canvas import BoardCanvas, CELL_COLOR
+
+    for size in RENDER_SIZES:
+        view = BoardCanvas(root, lambda row, col: None)
+        view.pack()
+        view.set_shape(size)
+        empty = [('', CELL_COLOR)] * (size * size)
+        full = [('XO'[i % 2], CELL_COLOR) for i in range(size * size)]
+        one = [('X', CELL_COLOR)] + empty[1:]
+        frames = {'full': (full, empty), 'move': (one, empty)}
+        for name, (first, second) in frames.items():
+            state = [first, second]
+
+            def frame():
+                view.render(state[0])
+                state.reverse()
+
+            results[f'render.{name}.{size}x{size}'] = {'ops_per_sec': 1 / measure(frame)}
+        view.canvas.destroy()
+    root.destroy()
+
+
+def run_benchmarks():
+    """Run every benchmark; returns {name: metrics}"""
+    results = {}
+    bench_primitives(results)
+    bench_modular(results)
+    bench_legacy(results)
+    bench_startup(results)
+    bench_difficulty(results)
+    bench_render(results)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return (name, baseline ops/sec, current ops/sec) for each regression"""
+    regressions = []
+    for name, metrics in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if metrics['ops_per_sec'] < old['ops_per_sec'] * (1 - threshold):
+            regressions.append((name, old['ops_per_sec'], metrics['ops_per_sec']))
+    return regressions
+
+
+def format_results(results, baseline=None):
+    lines = [f"{'benchmark':<26}{'ops/sec':>14}{'nodes':>9}{'nodes/sec':>14}"
+             f"{'p50 ms':>9}{'p99 ms':>9}{'vs base':>10}"]
+    for name, metrics in results.items():
+        nodes = metrics.get('nodes')
+        nodes_per_sec = metrics.get('nodes_per_sec')
+        p50 = metrics.get('p50_ms')
+        p99 = metrics.get('p99_ms')
+        change = ''
+        if baseline and name in baseline:
+            ratio = metrics['ops_per_sec'] / baseline[name]['ops_per_sec'] - 1
+            change = f"{100 * ratio:+.1f}%"
+        lines.append(
+            f"{name:<26}{metrics['ops_per_sec']:>14,.0f}"
+            f"{'' if nodes is None else nodes:>9}"
+            f"{'' if nodes_per_sec is None else f'{nodes_per_sec:,.0f}':>14}"
+            f"{'' if p50 is None else f'{p50:.1f}':>9}{'' if p99 is None else f'{p99:.1f}':>9}"
+            f"{change:>10}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tic-Tac-Toe engine benchmarks")
+    parser.add_argument('--output', help="save results as JSON to this file")
+    parser.add_argument('--baseline', help="compare against results saved earlier")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="allowed slowdown before a benchmark counts as a regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks()
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    print(format_results(results, baseline))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'results': results,
+            }, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:,.0f} -> {new:,.0f} ops/sec", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
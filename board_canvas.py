@@ -0,0 +1,128 @@
+"""
+Board Canvas Module
+Draws the game board on a single tkinter Canvas
+
+The grid is drawn once per board shape: a dark background with one
+rectangle and one text item per cell on top of it, so the gaps between
+the rectangles form the grid lines. render() takes the whole board but
+compares it with what is already on screen and only reconfigures the
+cells that changed, so a move on a 19x19 board touches two canvas items
+instead of rebuilding 361 widgets. Clicks are mapped from pixel
+coordinates back to cells.
+
+Each render() records how many cells it redrew and how long the frame
+took (item updates plus Tk's redraw), for the debug status bar and the
+render benchmark.
+"""
+
+import bisect
+import time
+import tkinter as tk
+
+GRID_COLOR = '#333333'
+CELL_COLOR = 'white'
+PLAYER_COLORS = {'X': '#2196F3', 'O': '#F44336'}
+# Space around the board, in pixels
+BORDER = 5
+
+
+def cell_layout(size):
+    """(cell size, gap between cells, font size) in pixels for a board size"""
+    if size == 3:
+        return 100, 6, 32
+    cell = max(24, min(60, 540 // size))
+    return cell, 2, max(10, cell // 2)
+
+
+class BoardCanvas:
+    def __init__(self, parent, on_click):
+        self.canvas = tk.Canvas(parent, bg=GRID_COLOR, highlightthickness=0)
+        self.canvas.bind('<Button-1>', self.click)
+        self.on_click = on_click
+        self.size = 0
+        self.gaps = ()
+        # Left (and top) pixel edge of each column (and row)
+        self.offsets = []
+        self.cell = 0
+        # Canvas item ids per cell: background rectangle and mark
+        self.rects = []
+        self.texts = []
+        # (text, background) currently on screen per cell
+        self.drawn = []
+        # Statistics of the last render
+        self.cells_redrawn = 0
+        self.frame_ms = 0.0
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+
+    def set_shape(self, size, gaps=()):
+        """Draw an empty grid for a size x size board, with extra space
+        before the rows and columns listed in gaps; a no-op if the shape
+        is already on screen"""
+        gaps = tuple(gaps)
+        if size == self.size and gaps == self.gaps:
+            return
+        self.size, self.gaps = size, gaps
+        self.cell, gap, font_size = cell_layout(size)
+        self.offsets = []
+        position = BORDER
+        for i in range(size):
+            if i in gaps:
+                position += gap * 3
+            self.offsets.append(position)
+            position += self.cell + gap
+        extent = position - gap + BORDER
+
+        self.canvas.delete('all')
+        self.canvas.config(width=extent, height=extent)
+        font = ('Arial', font_size, 'bold')
+        half = self.cell // 2
+        self.rects = []
+        self.texts = []
+        for top in self.offsets:
+            for left in self.offsets:
+                self.rects.append(self.canvas.create_rectangle(
+                    left, top, left + self.cell, top + self.cell,
+                    fill=CELL_COLOR, outline=''))
+                self.texts.append(self.canvas.create_text(
+                    left + half, top + half, text='', font=font))
+        self.drawn = [('', CELL_COLOR)] * (size * size)
+
+    def render(self, cells):
+        """Show cells, a row-major sequence of (text, background) pairs,
+        redrawing only those that differ from the last frame"""
+        start = time.perf_counter()
+        drawn = self.drawn
+        itemconfig = self.canvas.itemconfig
+        changed = 0
+        for index, cell in enumerate(cells):
+            old = drawn[index]
+            if cell == old:
+                continue
+            text, bg = cell
+            if text != old[0]:
+                itemconfig(self.texts[index], text=text, fill=PLAYER_COLORS.get(text, ''))
+            if bg != old[1]:
+                itemconfig(self.rects[index], fill=bg)
+            drawn[index] = cell
+            changed += 1
+        if changed:
+            self.canvas.update_idletasks()
+        self.cells_redrawn = changed
+        self.frame_ms = (time.perf_counter() - start) * 1000
+        return changed
+
+    def cell_at(self, x, y):
+        """(row, col) under a pixel position, or None between cells"""
+        row = bisect.bisect_right(self.offsets, y) - 1
+        col = bisect.bisect_right(self.offsets, x) - 1
+        if (row < 0 or col < 0 or y >= self.offsets[row] + self.cell
+                or x >= self.offsets[col] + self.cell):
+            return None
+        return row, col
+
+    def click(self, event):
+        cell = self.cell_at(event.x, event.y)
+        if cell is not None:
+            self.on_click(*cell)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Command-Line Front End
+Play in the terminal, or answer moves over stdin/stdout for scripts
+
+Modes:
+- play      a game against the AI in the terminal
+- protocol  one board per line in, one move per line out
+            (format described in engine/protocol.py)
+
+The engine is only imported once the arguments are parsed, and never
+pulls in tkinter, so this starts quickly and needs no display. --timing
+reports the engine import time and the time to the first move on stderr.
+
+Usage: python3 cli.py [play|protocol] [--engine minimax|mcts] [--time-limit SECONDS]
+                      [--depth N] [--size N] [--win-length K] [--human X|O] [--timing]
+"""
+
+import argparse
+import sys
+import time
+
+
+class Timer:
+    """
+    Import and first-move latency for --timing
+    The first move counts from the request to the reply, including
+    creating the engine, but not time spent waiting for input
+    """
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.import_ms = None
+        self.reported = False
+
+    def imported(self):
+        self.import_ms = (time.perf_counter() - self.start) * 1000
+
+    def first_move(self, reply, seconds):
+        if self.enabled and not self.reported:
+            self.reported = True
+            print(f"timing: engine import {self.import_ms:.1f} ms, "
+                  f"first move {seconds * 1000:.1f} ms", file=sys.stderr)
+
+
+def engine_factory(args):
+    """make_engine(player, opponent) for the chosen engine"""
+    if args.engine == 'mcts':
+        from engine import MCTSPlayer
+        return lambda player, opponent: MCTSPlayer(player, opponent, time_limit=args.time_limit)
+    from engine import TicTacToeAI
+    return lambda player, opponent: TicTacToeAI(player, opponent, max_depth=args.depth)
+
+
+def print_board(game_board):
+    size = game_board.size
+    width = len(str(size - 1))
+    print(' ' * (width + 1) + ' '.join(f"{col:>{width}}" for col in range(size)))
+    for row, cells in enumerate(game_board.board):
+        print(f"{row:>{width}} " + ' '.join(f"{cell or '.':>{width}}" for cell in cells))
+
+
+def read_move(game_board, player):
+    """Ask the human for a move; None on end of input"""
+    while True:
+        try:
+            text = input(f"Player {player}, your move (row col): ")
+        except EOFError:
+            print()
+            return None
+        fields = text.replace(',', ' ').split()
+        if len(fields) == 2 and all(field.isdigit() for field in fields):
+            row, col = int(fields[0]), int(fields[1])
+            if game_board.is_valid_move(row, col):
+                return row, col
+        print("Invalid move, enter a free cell as: row col")
+
+
+def play(args, timer):
+    from engine import GameBoard
+    make_engine = engine_factory(args)
+    try:
+        game_board = GameBoard(args.size, args.win_length)
+    except ValueError as error:
+        sys.exit(f"error: {error}")
+    timer.imported()
+    ai_player = 'O' if args.human == 'X' else 'X'
+    ai = None
+
+    while True:
+        print_board(game_board)
+        player = game_board.current_player
+        if player == args.human:
+            move = read_move(game_board, player)
+            if move is None:
+                return
+        else:
+            start = time.perf_counter()
+            if ai is None:
+                ai = make_engine(ai_player, args.human)
+            move = ai.choose_move(game_board)
+            timer.first_move(move, time.perf_counter() - start)
+            print(f"AI plays {move[0]} {move[1]}")
+        game_board.make_move(move[0], move[1], player)
+
+        if game_board.check_winner(player):
+            print_board(game_board)
+            print("You win!" if player == args.human else "AI wins!")
+            return
+        if game_board.is_full():
+            print_board(game_board)
+            print("It's a draw!")
+            return
+        game_board.switch_player()
+
+
+def protocol(args, timer):
+    from engine.protocol import ProtocolSession, serve
+    session = ProtocolSession(engine_factory(args))
+    timer.imported()
+    serve(session, sys.stdin, sys.stdout, timer.first_move)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tic-Tac-Toe command-line front end")
+    parser.add_argument('mode', nargs='?', choices=('play', 'protocol'), default='play',
+                        help="play in the terminal, or answer boards on stdin")
+    parser.add_argument('--engine', choices=('minimax', 'mcts'), default='minimax',
+                        help="AI engine")
+    parser.add_argument('--time-limit', type=float, default=1.0,
+                        help="seconds per move for the MCTS engine")
+    parser.add_argument('--depth', type=int, default=None,
+                        help="search depth for the minimax engine (default: by board size)")
+    parser.add_argument('--size', type=int, default=3, help="board size (play mode)")
+    parser.add_argument('--win-length', type=int, default=None,
+                        help="marks in a row needed to win (play mode)")
+    parser.add_argument('--human', choices=('X', 'O'), default='X',
+                        help="the side you play (play mode)")
+    parser.add_argument('--timing', action='store_true',
+                        help="report engine import time and time to first move on stderr")
+    args = parser.parse_args()
+
+    timer = Timer(args.timing)
+    if args.mode == 'protocol':
+        protocol(args, timer)
+    else:
+        play(args, timer)
+
+
+if __name__ == "__main__":
+    main()
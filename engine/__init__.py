@@ -0,0 +1,37 @@
+"""
+Engine Package
+Headless access to the game engine, for scripts, pipelines and the CLI
+
+Nothing here imports tkinter. The engine classes are loaded on first use,
+so `import engine` itself is nearly free and a program only pays for the
+parts it touches:
+
+    from engine import GameBoard, TicTacToeAI
+"""
+
+# Public name -> module that defines it
+_EXPORTS = {
+    'GameBoard': 'game_logic',
+    'Geometry': 'game_logic',
+    'TicTacToeAI': 'ai_player',
+    'MoveAnalysis': 'ai_player',
+    'MCTSPlayer': 'mcts_player',
+    'RandomPlayer': 'players',
+    'make_player': 'players',
+    'SearchStats': 'search_stats',
+    'UltimateBoard': 'ultimate',
+    'UltimateAI': 'ultimate_ai',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'engine' has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module_name), name)
+    # Cache it so later lookups skip this function
+    globals()[name] = value
+    return value
@@ -0,0 +1,112 @@
+"""
+Text Protocol Module
+Line-based board-in, move-out protocol for driving the engine from other programs
+
+Request:  <board> [win_length]
+    board holds the cells in row-major order: '.' (or '-') for empty, X
+    and O, rows optionally separated by '/'. The cell count must be a
+    square, e.g. "X.O/.X./..." for 3x3, and at most MAX_SIZE x MAX_SIZE.
+    X is to move when both players have the same number of marks,
+    otherwise O.
+Reply:    "<row> <col>"   the move for the side to move (0-based)
+          "none"          the game is already over
+          "error <text>"  the request could not be understood
+Blank lines are ignored and "quit" ends the session. Every reply is
+flushed, so a caller can write a request and wait for its answer.
+"""
+
+import math
+import time
+
+from game_logic import GameBoard
+
+EMPTY_MARKS = '.-'
+# Largest board side accepted; bigger boards would tie up the engine
+MAX_SIZE = 15
+
+
+def parse_board(text, win_length=None):
+    """Build a GameBoard from its text form; raises ValueError if malformed"""
+    cells = text.replace('/', '')
+    if len(cells) > MAX_SIZE * MAX_SIZE:
+        raise ValueError(f"Boards larger than {MAX_SIZE}x{MAX_SIZE} are not supported")
+    size = math.isqrt(len(cells))
+    if size < 1 or size * size != len(cells):
+        raise ValueError(f"{len(cells)} cells is not a square board")
+    if win_length is not None and not 1 <= win_length <= size:
+        raise ValueError(f"win_length must be between 1 and {size}")
+    board = GameBoard(size, win_length)
+    counts = {'X': 0, 'O': 0}
+    for index, mark in enumerate(cells.upper()):
+        if mark in EMPTY_MARKS:
+            continue
+        if mark not in counts:
+            raise ValueError(f"Unknown mark {mark!r}")
+        board.make_move(index // size, index % size, mark)
+        counts[mark] += 1
+    if counts['X'] - counts['O'] not in (0, 1):
+        raise ValueError("X must have as many marks as O, or one more")
+    board.current_player = 'X' if counts['X'] == counts['O'] else 'O'
+    return board
+
+
+def format_board(game_board):
+    """Text form of a board, as accepted by parse_board"""
+    return '/'.join(''.join(cell or '.' for cell in row) for row in game_board.board)
+
+
+class ProtocolSession:
+    """
+    Answers protocol requests with engines from make_engine(player, opponent)
+    One engine is kept per side and board shape, so caches stay warm
+    across requests from the same game
+    """
+
+    def __init__(self, make_engine):
+        self.make_engine = make_engine
+        self.engines = {}
+
+    def engine_for(self, game_board):
+        player = game_board.current_player
+        key = (game_board.size, game_board.win_length, player)
+        engine = self.engines.get(key)
+        if engine is None:
+            opponent = 'O' if player == 'X' else 'X'
+            engine = self.engines[key] = self.make_engine(player, opponent)
+        return engine
+
+    def handle(self, line):
+        """Reply to one request line; None for blank lines and quit"""
+        fields = line.split()
+        if not fields or fields[0].lower() == 'quit':
+            return None
+        if len(fields) > 2:
+            return "error expected: <board> [win_length]"
+        try:
+            win_length = int(fields[1]) if len(fields) == 2 else None
+            board = parse_board(fields[0], win_length)
+        except ValueError as error:
+            return f"error {error}"
+        if board.check_winner('X') or board.check_winner('O') or board.is_full():
+            return "none"
+        move = self.engine_for(board).choose_move(board)
+        return "none" if move is None else f"{move[0]} {move[1]}"
+
+
+def serve(session, infile, outfile, on_reply=None):
+    """Answer requests from infile until EOF or quit; returns the number answered.
+    on_reply(reply, seconds) is called after each reply, e.g. for timing"""
+    answered = 0
+    for line in infile:
+        start = time.perf_counter()
+        reply = session.handle(line)
+        if reply is None:
+            if line.strip().lower() == 'quit':
+                break
+            continue
+        outfile.write(reply + '\n')
+        outfile.flush()
+        answered += 1
+        if on_reply is not None:
+            on_reply(reply, time.perf_counter() - start)
+    return answered
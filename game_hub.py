@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Game Hub
+Online two-player games over a TCP line protocol, built on asyncio
+
+Clients connect, ask for a game and are paired with the next player
+waiting for the same board shape. Moves are validated on the hub and
+every update goes to both players and to any spectators. One connection
+may hold seats in several games at once, so a lobby or a bot can
+multiplex its games over a single socket.
+
+Client -> hub, one command per line:
+    play [size] [win_length]    join the matchmaking queue (default 3x3)
+    move <game> <row> <col>     play in a game where it is your turn
+    watch <game>                follow a game as a spectator
+    unwatch <game>
+    leave <game>                resign
+    stats                       hub counters
+    quit
+Hub -> client:
+    wait                        queued, waiting for an opponent
+    start <game> <X|O> <size> <win_length>
+    state <game> <board> <X|O|->    after every move: the board in the
+                                text form of engine/protocol.py and the
+                                side to move ('-' once the game is over)
+    end <game> <X|O|draw> <reason>  reason: win, full, resign,
+                                disconnect or timeout
+    stats key=value ...
+    error <text>
+
+Each session is a small __slots__ object that keeps the whole position in
+one integer (X marks in the low cells bits, O marks above), with the
+players and spectators as references; the board shape (a shared
+Geometry) costs nothing per game. Sessions are kept in an OrderedDict in
+order of last activity, so evicting idle ones only looks at the front.
+Clients that stop reading are disconnected once their unsent output
+passes a limit, so one slow spectator cannot hold the hub up.
+
+Usage: python3 game_hub.py [--host 127.0.0.1] [--port 9000] [--idle-timeout 300]
+"""
+
+import argparse
+import asyncio
+import collections
+import os
+import time
+
+from game_logic import GameBoard, Geometry
+
+DEFAULT_PORT = 9000
+DEFAULT_IDLE_TIMEOUT = 300.0
+# Seconds between scans for idle sessions
+EVICT_INTERVAL = 1.0
+# Largest board shape a client may ask for
+MAX_SIZE = 15
+# Unsent bytes a client may have queued before it is disconnected
+MAX_BUFFERED = 1 << 20
+MAX_LINE = 1024
+
+
+class GameSession:
+    __slots__ = ('game_id', 'geometry', 'board', 'players', 'spectators', 'last_active')
+
+    def __init__(self, game_id, geometry, players, now):
+        self.game_id = game_id
+        self.geometry = geometry
+        # X mask | O mask << cells
+        self.board = 0
+        # (X client, O client)
+        self.players = players
+        # Created on the first watch, since most games have no spectators
+        self.spectators = None
+        self.last_active = now
+
+    def masks(self):
+        """(X mask, O mask)"""
+        cells = self.geometry.cells
+        return self.board & self.geometry.full_mask, self.board >> cells
+
+    def to_move(self):
+        x_mask, o_mask = self.masks()
+        return 'X' if x_mask.bit_count() == o_mask.bit_count() else 'O'
+
+    def text(self):
+        """The board in the text form of engine/protocol.py"""
+        x_mask, o_mask = self.masks()
+        size = self.geometry.size
+        cells = ['X' if x_mask >> i & 1 else 'O' if o_mask >> i & 1 else '.'
+                 for i in range(self.geometry.cells)]
+        return '/'.join(''.join(cells[row * size:(row + 1) * size]) for row in range(size))
+
+
+class HubClient:
+    __slots__ = ('writer', 'games', 'watching', 'queued', 'closed')
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.games = set()
+        self.watching = set()
+        # (size, win_length) of every queue this client has taken a seat in
+        self.queued = set()
+        self.closed = False
+
+    def send(self, data):
+        """Queue bytes for the client; drop clients that stopped reading"""
+        if self.closed:
+            return
+        if self.writer.transport.is_closing():
+            self.closed = True
+            return
+        self.writer.write(data)
+        if self.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            self.closed = True
+            self.writer.transport.abort()
+
+
+class GameHub:
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT, max_size=MAX_SIZE):
+        self.idle_timeout = idle_timeout
+        self.max_size = max_size
+        # game id -> GameSession, least recently active first
+        self.sessions = collections.OrderedDict()
+        # (size, win_length) -> clients waiting for an opponent, one entry per seat
+        self.waiting = {}
+        self.next_id = 1
+        self.clients = 0
+        self.counters = collections.Counter()
+        self.evictor = None
+
+    def start(self):
+        self.evictor = asyncio.get_running_loop().create_task(self.evict_idle())
+
+    async def close(self):
+        if self.evictor is not None:
+            self.evictor.cancel()
+            try:
+                await self.evictor
+            except asyncio.CancelledError:
+                pass
+
+    async def handle_connection(self, reader, writer):
+        client = HubClient(writer)
+        self.clients += 1
+        try:
+            while not client.closed:
+                try:
+                    line = await reader.readuntil(b'\n')
+                except asyncio.LimitOverrunError:
+                    client.send(b"error line too long\n")
+                    break
+                except asyncio.IncompleteReadError:
+                    break
+                if self.handle(client, line.decode('utf-8', 'replace').split()) is False:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.clients -= 1
+            self.disconnect(client)
+            writer.close()
+
+    def handle(self, client, fields):
+        """Run one command; returns False to close the connection"""
+        if not fields:
+            return True
+        command, args = fields[0].lower(), fields[1:]
+        self.counters['commands'] += 1
+        try:
+            if command == 'play':
+                self.play(client, *map(int, args))
+            elif command == 'move':
+                game_id, row, col = map(int, args)
+                self.move(client, game_id, row, col)
+            elif command == 'watch':
+                self.watch(client, int(*args))
+            elif command == 'unwatch':
+                self.unwatch(client, int(*args))
+            elif command == 'leave':
+                self.leave(client, int(*args))
+            elif command == 'stats':
+                client.send(("stats " + " ".join(f"{name}={value}" for name, value
+                                                 in self.stats().items()) + "\n").encode())
+            elif command == 'quit':
+                return False
+            else:
+                raise ValueError(f"unknown command {command}")
+        except (TypeError, ValueError) as error:
+            client.send(f"error {error}\n".encode())
+        return True
+
+    def play(self, client, size=3, win_length=None):
+        win_length = win_length or size
+        if not 1 <= size <= self.max_size:
+            raise ValueError(f"size must be 1 to {self.max_size}")
+        if not 1 <= win_length <= size:
+            raise ValueError(f"win_length must be 1 to {size}")
+        geometry = Geometry.get(size, win_length)
+        queue = self.waiting.setdefault((size, win_length), collections.deque())
+        # Skip seats whose client has gone away
+        while queue and queue[0].closed:
+            queue.popleft()
+        if not queue:
+            queue.append(client)
+            client.queued.add((size, win_length))
+            client.send(b"wait\n")
+            return
+        opponent = queue.popleft()
+        game_id = self.next_id
+        self.next_id += 1
+        session = GameSession(game_id, geometry, (opponent, client), time.monotonic())
+        self.sessions[game_id] = session
+        opponent.games.add(game_id)
+        client.games.add(game_id)
+        self.counters['games'] += 1
+        opponent.send(f"start {game_id} X {size} {win_length}\n".encode())
+        client.send(f"start {game_id} O {size} {win_length}\n".encode())
+
+    def session_for(self, game_id):
+        session = self.sessions.get(game_id)
+        if session is None:
+            raise ValueError(f"no game {game_id}")
+        return session
+
+    def move(self, client, game_id, row, col):
+        session = self.session_for(game_id)
+        symbol = session.to_move()
+        if session.players[0 if symbol == 'X' else 1] is not client:
+            raise ValueError(f"not your turn in game {game_id}")
+        geometry = session.geometry
+        # Sessions keep only the masks; the board is rebuilt for each move
+        board = GameBoard.from_masks(geometry.size, geometry.win_length, *session.masks())
+        if not board.make_move(row, col, symbol):
+            raise ValueError(f"invalid move {row} {col}")
+        session.board = board.masks['X'] | board.masks['O'] << geometry.cells
+        session.last_active = time.monotonic()
+        self.sessions.move_to_end(game_id)
+        self.counters['moves'] += 1
+
+        won = board.check_winner(symbol)
+        full = board.is_full()
+        next_player = '-' if won or full else ('O' if symbol == 'X' else 'X')
+        self.broadcast(session, f"state {game_id} {session.text()} {next_player}\n".encode())
+        if won:
+            self.finish(session, symbol, 'win')
+        elif full:
+            self.finish(session, 'draw', 'full')
+
+    def watch(self, client, game_id):
+        session = self.session_for(game_id)
+        if session.spectators is None:
+            session.spectators = set()
+        session.spectators.add(client)
+        client.watching.add(game_id)
+        client.send(f"state {game_id} {session.text()} {session.to_move()}\n".encode())
+
+    def unwatch(self, client, game_id):
+        session = self.sessions.get(game_id)
+        if session is not None and session.spectators:
+            session.spectators.discard(client)
+        client.watching.discard(game_id)
+
+    def leave(self, client, game_id):
+        session = self.session_for(game_id)
+        if client not in session.players:
+            raise ValueError(f"not playing in game {game_id}")
+        self.finish(session, 'O' if client is session.players[0] else 'X', 'resign')
+
+    def broadcast(self, session, data):
+        """Send a line to both players and every spectator"""
+        x_client, o_client = session.players
+        x_client.send(data)
+        # A client holding both seats gets each line once
+        if o_client is not x_client:
+            o_client.send(data)
+        if session.spectators:
+            for client in session.spectators:
+                client.send(data)
+        self.counters['messages'] += 2 + len(session.spectators or ())
+
+    def finish(self, session, result, reason):
+        """End a game: tell everyone and drop the session"""
+        self.broadcast(session, f"end {session.game_id} {result} {reason}\n".encode())
+        del self.sessions[session.game_id]
+        for client in session.players:
+            client.games.discard(session.game_id)
+        for client in session.spectators or ():
+            client.watching.discard(session.game_id)
+        self.counters[f'ended_{reason}'] += 1
+
+    def disconnect(self, client):
+        """A client went away: its games are lost by forfeit"""
+        client.closed = True
+        for shape in client.queued:
+            queue = self.waiting.get(shape)
+            if queue:
+                self.waiting[shape] = collections.deque(
+                    seat for seat in queue if seat is not client)
+        for game_id in list(client.games):
+            session = self.sessions.get(game_id)
+            if session is not None:
+                x_client, o_client = session.players
+                # A client holding both seats leaves no one to win
+                result = 'draw' if x_client is o_client else 'O' if client is x_client else 'X'
+                self.finish(session, result, 'disconnect')
+        for game_id in list(client.watching):
+            self.unwatch(client, game_id)
+
+    async def evict_idle(self):
+        """Periodically end sessions with no move for idle_timeout seconds"""
+        while True:
+            await asyncio.sleep(EVICT_INTERVAL)
+            cutoff = time.monotonic() - self.idle_timeout
+            while self.sessions:
+                session = next(iter(self.sessions.values()))
+                if session.last_active > cutoff:
+                    break
+                self.finish(session, 'draw', 'timeout')
+
+    def stats(self):
+        return {
+            'clients': self.clients,
+            'sessions': len(self.sessions),
+            'waiting': sum(len(queue) for queue in self.waiting.values()),
+            'games': self.counters['games'],
+            'moves': self.counters['moves'],
+            'messages': self.counters['messages'],
+            'evicted': self.counters['ended_timeout'],
+            'rss_kb': resident_memory_kb(),
+        }
+
+
+def resident_memory_kb():
+    """Current resident memory of this process (peak where /proc is missing)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def serve(hub, host, port, ready=None):
+    """Run the hub until cancelled; ready(server) is called once listening"""
+    hub.start()
+    server = await asyncio.start_server(hub.handle_connection, host, port, limit=MAX_LINE)
+    if ready is not None:
+        ready(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await hub.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online two-player game hub")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help="seconds without a move before a game is ended")
+    parser.add_argument('--max-size', type=int, default=MAX_SIZE, help="largest board size")
+    args = parser.parse_args()
+
+    async def run():
+        hub = GameHub(args.idle_timeout, args.max_size)
+        await serve(hub, args.host, args.port,
+                    lambda server: print(f"Hub listening on {args.host}:{args.port}", flush=True))
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,343 @@
 """
 Game Logic Module
 Handles the core game state and rules for Tic-Tac-Toe
+
+The position is stored as a bitboard: one integer mask per player where
+bit (row * size + col) is set when that player occupies the cell. Boards
+can be any size N x N with k marks in a row needed to win.
 """
 
+import random
+
+# Boards up to this many cells get symmetry lookup tables
+SYMMETRY_MAX_CELLS = 25
+# Boards up to this many cells get a full empty-cell lookup table
+EMPTY_TABLE_MAX_CELLS = 9
+
+
+def _transform_cell(index, transform, size):
+    """Map a cell index through one of the 8 board symmetries"""
+    row, col = divmod(index, size)
+    last = size - 1
+    for _ in range(transform % 4):
+        row, col = col, last - row
+    if transform >= 4:
+        col = last - col
+    return row * size + col
+
+
+class Geometry:
+    """Precomputed masks and tables shared by all boards of one shape"""
+
+    _cache = {}
+
+    def __init__(self, size, win_length):
+        self.size = size
+        self.win_length = win_length
+        self.cells = size * size
+        self.full_mask = (1 << self.cells) - 1
+        self.coords = tuple(divmod(i, size) for i in range(self.cells))
+
+        # Every run of win_length cells, as a bit mask
+        lines = []
+        for row in range(size):
+            for col in range(size):
+                for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_row = row + d_row * (win_length - 1)
+                    end_col = col + d_col * (win_length - 1)
+                    if not (0 <= end_row < size and 0 <= end_col < size):
+                        continue
+                    mask = 0
+                    for step in range(win_length):
+                        mask |= 1 << ((row + d_row * step) * size + col + d_col * step)
+                    lines.append(mask)
+        self.lines = tuple(lines)
+        self.lines_through = tuple(
+            tuple(line for line in self.lines if line >> i & 1)
+            for i in range(self.cells)
+        )
+        self.line_counts = tuple(len(lines) for lines in self.lines_through)
+        self.line_ids_through = tuple(
+            tuple(n for n, line in enumerate(self.lines) if line >> i & 1)
+            for i in range(self.cells)
+        )
+
+        # Zobrist keys: a position's hash is the XOR of one key per mark
+        rng = random.Random(size * 1000 + win_length)
+        self.zobrist = {
+            player: tuple(rng.getrandbits(64) for _ in range(self.cells))
+            for player in ('X', 'O')
+        }
+
+        # Column masks used to shift masks sideways without wrapping rows
+        left_col = sum(1 << (row * size) for row in range(size))
+        self.not_left = self.full_mask & ~left_col
+        self.not_right = self.full_mask & ~(left_col << (size - 1))
+
+        if self.cells <= EMPTY_TABLE_MAX_CELLS:
+            self.empty_cells = tuple(
+                tuple(self.coords[i] for i in range(self.cells) if not occupied >> i & 1)
+                for occupied in range(self.full_mask + 1)
+            )
+        else:
+            self.empty_cells = None
+
+        if self.cells <= SYMMETRY_MAX_CELLS:
+            # Per symmetry, one table per 8-bit chunk of the mask
+            self.chunks = (self.cells + 7) // 8
+            self.symmetries = tuple(
+                tuple(
+                    tuple(self._transform_mask(byte << (8 * chunk), t)
+                          for byte in range(256))
+                    for chunk in range(self.chunks)
+                )
+                for t in range(8)
+            )
+        else:
+            self.chunks = 0
+            self.symmetries = None
+
+    @classmethod
+    def get(cls, size, win_length):
+        """Return the shared geometry for a board shape"""
+        key = (size, win_length)
+        geometry = cls._cache.get(key)
+        if geometry is None:
+            geometry = cls._cache[key] = cls(size, win_length)
+        return geometry
+
+    def _transform_mask(self, mask, transform):
+        """Map every set bit of a mask through a board symmetry"""
+        result = 0
+        for i in range(self.cells):
+            if mask >> i & 1:
+                result |= 1 << _transform_cell(i, transform, self.size)
+        return result
+
+    def transform(self, mask, transform):
+        """Image of a mask under one of the 8 symmetries"""
+        result = 0
+        for chunk, table in enumerate(self.symmetries[transform]):
+            result |= table[mask >> (8 * chunk) & 0xFF]
+        return result
+
+    def canonical_key(self, x_mask, o_mask):
+        """Smallest packed (X, O) key over all symmetric images of a position
+        Boards too large for symmetry tables use the raw packed key"""
+        shift = self.cells
+        if self.symmetries is None:
+            return x_mask | o_mask << shift
+        if self.chunks == 2:
+            x_low, x_high = x_mask & 0xFF, x_mask >> 8
+            o_low, o_high = o_mask & 0xFF, o_mask >> 8
+            return min(
+                (low[x_low] | high[x_high]) | (low[o_low] | high[o_high]) << shift
+                for low, high in self.symmetries
+            )
+        return min(
+            self.transform(x_mask, t) | self.transform(o_mask, t) << shift
+            for t in range(8)
+        )
+
+    def neighborhood(self, mask):
+        """Cells adjacent (including diagonally) to any cell in mask"""
+        size = self.size
+        sideways = mask | (mask << 1) & self.not_left | (mask >> 1) & self.not_right
+        grown = sideways | sideways << size | sideways >> size
+        return grown & self.full_mask
+
+    def has_win(self, mask):
+        """Check if a player mask contains a complete line (full scan)"""
+        for line in self.lines:
+            if mask & line == line:
+                return True
+        return False
+
+
 class GameBoard:
-    def __init__(self):
-        self.board = [['' for _ in range(3)] for _ in range(3)]
-        self.current_player = 'X'
-        
+    """
+    Game state with make/unmake support
+    Every move is recorded on a history stack; per-line mark counters, the
+    number of empty cells and a Zobrist hash are updated incrementally, so
+    check_winner and is_full are O(1) and pop() undoes a move exactly.
+    """
+
+    def __init__(self, size=3, win_length=None):
+        win_length = win_length or size
+        if not 1 <= win_length <= size:
+            raise ValueError(f"win_length must be between 1 and {size}")
+        self.size = size
+        self.win_length = win_length
+        self.geometry = Geometry.get(size, self.win_length)
+        self.reset()
+
+    @classmethod
+    def from_masks(cls, size, win_length, x_mask, o_mask):
+        """
+        Board holding a position given as one bit mask per player
+        X is to move when both players have as many marks, otherwise O.
+        The incremental state is computed from the masks, as if the marks
+        had been played, but there is no move history to undo.
+        """
+        win_length = win_length or size
+        if not 1 <= win_length <= size:
+            raise ValueError(f"win_length must be between 1 and {size}")
+        geometry = Geometry.get(size, win_length)
+        if x_mask & o_mask or (x_mask | o_mask) & ~geometry.full_mask:
+            raise ValueError("Masks overlap or lie outside the board")
+        board = cls.__new__(cls)
+        board.size = size
+        board.win_length = win_length
+        board.geometry = geometry
+        board.masks = {'X': x_mask, 'O': o_mask}
+        board.line_marks = {}
+        board.won = {}
+        board.hash = 0
+        for player, mask in board.masks.items():
+            marks = board.line_marks[player] = [(mask & line).bit_count()
+                                                for line in geometry.lines]
+            board.won[player] = win_length in marks
+            keys = geometry.zobrist[player]
+            while mask:
+                low = mask & -mask
+                board.hash ^= keys[low.bit_length() - 1]
+                mask ^= low
+        board.empty_count = geometry.cells - (x_mask | o_mask).bit_count()
+        board.history = []
+        board.current_player = 'X' if x_mask.bit_count() == o_mask.bit_count() else 'O'
+        return board
+
     def reset(self):
         """Reset the game board"""
-        self.board = [['' for _ in range(3)] for _ in range(3)]
+        lines = len(self.geometry.lines)
+        self.masks = {'X': 0, 'O': 0}
+        self.line_marks = {'X': [0] * lines, 'O': [0] * lines}
+        self.won = {'X': False, 'O': False}
+        self.empty_count = self.geometry.cells
+        self.hash = 0
+        # (cell index, player, player to move before the move, player had won)
+        self.history = []
         self.current_player = 'X'
-        
+
+    @property
+    def occupied(self):
+        """Bit mask of all occupied cells"""
+        return self.masks['X'] | self.masks['O']
+
+    @property
+    def board(self):
+        """The position as a list of rows of strings (read-only view)"""
+        return [[self.get_cell(i, j) for j in range(self.size)] for i in range(self.size)]
+
+    def _place(self, index, player):
+        """Put a mark on an empty cell and update the incremental state"""
+        self.history.append((index, player, self.current_player, self.won[player]))
+        self.masks[player] |= 1 << index
+        marks = self.line_marks[player]
+        win_length = self.win_length
+        # Only the lines through the new mark can have been completed
+        for line_id in self.geometry.line_ids_through[index]:
+            marks[line_id] += 1
+            if marks[line_id] == win_length:
+                self.won[player] = True
+        self.empty_count -= 1
+        self.hash ^= self.geometry.zobrist[player][index]
+
     def make_move(self, row, col, player):
         """Make a move on the board"""
         if self.is_valid_move(row, col):
-            self.board[row][col] = player
+            self._place(row * self.size + col, player)
             return True
         return False
-        
+
+    def push(self, move):
+        """Play (row, col) for the player to move and pass the turn"""
+        row, col = move
+        if not self.is_valid_move(row, col):
+            raise ValueError(f"Invalid move: {move}")
+        self._place(row * self.size + col, self.current_player)
+        self.switch_player()
+
+    def pop(self):
+        """Undo the most recent move and return its (row, col)"""
+        if not self.history:
+            raise IndexError("No moves to undo")
+        index, player, previous_player, had_won = self.history.pop()
+        self.masks[player] &= ~(1 << index)
+        marks = self.line_marks[player]
+        for line_id in self.geometry.line_ids_through[index]:
+            marks[line_id] -= 1
+        self.won[player] = had_won
+        self.empty_count += 1
+        self.hash ^= self.geometry.zobrist[player][index]
+        self.current_player = previous_player
+        return self.geometry.coords[index]
+
+    def last_move(self):
+        """The most recent (row, col, player), or None"""
+        if not self.history:
+            return None
+        index, player = self.history[-1][:2]
+        row, col = self.geometry.coords[index]
+        return row, col, player
+
     def is_valid_move(self, row, col):
         """Check if a move is valid"""
-        return 0 <= row < 3 and 0 <= col < 3 and self.board[row][col] == ''
-        
+        return (0 <= row < self.size and 0 <= col < self.size
+                and not self.occupied >> (row * self.size + col) & 1)
+
     def get_cell(self, row, col):
         """Get the value of a cell"""
-        return self.board[row][col]
-        
+        bit = 1 << (row * self.size + col)
+        if self.masks['X'] & bit:
+            return 'X'
+        if self.masks['O'] & bit:
+            return 'O'
+        return ''
+
     def is_full(self):
         """Check if the board is full"""
-        return all(self.board[i][j] != '' for i in range(3) for j in range(3))
-        
+        return self.empty_count == 0
+
     def check_winner(self, player):
         """Check if a player has won"""
-        # Check rows
-        for row in self.board:
-            if all(cell == player for cell in row):
-                return True
-                
-        # Check columns
-        for col in range(3):
-            if all(self.board[row][col] == player for row in range(3)):
-                return True
-                
-        # Check diagonals
-        if all(self.board[i][i] == player for i in range(3)):
-            return True
-        if all(self.board[i][2-i] == player for i in range(3)):
-            return True
-            
-        return False
-        
+        return self.won[player]
+
+    def canonical_key(self):
+        """Symmetry-reduced key identifying the position"""
+        return self.geometry.canonical_key(self.masks['X'], self.masks['O'])
+
+    def position_key(self):
+        """Key for caching search results: the canonical key where symmetry
+        tables exist, otherwise the incrementally maintained Zobrist hash"""
+        if self.geometry.symmetries is None:
+            return self.hash
+        return self.geometry.canonical_key(self.masks['X'], self.masks['O'])
+
     def get_empty_cells(self):
         """Get list of empty cells"""
-        return [(i, j) for i in range(3) for j in range(3) if self.board[i][j] == '']
-        
+        geometry = self.geometry
+        occupied = self.occupied
+        if geometry.empty_cells is not None:
+            return list(geometry.empty_cells[occupied])
+        coords = geometry.coords
+        return [coords[i] for i in range(geometry.cells) if not occupied >> i & 1]
+
     def copy(self):
         """Create a copy of the board"""
-        new_board = GameBoard()
-        new_board.board = [row[:] for row in self.board]
+        new_board = GameBoard.__new__(GameBoard)
+        new_board.size = self.size
+        new_board.win_length = self.win_length
+        new_board.geometry = self.geometry
+        new_board.masks = self.masks.copy()
+        new_board.line_marks = {player: marks[:] for player, marks in self.line_marks.items()}
+        new_board.won = self.won.copy()
+        new_board.empty_count = self.empty_count
+        new_board.hash = self.hash
+        new_board.history = self.history[:]
         new_board.current_player = self.current_player
         return new_board
-        
+
     def switch_player(self):
         """Switch to the next player"""
         self.current_player = 'O' if self.current_player == 'X' else 'X'
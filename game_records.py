@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Game Records Module
+Compact fixed-width binary log of finished games
+
+A record file starts with a small header giving the board shape and the
+record size; every game after it takes exactly record_size bytes:
+
+    moves    cells played in order, each stored as (cell index + 1) in
+             bits_per_move bits, packed little-endian; 0 ends the game
+    info     uint16: result | number of moves << 2
+    x, o     uint8 player IDs (see PLAYERS)
+
+On 3x3 a game fits in 9 bytes. Files are append-only: the writer buffers
+records and writes them in bulk, and the reader memory-maps the file, so
+scans over tens of millions of games never load the file into memory. A
+partially written last record is ignored by the reader and cut off by the
+next writer, so later records stay aligned. Aggregate queries use NumPy on a
+zero-copy view of the map.
+
+Usage: python3 game_records.py FILE
+"""
+
+import mmap
+import struct
+import sys
+
+MAGIC = b'TTTG'
+# Bump when the record layout changes
+RECORD_VERSION = 1
+# magic, layout version, size, win length, record size
+HEADER = struct.Struct('<4sHBBH6x')
+INFO = struct.Struct('<HBB')
+
+# Results
+DRAW = 0
+X_WINS = 1
+O_WINS = 2
+UNFINISHED = 3
+RESULT_NAMES = ('draw', 'X wins', 'O wins', 'unfinished')
+
+# Player IDs stored in records; names not listed here are stored as 0.
+# New names go at the end so existing files keep their meaning
+PLAYERS = ('unknown', 'human', 'minimax', 'mcts', 'random', 'perfect', 'epsilon',
+           'minimax-parallel')
+
+DEFAULT_BUFFER_RECORDS = 8192
+
+
+def player_id(name):
+    """Record ID of a player name"""
+    try:
+        return PLAYERS.index(name)
+    except ValueError:
+        return 0
+
+
+def player_name(player):
+    """Player name of a record ID; IDs from newer files read as unknown"""
+    return PLAYERS[player] if 0 <= player < len(PLAYERS) else PLAYERS[0]
+
+
+def result_of(winner):
+    """Result code for a winner: 'X', 'O', None for a draw"""
+    if winner == 'X':
+        return X_WINS
+    if winner == 'O':
+        return O_WINS
+    return DRAW
+
+
+def record_layout(size):
+    """(bits per move, bytes of packed moves) for a board size"""
+    cells = size * size
+    bits = cells.bit_length()
+    return bits, (cells * bits + 7) // 8
+
+
+def pack_record(size, moves, result, x_player=0, o_player=0):
+    """Encode one game, given as a list of cell indices, as record bytes"""
+    bits, moves_bytes = record_layout(size)
+    packed = 0
+    shift = 0
+    for cell in moves:
+        packed |= (cell + 1) << shift
+        shift += bits
+    return (packed.to_bytes(moves_bytes, 'little')
+            + INFO.pack(result | len(moves) << 2, x_player, o_player))
+
+
+class GameRecord:
+    __slots__ = ('moves', 'result', 'x_player', 'o_player')
+
+    def __init__(self, moves, result, x_player, o_player):
+        self.moves = moves          # cell indices in play order
+        self.result = result
+        self.x_player = x_player
+        self.o_player = o_player
+
+    @property
+    def first_move(self):
+        return self.moves[0] if self.moves else None
+
+    def __repr__(self):
+        return (f"GameRecord(moves={self.moves}, result={RESULT_NAMES[self.result]!r}, "
+                f"x={player_name(self.x_player)!r}, o={player_name(self.o_player)!r})")
+
+
+class GameRecordWriter:
+    """
+    Append games to a record file, creating it if needed
+    Records are buffered and written in bulk; call flush() or close() (or
+    use the writer as a context manager) to push them to the file
+    """
+
+    def __init__(self, path, size=3, win_length=None,
+                 buffer_records=DEFAULT_BUFFER_RECORDS):
+        self.size = size
+        self.win_length = win_length or size
+        self.bits, self.moves_bytes = record_layout(size)
+        self.record_size = self.moves_bytes + INFO.size
+        self.buffer = bytearray()
+        self.buffer_limit = buffer_records * self.record_size
+        self.games_written = 0
+
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, RECORD_VERSION, size, self.win_length,
+                                        self.record_size))
+        else:
+            with open(path, 'rb') as f:
+                header = f.read(HEADER.size)
+            if len(header) < HEADER.size or HEADER.unpack(header) != (
+                    MAGIC, RECORD_VERSION, size, self.win_length, self.record_size):
+                self.file.close()
+                raise ValueError(f"{path} holds records of a different format or board")
+            # Drop a record torn by a crash, so new ones stay aligned
+            whole = (self.file.tell() - HEADER.size) // self.record_size
+            self.file.truncate(HEADER.size + whole * self.record_size)
+
+    def write(self, moves, result, x_player=0, o_player=0):
+        """Append a game given as a list of cell indices"""
+        self.buffer += pack_record(self.size, moves, result, x_player, o_player)
+        self.games_written += 1
+        if len(self.buffer) >= self.buffer_limit:
+            self.flush()
+
+    def write_board(self, game_board, result, x_player=0, o_player=0):
+        """Append the game played on a GameBoard, from its move history"""
+        moves = [entry[0] for entry in game_board.history]
+        self.write(moves, result, x_player, o_player)
+
+    def write_packed(self, data):
+        """Append records already encoded with pack_record()"""
+        if len(data) % self.record_size:
+            raise ValueError("Data is not a whole number of records")
+        self.buffer += data
+        self.games_written += len(data) // self.record_size
+        if len(self.buffer) >= self.buffer_limit:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GameRecordReader:
+    """Memory-mapped, read-only access to a record file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        if len(self.data) < HEADER.size:
+            self.data.close()
+            raise ValueError(f"{path} is too short for a record file")
+        magic, version, self.size, self.win_length, self.record_size = HEADER.unpack_from(self.data)
+        self.bits, self.moves_bytes = record_layout(self.size)
+        if (magic != MAGIC or version != RECORD_VERSION
+                or self.record_size != self.moves_bytes + INFO.size):
+            self.data.close()
+            raise ValueError(f"{path} is not a record file of this version")
+        self.count = (len(self.data) - HEADER.size) // self.record_size
+        self.record = struct.Struct(f'<{self.moves_bytes}sHBB')
+
+    def close(self):
+        """Release the memory map (arrays from as_array() must be gone)"""
+        self.data.close()
+
+    def __len__(self):
+        return self.count
+
+    def decode(self, packed, info, x_player, o_player):
+        mask = (1 << self.bits) - 1
+        value = int.from_bytes(packed, 'little')
+        moves = []
+        for _ in range(info >> 2):
+            moves.append((value & mask) - 1)
+            value >>= self.bits
+        return GameRecord(moves, info & 3, x_player, o_player)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("record index out of range")
+        return self.decode(*self.record.unpack_from(self.data, HEADER.size + index * self.record_size))
+
+    def iter_fields(self, chunk_records=65536):
+        """Yield the raw (packed moves, info, x, o) fields of every record;
+        the map is read in bounded chunks"""
+        for start in range(0, self.count, chunk_records):
+            end = min(start + chunk_records, self.count)
+            chunk = self.data[HEADER.size + start * self.record_size:
+                              HEADER.size + end * self.record_size]
+            yield from self.record.iter_unpack(chunk)
+
+    def __iter__(self):
+        for fields in self.iter_fields():
+            yield self.decode(*fields)
+
+    def filter(self, result=None, first_move=None, x_player=None, o_player=None):
+        """Yield the games matching every given criterion
+        Records are tested on their raw fields; only matches are decoded"""
+        mask = (1 << self.bits) - 1
+        # The first move is the low bits of the packed moves (0 when empty)
+        first = None if first_move is None else first_move + 1
+        first_bytes = 1 if self.bits <= 8 else 2
+        for fields in self.iter_fields():
+            packed, info, x, o = fields
+            if result is not None and info & 3 != result:
+                continue
+            if first is not None and int.from_bytes(packed[:first_bytes], 'little') & mask != first:
+                continue
+            if x_player is not None and x != x_player:
+                continue
+            if o_player is not None and o != o_player:
+                continue
+            yield self.decode(*fields)
+
+    def as_array(self):
+        """
+        Zero-copy NumPy structured array over the records, with fields
+        moves (packed bytes), info, x and o. Needs NumPy.
+        """
+        import numpy as np
+        dtype = np.dtype([('moves', 'u1', (self.moves_bytes,)), ('info', '<u2'),
+                          ('x', 'u1'), ('o', 'u1')])
+        return np.frombuffer(self.data, dtype, self.count, HEADER.size)
+
+    def first_moves(self, records=None):
+        """First cell played in every game (-1 for empty games). Needs NumPy."""
+        import numpy as np
+        records = self.as_array() if records is None else records
+        packed = records['moves'][:, 0].astype(np.int32)
+        if self.bits > 8:
+            packed |= records['moves'][:, 1].astype(np.int32) << 8
+        return (packed & ((1 << self.bits) - 1)) - 1
+
+    def result_counts(self):
+        """Number of games per result code. Needs NumPy."""
+        import numpy as np
+        results = self.as_array()['info'] & 3
+        return np.bincount(results, minlength=len(RESULT_NAMES)).tolist()
+
+    def results_by_first_move(self):
+        """{first cell: [games per result code]} over all games. Needs NumPy."""
+        import numpy as np
+        records = self.as_array()
+        first = self.first_moves(records)
+        results = (records['info'] & 3).astype(np.int64)
+        cells = self.size * self.size
+        keys = (first + 1).astype(np.int64) * len(RESULT_NAMES) + results
+        counts = np.bincount(keys, minlength=(cells + 1) * len(RESULT_NAMES))
+        counts = counts.reshape(cells + 1, len(RESULT_NAMES))
+        return {cell - 1: row.tolist() for cell, row in enumerate(counts) if row.any()}
+
+    def length_histogram(self):
+        """Number of games per game length. Needs NumPy."""
+        import numpy as np
+        return np.bincount(self.as_array()['info'] >> 2,
+                           minlength=self.size * self.size + 1).tolist()
+
+
+def summarize(reader, out=sys.stdout):
+    """Print the result distribution overall and by first move"""
+    total = max(len(reader), 1)
+    print(f"{reader.path}: {len(reader):,} games on {reader.size}x{reader.size} "
+          f"(k={reader.win_length}), {reader.record_size} bytes each", file=out)
+    for name, count in zip(RESULT_NAMES, reader.result_counts()):
+        print(f"  {name:<11}{count:>12,} ({100 * count / total:5.1f}%)", file=out)
+    print("Results by first move:", file=out)
+    print(f"  {'move':<8}" + ''.join(f"{name:>12}" for name in RESULT_NAMES), file=out)
+    for cell, counts in sorted(reader.results_by_first_move().items()):
+        games = max(sum(counts), 1)
+        label = 'none' if cell < 0 else '%d,%d' % divmod(cell, reader.size)
+        print(f"  {label:<8}" + ''.join(f"{100 * count / games:>11.1f}%" for count in counts),
+              file=out)
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python3 game_records.py FILE")
+    try:
+        reader = GameRecordReader(sys.argv[1])
+    except (OSError, ValueError) as error:
+        sys.exit(f"error: {error}")
+    summarize(reader)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Hub Soak Test
+Fills game_hub.py with thousands of live games and measures its cost
+
+Opens a number of connections and has each one take many seats with
+'play', so the hub pairs them into sessions (a connection usually ends up
+playing both sides of its own games, which is fine for a load test).
+Once every game has started it reads the hub's resident memory through
+'stats' and reports the growth per session, then plays random moves in
+all games for a while, timing each move until its 'state' line comes
+back. Players wait a random think time (1s on average) before each move;
+with --think 0 every game keeps a move in flight, which measures peak
+throughput rather than latency. Games that finish are replaced with new
+ones so the session count stays up.
+
+Usage: python3 hub_soak.py [--port 9000] [--connections 100] [--sessions 10000]
+                           [--duration 10] [--size 3] [--think 1.0]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from benchmark import percentile
+
+
+class SoakConnection:
+    """One connection playing every game it holds seats in"""
+
+    def __init__(self, reader, writer, rng, think):
+        self.reader = reader
+        self.writer = writer
+        self.rng = rng
+        self.think = think
+        # game id -> [symbols we hold, board text, side to move]
+        self.games = {}
+        # game id -> time the pending move was sent (None while thinking)
+        self.sent = {}
+        self.started = 0
+        self.stats = None
+        self.stats_event = asyncio.Event()
+        self.latencies = []
+        self.finished = 0
+        self.playing = False
+
+    def send(self, line):
+        self.writer.write(line.encode() + b"\n")
+
+    async def read_loop(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            fields = line.decode().split()
+            if not fields:
+                continue
+            kind = fields[0]
+            if kind == 'start':
+                game_id = int(fields[1])
+                game = self.games.setdefault(game_id, [set(), None, 'X'])
+                game[0].add(fields[2])
+                self.started += 1
+                self.move(game_id)
+            elif kind == 'state':
+                game_id = int(fields[1])
+                game = self.games.get(game_id)
+                if game is None:
+                    continue
+                game[1], game[2] = fields[2], fields[3]
+                sent = self.sent.pop(game_id, None)
+                if sent:
+                    self.latencies.append(time.perf_counter() - sent)
+                self.move(game_id)
+            elif kind == 'end':
+                game = self.games.pop(int(fields[1]), None)
+                if game is not None:
+                    self.finished += 1
+                    if self.playing:
+                        # Take the seats again to keep the number of live games steady
+                        for _ in game[0]:
+                            self.send("play")
+            elif kind == 'stats':
+                self.stats = dict(field.split('=') for field in fields[1:])
+                self.stats_event.set()
+
+    def move(self, game_id):
+        """Play a random move, after a random think time, if it is one of
+        our turns and moves are on"""
+        game = self.games[game_id]
+        if not self.playing or game[2] not in game[0] or game_id in self.sent:
+            return
+        self.sent[game_id] = None
+        if self.think:
+            asyncio.get_running_loop().call_later(
+                self.rng.uniform(0, 2 * self.think), self.send_move, game_id)
+        else:
+            self.send_move(game_id)
+
+    def send_move(self, game_id):
+        game = self.games.get(game_id)
+        if game is None or not self.playing:
+            self.sent.pop(game_id, None)
+            return
+        if game[1] is None:
+            # No move made yet: the board is empty
+            self.send(f"move {game_id} 0 0")
+        else:
+            rows = game[1].split('/')
+            empty = [(row, col) for row, text in enumerate(rows)
+                     for col, cell in enumerate(text) if cell == '.']
+            row, col = self.rng.choice(empty)
+            self.send(f"move {game_id} {row} {col}")
+        self.sent[game_id] = time.perf_counter()
+
+    def start_playing(self):
+        self.playing = True
+        for game_id in list(self.games):
+            self.move(game_id)
+
+    async def request_stats(self):
+        self.stats_event.clear()
+        self.send("stats")
+        await self.stats_event.wait()
+        return self.stats
+
+
+async def run(host, port, connections, sessions, duration, size, think, seed):
+    rng = random.Random(seed)
+    peers = []
+    readers = []
+    for _ in range(connections):
+        reader, writer = await asyncio.open_connection(host, port)
+        peer = SoakConnection(reader, writer, random.Random(rng.random()), think)
+        peers.append(peer)
+        readers.append(asyncio.create_task(peer.read_loop()))
+    monitor = peers[0]
+    before = await monitor.request_stats()
+
+    # Two seats per session, spread over the connections
+    start = time.perf_counter()
+    for seat in range(2 * sessions):
+        peers[seat % connections].send(f"play {size}")
+        if seat % 1000 == 999:
+            await asyncio.sleep(0)
+    while sum(peer.started for peer in peers) < 2 * sessions:
+        await asyncio.sleep(0.05)
+    fill_time = time.perf_counter() - start
+    filled = await monitor.request_stats()
+
+    for peer in peers:
+        peer.start_playing()
+    start = time.perf_counter()
+    await asyncio.sleep(duration)
+    for peer in peers:
+        peer.playing = False
+    elapsed = time.perf_counter() - start
+    after = await monitor.request_stats()
+
+    for task in readers:
+        task.cancel()
+    for peer in peers:
+        peer.writer.close()
+    latencies = [latency for peer in peers for latency in peer.latencies]
+    finished = sum(peer.finished for peer in peers)
+    return before, filled, after, fill_time, elapsed, latencies, finished
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test for game_hub.py")
+    parser.add_argument('--host', default='127.0.0.1', help="hub address")
+    parser.add_argument('--port', type=int, default=9000, help="hub port")
+    parser.add_argument('--connections', type=int, default=100, help="client connections")
+    parser.add_argument('--sessions', type=int, default=10000, help="games to keep open")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds of play")
+    parser.add_argument('--size', type=int, default=3, help="board size")
+    parser.add_argument('--think', type=float, default=1.0,
+                        help="mean seconds a player waits before moving (0 = at once)")
+    parser.add_argument('--seed', type=int, default=0, help="RNG seed")
+    args = parser.parse_args()
+
+    try:
+        before, filled, after, fill_time, elapsed, latencies, finished = asyncio.run(run(
+            args.host, args.port, args.connections, args.sessions, args.duration,
+            args.size, args.think, args.seed))
+    except OSError as error:
+        sys.exit(f"error: cannot reach {args.host}:{args.port}: {error}")
+
+    sessions = int(filled['sessions']) - int(before['sessions'])
+    growth = (int(filled['rss_kb']) - int(before['rss_kb'])) * 1024
+    print(f"{sessions:,} sessions over {args.connections} connections "
+          f"started in {fill_time:.2f}s")
+    print(f"hub memory: {int(filled['rss_kb']) / 1024:.1f} MB resident, "
+          f"{growth / max(sessions, 1):,.0f} bytes per session")
+    print(f"{len(latencies):,} moves in {elapsed:.2f}s: {len(latencies) / elapsed:,.0f} moves/s, "
+          f"{finished:,} games finished")
+    if latencies:
+        print("move latency ms: " + "  ".join(
+            f"{name} {percentile(latencies, fraction) * 1000:.2f}"
+            for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))))
+    print("hub: " + "  ".join(f"{name} {value}" for name, value in after.items()))
+
+
+if __name__ == "__main__":
+    main()
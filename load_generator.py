@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Load Generator
+Drives move_service.py with many concurrent clients and reports throughput
+
+Each client keeps one HTTP/1.1 connection open and posts /move requests
+back to back, drawing boards at random from a fixed set of positions
+reached by random play. Fewer distinct positions means more cache hits
+and coalesced requests; many clients on few positions tests coalescing,
+many positions tests the search queue and its backpressure. The report
+gives requests per second, latency percentiles, the HTTP status counts
+and the service's own counters from /stats.
+
+Usage: python3 load_generator.py [--url http://127.0.0.1:8000] [--clients 50]
+                                 [--requests 10000] [--positions 500] [--size 3]
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+from benchmark import percentile
+from engine.protocol import format_board
+from game_logic import GameBoard
+
+
+def random_positions(count, size, win_length, seed):
+    """Distinct text boards reached by random play, none of them finished"""
+    rng = random.Random(seed)
+    positions = set()
+    cells = size * size
+    attempts = 0
+    while len(positions) < count and attempts < 100 * count:
+        attempts += 1
+        board = GameBoard(size, win_length)
+        for _ in range(rng.randrange(cells)):
+            symbol = board.current_player
+            board.push(rng.choice(board.get_empty_cells()))
+            if board.check_winner(symbol) or board.is_full():
+                break
+        else:
+            positions.add(format_board(board))
+    return sorted(positions)
+
+
+async def request(reader, writer, host, method, path, payload=None):
+    """One HTTP/1.1 request on an open connection; returns (status, body)"""
+    body = b'' if payload is None else json.dumps(payload).encode()
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+                  f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+                 .encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, positions, win_length, counter, latencies, statuses, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while counter[0] > 0:
+            counter[0] -= 1
+            payload = {'board': rng.choice(positions), 'win_length': win_length}
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, host, 'POST', '/move', payload)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def run(url, clients, requests, positions, win_length, seed):
+    """Send the requests; returns (seconds, latencies, status counts, service stats)"""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    counter = [requests]
+    latencies = []
+    statuses = collections.Counter()
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, positions, win_length, counter, latencies, statuses,
+               random.Random(rng.random()))
+        for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, body = await request(reader, writer, host, 'GET', '/stats')
+    finally:
+        writer.close()
+    return elapsed, latencies, statuses, json.loads(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for move_service.py")
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help="service address")
+    parser.add_argument('--clients', type=int, default=50, help="concurrent connections")
+    parser.add_argument('--requests', type=int, default=10000, help="requests to send in total")
+    parser.add_argument('--positions', type=int, default=500,
+                        help="distinct positions to draw requests from")
+    parser.add_argument('--size', type=int, default=3, help="board size")
+    parser.add_argument('--win-length', type=int, default=None, help="marks in a row to win")
+    parser.add_argument('--seed', type=int, default=0, help="RNG seed")
+    args = parser.parse_args()
+
+    win_length = args.win_length or args.size
+    positions = random_positions(args.positions, args.size, win_length, args.seed)
+    try:
+        elapsed, latencies, statuses, stats = asyncio.run(run(
+            args.url, args.clients, args.requests, positions, win_length, args.seed))
+    except OSError as error:
+        sys.exit(f"error: cannot reach {args.url}: {error}")
+
+    print(f"{len(latencies):,} requests over {args.clients} connections "
+          f"({len(positions)} positions) in {elapsed:.2f}s: "
+          f"{len(latencies) / elapsed:,.0f} requests/s")
+    print("latency ms: " + "  ".join(
+        f"{name} {percentile(latencies, fraction) * 1000:.2f}"
+        for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))))
+    print("status: " + "  ".join(f"{status} x{count:,}" for status, count in sorted(statuses.items())))
+    print("service: " + "  ".join(f"{name} {value:,.2f}" if isinstance(value, float)
+                                  else f"{name} {value:,}" for name, value in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
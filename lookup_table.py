@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Lookup Table Module
+Precomputed perfect play for the 3x3 board
+
+The generator solves every reachable position once and writes a compact
+binary file: a small header followed by one 16-bit entry per base-3
+position index. Only canonical (symmetry-reduced) positions are filled in;
+each entry holds the set of optimal moves for the side to move and the
+position's value. The loader memory-maps the file, so a lookup is a
+symmetry reduction plus a single indexed read.
+
+Usage: python3 lookup_table.py [output_path]
+"""
+
+import mmap
+import os
+import struct
+import sys
+import time
+
+from game_logic import Geometry
+
+MAGIC = b'TTTL'
+# Bump when the entry layout or the scoring changes; older files are stale
+TABLE_VERSION = 1
+HEADER = struct.Struct('<4sHBBI')
+ENTRY = struct.Struct('<H')
+
+SIZE = 3
+CELLS = SIZE * SIZE
+POSITIONS = 3 ** CELLS
+# Value of winning with the next move; each extra ply costs one point
+WIN_VALUE = 10
+VALUE_OFFSET = 16
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tictactoe_table.bin')
+
+GEOMETRY = Geometry.get(SIZE, SIZE)
+# Base-3 index contribution of each 9-bit mask (X counts 1, O counts 2)
+BASE3 = tuple(sum(3 ** i for i in range(CELLS) if mask >> i & 1)
+              for mask in range(GEOMETRY.full_mask + 1))
+
+
+def position_index(x_mask, o_mask):
+    """Base-3 index of a position"""
+    return BASE3[x_mask] + 2 * BASE3[o_mask]
+
+
+def inverse_transform(transform):
+    """The symmetry that undoes a transform (reflections are their own inverse)"""
+    return (4 - transform) % 4 if transform < 4 else transform
+
+
+def canonical_form(x_mask, o_mask):
+    """Return (x_mask, o_mask, transform) for the canonical image of a position"""
+    best = None
+    for t in range(8):
+        x_image = GEOMETRY.transform(x_mask, t)
+        o_image = GEOMETRY.transform(o_mask, t)
+        key = x_image | o_image << CELLS
+        if best is None or key < best[0]:
+            best = (key, x_image, o_image, t)
+    return best[1], best[2], best[3]
+
+
+def encode_entry(move_mask, value):
+    """Pack an optimal-move mask and a value into a 16-bit entry"""
+    return move_mask | (value + VALUE_OFFSET) << CELLS
+
+
+def decode_entry(entry):
+    """Unpack a 16-bit entry into (move_mask, value)"""
+    return entry & GEOMETRY.full_mask, (entry >> CELLS) - VALUE_OFFSET
+
+
+def solve_all():
+    """
+    Solve every reachable position
+    Returns {(x_mask, o_mask): (move_mask, value)} for non-terminal positions,
+    with the value seen from the side to move
+    """
+    solved = {}
+    lines = GEOMETRY.lines
+    full = GEOMETRY.full_mask
+
+    def move_value(mover, other):
+        # Value of the position after a move, seen from the player who moved
+        for line in lines:
+            if mover & line == line:
+                return WIN_VALUE
+        if mover | other == full:
+            return 0
+        child = solve(other, mover)
+        if child > 0:
+            return 1 - child
+        if child < 0:
+            return -1 - child
+        return 0
+
+    def solve(mover, other):
+        # mover is the side to move; keys are stored as (X, O) masks
+        x_to_move = mover.bit_count() == other.bit_count()
+        key = (mover, other) if x_to_move else (other, mover)
+        if key in solved:
+            return solved[key][1]
+        empty = full & ~(mover | other)
+        values = {}
+        while empty:
+            bit = empty & -empty
+            empty ^= bit
+            values[bit] = move_value(mover | bit, other)
+        best = max(values.values())
+        move_mask = 0
+        for bit, value in values.items():
+            if value == best:
+                move_mask |= bit
+        solved[key] = (move_mask, best)
+        return best
+
+    solve(0, 0)
+    return solved
+
+
+def generate(path=DEFAULT_PATH):
+    """Solve all positions and write the table; returns the number of entries"""
+    entries = [0] * POSITIONS
+    count = 0
+    for (x_mask, o_mask), (move_mask, value) in solve_all().items():
+        canon_x, canon_o, t = canonical_form(x_mask, o_mask)
+        index = position_index(canon_x, canon_o)
+        if entries[index]:
+            continue
+        entries[index] = encode_entry(GEOMETRY.transform(move_mask, t), value)
+        count += 1
+
+    data = bytearray(HEADER.size + ENTRY.size * POSITIONS)
+    HEADER.pack_into(data, 0, MAGIC, TABLE_VERSION, SIZE, SIZE, POSITIONS)
+    for index, entry in enumerate(entries):
+        ENTRY.pack_into(data, HEADER.size + ENTRY.size * index, entry)
+
+    # Write to a temporary file first so readers never see a partial table
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    return count
+
+
+class LookupTable:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+
+    def close(self):
+        """Release the memory map"""
+        self.data.close()
+
+    def is_current(self):
+        """Check that the file matches this version of the table layout"""
+        if len(self.data) != HEADER.size + ENTRY.size * POSITIONS:
+            return False
+        magic, version, size, win_length, count = HEADER.unpack_from(self.data, 0)
+        return (magic == MAGIC and version == TABLE_VERSION and size == SIZE
+                and win_length == SIZE and count == POSITIONS)
+
+    def probe(self, x_mask, o_mask):
+        """
+        Look up a position
+        Returns (move_mask, value) in the position's own orientation, or
+        None for terminal or unreachable positions
+        """
+        canon_x, canon_o, t = canonical_form(x_mask, o_mask)
+        index = position_index(canon_x, canon_o)
+        entry, = ENTRY.unpack_from(self.data, HEADER.size + ENTRY.size * index)
+        if not entry:
+            return None
+        move_mask, value = decode_entry(entry)
+        return GEOMETRY.transform(move_mask, inverse_transform(t)), value
+
+    def best_move(self, game_board, player):
+        """
+        Best move for player, or None if the table cannot answer
+        Among optimal moves the first in row-major order is returned,
+        matching the search
+        """
+        if game_board.size != SIZE or game_board.win_length != SIZE:
+            return None
+        x_mask = game_board.masks['X']
+        o_mask = game_board.masks['O']
+        x_to_move = x_mask.bit_count() == o_mask.bit_count()
+        if player != ('X' if x_to_move else 'O'):
+            return None
+        result = self.probe(x_mask, o_mask)
+        if result is None:
+            return None
+        move_mask = result[0]
+        return divmod((move_mask & -move_mask).bit_length() - 1, SIZE)
+
+
+_default_table = None
+_default_loaded = False
+
+
+def get_default_table():
+    """
+    Memory-map the default table once per process
+    Returns None if the file is missing, unreadable or stale
+    """
+    global _default_table, _default_loaded
+    if not _default_loaded:
+        _default_loaded = True
+        try:
+            table = LookupTable(DEFAULT_PATH)
+        except (OSError, ValueError):
+            table = None
+        if table is not None and not table.is_current():
+            table.close()
+            table = None
+        _default_table = table
+    return _default_table
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH
+    start = time.perf_counter()
+    count = generate(path)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {count} canonical positions to {path} "
+          f"({os.path.getsize(path)} bytes) in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,72 @@ Tic-Tac-Toe Game
 Main entry point for the application
 
 Features:
-- Play against AI (with minimax algorithm)
+- Play against AI (with minimax algorithm or Monte Carlo Tree Search)
 - Play against a friend (2-player mode)
+
+Usage: python3 main.py [size] [win_length] [--engine minimax|mcts] [--time-limit SECONDS]
+                       [--difficulty easy|medium|hard|expert] [--workers N]
+                       [--debug] [--profile FILE] [--record FILE]
 """
 
-import tkinter as tk
-from ui_interface import TicTacToeUI
+import argparse
 
 def main():
     """Initialize and run the game"""
-    root = tk.Tk()
-    app = TicTacToeUI(root)
-    root.mainloop()
+    parser = argparse.ArgumentParser(description="Tic-Tac-Toe")
+    parser.add_argument('size', type=int, nargs='?', default=3, help="board size")
+    parser.add_argument('win_length', type=int, nargs='?', default=None,
+                        help="marks in a row needed to win")
+    parser.add_argument('--engine', choices=('minimax', 'mcts'), default='minimax',
+                        help="AI engine")
+    parser.add_argument('--time-limit', type=float, default=1.0,
+                        help="seconds per move for the MCTS engine")
+    parser.add_argument('--difficulty', choices=('easy', 'medium', 'hard', 'expert'),
+                        help="minimax strength: depth and time caps (default: full strength)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="split each minimax search over N processes")
+    parser.add_argument('--debug', action='store_true',
+                        help="show search statistics under the board (toggle with F12)")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="write a cProfile dump of each minimax search to FILE")
+    parser.add_argument('--record', metavar='FILE',
+                        help="append every game to this game-record file")
+    args = parser.parse_args()
+    
+    recorder = None
+    if args.record:
+        from game_records import GameRecordWriter
+        try:
+            recorder = GameRecordWriter(args.record, args.size, args.win_length)
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+    
+    # GUI and engine modules are imported only once the arguments are valid,
+    # so --help and argument errors don't need tkinter or a display
+    import tkinter as tk
+    from ui_interface import TicTacToeUI
+    
+    if args.engine == 'mcts':
+        from mcts_player import MCTSPlayer
+        ai = MCTSPlayer(time_limit=args.time_limit)
+    elif args.workers:
+        from parallel_search import ParallelAI
+        ai = ParallelAI(workers=args.workers, profile_path=args.profile,
+                        difficulty=args.difficulty)
+    else:
+        from ai_player import TicTacToeAI
+        ai = TicTacToeAI(profile_path=args.profile, difficulty=args.difficulty)
+    
+    try:
+        root = tk.Tk()
+        app = TicTacToeUI(root, args.size, args.win_length, ai, args.debug, recorder)
+        root.mainloop()
+    finally:
+        if recorder is not None:
+            recorder.close()
+        # ParallelAI keeps a worker pool open
+        if hasattr(ai, 'close'):
+            ai.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,344 @@
+"""
+MCTS Module
+Monte Carlo Tree Search player for boards too large to search exhaustively
+
+The player has the same interface as TicTacToeAI (choose_move, get_best_move
+and stop), so it can be used anywhere TicTacToeAI is. Each search runs UCT selection
+with random playouts on plain integer bitboards, bounded by a wall-clock
+time limit and/or a playout count. The tree is kept between moves: when
+the opponent's reply is already in the explored subtree, that subtree
+becomes the new root. With workers > 1 the search is root-parallel:
+independent trees are grown in worker processes and their root statistics
+are merged.
+"""
+
+import math
+import random
+import time
+
+from game_logic import Geometry
+
+DEFAULT_TIME_LIMIT = 1.0
+DEFAULT_EXPLORATION = 1.41
+# Playout results, from the point of view of the player who just moved
+WIN_REWARD = 1.0
+DRAW_REWARD = 0.5
+
+
+class Node:
+    __slots__ = ('move', 'parent', 'children', 'untried', 'visits', 'wins',
+                 'mover', 'winner')
+
+    def __init__(self, move, parent, mover, untried, winner=None):
+        self.move = move          # cell index played to reach this node
+        self.parent = parent
+        self.children = []
+        self.untried = untried    # cell indices not expanded yet
+        self.visits = 0
+        self.wins = 0.0           # reward total for `mover`
+        self.mover = mover        # 0 = X, 1 = O: the player who played `move`
+        self.winner = winner      # None, 0, 1, or -1 for a draw (terminal nodes)
+
+
+def _candidates(geometry, masks):
+    """Moves to expand: every empty cell on small boards, otherwise cells
+    next to an existing mark (the center on an empty board)"""
+    occupied = masks[0] | masks[1]
+    if geometry.cells <= 9:
+        free = geometry.full_mask & ~occupied
+    elif not occupied:
+        center = geometry.size // 2
+        return [center * geometry.size + center]
+    else:
+        free = geometry.neighborhood(occupied) & ~occupied
+    moves = []
+    while free:
+        low = free & -free
+        moves.append(low.bit_length() - 1)
+        free ^= low
+    return moves
+
+
+def _wins(geometry, mask, index):
+    """Check if the mark just placed at index completed a line"""
+    for line in geometry.lines_through[index]:
+        if mask & line == line:
+            return True
+    return False
+
+
+def _playout(geometry, masks, to_move, rng, heavy):
+    """Play randomly to the end; returns the winner (0 or 1) or -1 for a draw"""
+    x_mask, o_mask = masks
+    occupied = x_mask | o_mask
+    empty = [i for i in range(geometry.cells) if not occupied >> i & 1]
+    lines_through = geometry.lines_through
+    masks = [x_mask, o_mask]
+    if not heavy:
+        # Shuffling once and playing in order is uniform random play
+        rng.shuffle(empty)
+        for index in empty:
+            mask = masks[to_move] | 1 << index
+            masks[to_move] = mask
+            for line in lines_through[index]:
+                if mask & line == line:
+                    return to_move
+            to_move ^= 1
+        return -1
+
+    # Heavy playouts: take a win if there is one, block the opponent's
+    # immediate win, otherwise play randomly
+    while empty:
+        mine, theirs = masks[to_move], masks[to_move ^ 1]
+        choice = None
+        for position, index in enumerate(empty):
+            if _wins(geometry, mine | 1 << index, index):
+                choice = position
+                break
+            if choice is None and _wins(geometry, theirs | 1 << index, index):
+                choice = position
+        if choice is None:
+            choice = rng.randrange(len(empty))
+        index = empty[choice]
+        empty[choice] = empty[-1]
+        empty.pop()
+        masks[to_move] = mine | 1 << index
+        if _wins(geometry, masks[to_move], index):
+            return to_move
+        to_move ^= 1
+    return -1
+
+
+def _grow(root, geometry, root_masks, rng, exploration, heavy, deadline, max_playouts,
+          should_stop=None):
+    """Run MCTS iterations on a tree; returns the number of playouts"""
+    playouts = 0
+    while True:
+        if max_playouts is not None and playouts >= max_playouts:
+            break
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        if should_stop is not None and should_stop():
+            break
+
+        # Selection
+        node = root
+        masks = list(root_masks)
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            best = None
+            best_value = -1.0
+            for child in node.children:
+                value = (child.wins / child.visits
+                         + exploration * math.sqrt(log_visits / child.visits))
+                if value > best_value:
+                    best, best_value = child, value
+            node = best
+            masks[node.mover] |= 1 << node.move
+
+        # Expansion
+        if node.untried and node.winner is None:
+            index = node.untried.pop(rng.randrange(len(node.untried)))
+            mover = node.mover ^ 1
+            masks[mover] |= 1 << index
+            if _wins(geometry, masks[mover], index):
+                winner = mover
+            elif masks[0] | masks[1] == geometry.full_mask:
+                winner = -1
+            else:
+                winner = None
+            untried = [] if winner is not None else _candidates(geometry, masks)
+            child = Node(index, node, mover, untried, winner)
+            node.children.append(child)
+            node = child
+
+        # Simulation
+        if node.winner is not None:
+            winner = node.winner
+        else:
+            winner = _playout(geometry, masks, node.mover ^ 1, rng, heavy)
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if winner == node.mover:
+                node.wins += WIN_REWARD
+            elif winner == -1:
+                node.wins += DRAW_REWARD
+            node = node.parent
+        playouts += 1
+    return playouts
+
+
+def _new_root(geometry, masks, to_move):
+    return Node(None, None, to_move ^ 1, _candidates(geometry, masks))
+
+
+# Per-process state, built once by the pool initializer
+_worker = {}
+
+
+def _init_worker(stop):
+    _worker['stop'] = stop
+
+
+def _stop_requested():
+    return bool(_worker['stop'].value)
+
+
+def _worker_search(task):
+    """Process pool entry: grow an independent tree, return root child stats"""
+    size, win_length, x_mask, o_mask, to_move, seed, exploration, heavy, time_limit, playouts = task
+    geometry = Geometry.get(size, win_length)
+    masks = (x_mask, o_mask)
+    root = _new_root(geometry, masks, to_move)
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    done = _grow(root, geometry, masks, random.Random(seed), exploration, heavy,
+                 deadline, playouts, _stop_requested)
+    return done, [(child.move, child.visits, child.wins) for child in root.children]
+
+
+class MCTSPlayer:
+    # Engine name used in game records
+    name = 'mcts'
+
+    def __init__(self, player='O', opponent='X', time_limit=DEFAULT_TIME_LIMIT,
+                 playouts=None, exploration=DEFAULT_EXPLORATION, heavy_playouts=False,
+                 workers=1, reuse_tree=True, seed=None):
+        self.player = player
+        self.opponent = opponent
+        self.time_limit = time_limit
+        self.playouts = playouts
+        self.exploration = exploration
+        self.heavy_playouts = heavy_playouts
+        self.workers = workers
+        self.reuse_tree = reuse_tree
+        self.rng = random.Random(seed)
+        self.pool = None
+        # Shared with the pool's workers, so stop() reaches them too
+        self.stop_flag = None
+        # Tree kept from the previous move, with the position at its root
+        self.root = None
+        self.root_masks = None
+        self.stop_requested = False
+        # Statistics of the last search
+        self.playouts_done = 0
+        self.playouts_per_sec = 0.0
+        self.nodes_searched = 0
+        self.tree_reused = False
+
+    def stop(self):
+        """Ask a search running on another thread to return its best move so far"""
+        self.stop_requested = True
+        if self.stop_flag is not None:
+            self.stop_flag.value = 1
+
+    def close(self):
+        """Shut down the worker pool, if one was started"""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def choose_move(self, game_board, time_budget=None):
+        """Player interface (see players.py): search for time_budget seconds,
+        or for time_limit if none is given"""
+        if time_budget is None:
+            return self.get_best_move(game_board)
+        time_limit = self.time_limit
+        self.time_limit = time_budget
+        try:
+            return self.get_best_move(game_board)
+        finally:
+            self.time_limit = time_limit
+
+    def get_best_move(self, game_board):
+        """Find the most visited move within the time/playout budget"""
+        self.stop_requested = False
+        geometry = game_board.geometry
+        masks = (game_board.masks['X'], game_board.masks['O'])
+        to_move = 0 if self.player == 'X' else 1
+        if (game_board.check_winner('X') or game_board.check_winner('O')
+                or game_board.is_full()):
+            return None
+
+        start = time.perf_counter()
+        if self.workers > 1:
+            visits = self.parallel_search(game_board, masks, to_move)
+        else:
+            visits = self.serial_search(geometry, masks, to_move)
+        elapsed = time.perf_counter() - start
+        self.nodes_searched = self.playouts_done
+        self.playouts_per_sec = self.playouts_done / elapsed if elapsed > 0 else 0.0
+
+        if not visits:
+            return None
+        move = max(visits, key=lambda index: (visits[index], -index))
+        return geometry.coords[move]
+
+    def find_root(self, geometry, masks, to_move):
+        """Reuse the stored tree if the position follows from its root"""
+        if not self.reuse_tree or self.root is None or self.root_masks is None:
+            return None
+        old_x, old_o = self.root_masks
+        x_mask, o_mask = masks
+        if x_mask & old_x != old_x or o_mask & old_o != old_o:
+            return None
+        if (self.root.mover ^ 1) == to_move and masks == self.root_masks:
+            return self.root
+        # The opponent played exactly one move since our last search
+        added = (x_mask ^ old_x, o_mask ^ old_o)
+        opponent = to_move ^ 1
+        if added[to_move] or added[opponent].bit_count() != 1:
+            return None
+        move = added[opponent].bit_length() - 1
+        for child in self.root.children:
+            if child.move == move:
+                child.parent = None
+                return child
+        return None
+
+    def serial_search(self, geometry, masks, to_move):
+        root = self.find_root(geometry, masks, to_move)
+        self.tree_reused = root is not None
+        if root is None:
+            root = _new_root(geometry, masks, to_move)
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self.playouts_done = _grow(root, geometry, masks, self.rng, self.exploration,
+                                   self.heavy_playouts, deadline, self.playouts,
+                                   lambda: self.stop_requested)
+        if not root.children:
+            return {}
+        best = max(root.children, key=lambda child: (child.visits, -child.move))
+        # Keep the subtree under our move for the next search
+        best.parent = None
+        self.root = best
+        new_masks = list(masks)
+        new_masks[to_move] |= 1 << best.move
+        self.root_masks = tuple(new_masks)
+        return {child.move: child.visits for child in root.children}
+
+    def parallel_search(self, game_board, masks, to_move):
+        if self.pool is None:
+            # Only parallel searches need multiprocessing, which is slow to import
+            import multiprocessing
+            self.stop_flag = multiprocessing.Value('b', 0, lock=False)
+            self.pool = multiprocessing.Pool(self.workers, _init_worker, (self.stop_flag,))
+        # A stop() since get_best_move started still counts
+        self.stop_flag.value = int(self.stop_requested)
+        # Each worker gets its share of the playout budget and its own seed
+        share = None if self.playouts is None else -(-self.playouts // self.workers)
+        tasks = [
+            (game_board.size, game_board.win_length, masks[0], masks[1], to_move,
+             self.rng.getrandbits(32), self.exploration, self.heavy_playouts,
+             self.time_limit, share)
+            for _ in range(self.workers)
+        ]
+        visits = {}
+        self.playouts_done = 0
+        self.tree_reused = False
+        self.root = None
+        for done, stats in self.pool.map(_worker_search, tasks):
+            self.playouts_done += done
+            for move, child_visits, _ in stats:
+                visits[move] = visits.get(move, 0) + child_visits
+        return visits
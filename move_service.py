@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Move Service
+AI moves over HTTP/JSON for many clients, built on asyncio
+
+POST /move with {"board": ..., "win_length": k} answers
+{"move": [row, col], "score": s, "cached": bool}, or a null move and
+score when the game is already over. The board is either the text form of
+engine/protocol.py ("X.O/.X./...") or a row-major list of cells with ''
+for empty, as script.js keeps it, and at most 15 cells a side (MAX_SIZE
+in engine/protocol.py). The score is the search score for the side to
+move (see ai_player.py). GET /stats reports the service counters, and
+the web version (index.html, script.js, style.css) is served from /,
+so the browser game asks this service for its moves.
+
+Requests are keyed by canonical (symmetry-reduced) position, and each
+answer is mapped back to the orientation it was asked in:
+- answers are kept in an LRU cache
+- concurrent requests for a position that is already being searched wait
+  for that search instead of starting another
+- new positions go into a bounded queue; a single batcher takes whatever
+  has queued up (up to batch_size, waiting at most batch_window for more)
+  and searches the whole batch in one call on the engine thread, where
+  the engines and their transposition tables stay warm; the batch shares
+  one time budget (--time-limit), so a full batch delays queued requests
+  no longer than a single search would
+
+Backpressure: at most max_concurrency requests are handled at once;
+further requests are read (bodies are capped at MAX_BODY) and then wait
+for a slot. When the queue is full, new positions are turned away at
+once with 503 and Retry-After, and a failed search answers 500.
+
+Usage: python3 move_service.py [--host 127.0.0.1] [--port 8000] [--time-limit 1.0]
+                               [--cache-size N] [--max-queue N] [--batch-size N]
+                               [--batch-window-ms MS] [--max-concurrency N]
+"""
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import time
+
+from ai_player import TicTacToeAI
+from game_logic import GameBoard
+from engine.protocol import ProtocolSession, parse_board
+from opening_book import canonical_form, inverse_transform
+
+DEFAULT_CACHE_SIZE = 100000
+DEFAULT_MAX_QUEUE = 1000
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_BATCH_WINDOW = 0.002
+DEFAULT_MAX_CONCURRENCY = 256
+DEFAULT_TIME_LIMIT = 1.0
+# Largest request body accepted, in bytes
+MAX_BODY = 1 << 16
+# Seconds a keep-alive connection may sit idle
+IDLE_TIMEOUT = 30
+
+STATIC_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_FILES = {
+    '/': ('index.html', 'text/html; charset=utf-8'),
+    '/index.html': ('index.html', 'text/html; charset=utf-8'),
+    '/script.js': ('script.js', 'text/javascript; charset=utf-8'),
+    '/style.css': ('style.css', 'text/css; charset=utf-8'),
+}
+REASONS = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class Busy(Exception):
+    """The search queue is full"""
+
+
+def board_from_json(request):
+    """GameBoard from a /move request body; raises ValueError"""
+    if not isinstance(request, dict):
+        raise ValueError("Expected a JSON object")
+    board = request.get('board')
+    if isinstance(board, list):
+        if not all(isinstance(cell, str) for cell in board):
+            raise ValueError("Board cells must be strings")
+        board = ''.join(cell or '.' for cell in board)
+    if not isinstance(board, str):
+        raise ValueError("Missing board")
+    win_length = request.get('win_length')
+    if win_length is not None and (not isinstance(win_length, int)
+                                   or isinstance(win_length, bool)):
+        raise ValueError("win_length must be an integer")
+    # parse_board caps the board size and checks win_length against it
+    return parse_board(board, win_length)
+
+
+def canonical_position(game_board):
+    """(key, transform) shared by all symmetric images of a position
+    Boards too large for symmetry tables use the raw position"""
+    geometry = game_board.geometry
+    x_mask, o_mask = game_board.masks['X'], game_board.masks['O']
+    if geometry.symmetries is None:
+        return x_mask | o_mask << geometry.cells, 0
+    return canonical_form(geometry, x_mask, o_mask)
+
+
+def transformed_board(game_board, transform):
+    """A new board holding the image of a position under a symmetry"""
+    geometry = game_board.geometry
+    board = GameBoard(game_board.size, game_board.win_length)
+    for player in ('X', 'O'):
+        mask = game_board.masks[player]
+        if transform:
+            mask = geometry.transform(mask, transform)
+        while mask:
+            low = mask & -mask
+            board.make_move(*divmod(low.bit_length() - 1, board.size), player)
+            mask ^= low
+    board.current_player = game_board.current_player
+    return board
+
+
+class MoveService:
+    def __init__(self, make_engine=None, cache_size=DEFAULT_CACHE_SIZE,
+                 max_queue=DEFAULT_MAX_QUEUE, batch_size=DEFAULT_BATCH_SIZE,
+                 batch_window=DEFAULT_BATCH_WINDOW, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 time_limit=DEFAULT_TIME_LIMIT):
+        if make_engine is None:
+            def make_engine(player, opponent):
+                return TicTacToeAI(player, opponent, time_limit=DEFAULT_TIME_LIMIT)
+        self.session = ProtocolSession(make_engine)
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        # Seconds shared by all the searches of one batch
+        self.time_limit = time_limit
+        # (size, win_length, canonical key) -> (canonical cell or -1, score)
+        self.cache = collections.OrderedDict()
+        # Same key -> future of the search in progress
+        self.pending = {}
+        self.queue = asyncio.Queue(max_queue)
+        self.slots = asyncio.Semaphore(max_concurrency)
+        # Engines are not thread-safe: every search runs on this one thread
+        self.executor = concurrent.futures.ThreadPoolExecutor(1)
+        self.batcher = None
+        self.counters = collections.Counter()
+
+    def start(self):
+        self.batcher = asyncio.get_running_loop().create_task(self.run_batches())
+
+    async def close(self):
+        if self.batcher is not None:
+            self.batcher.cancel()
+            try:
+                await self.batcher
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown()
+
+    async def best_move(self, game_board):
+        """((row, col) or None, score or None, cached) for the side to move"""
+        self.counters['requests'] += 1
+        if (game_board.check_winner('X') or game_board.check_winner('O')
+                or game_board.is_full()):
+            return None, None, False
+        canonical_key, transform = canonical_position(game_board)
+        key = (game_board.size, game_board.win_length, canonical_key)
+
+        cached = True
+        result = self.cache.get(key)
+        if result is not None:
+            self.cache.move_to_end(key)
+            self.counters['cache_hits'] += 1
+        else:
+            cached = False
+            future = self.pending.get(key)
+            if future is not None:
+                self.counters['coalesced'] += 1
+            else:
+                if self.queue.full():
+                    self.counters['rejected'] += 1
+                    raise Busy
+                future = self.pending[key] = asyncio.get_running_loop().create_future()
+                # Search the canonical image, so every orientation maps back alike
+                self.queue.put_nowait((key, transformed_board(game_board, transform), future))
+            result = await asyncio.shield(future)
+
+        cell, score = result
+        if cell < 0:
+            return None, score, cached
+        if transform:
+            geometry = game_board.geometry
+            cell = geometry.transform(1 << cell, inverse_transform(transform)).bit_length() - 1
+        return divmod(cell, game_board.size), score, cached
+
+    async def run_batches(self):
+        """Take queued positions in batches and search each batch on the engine thread"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0 and self.queue.empty():
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), max(timeout, 0)))
+                except asyncio.TimeoutError:
+                    break
+            self.counters['batches'] += 1
+            self.counters['searched'] += len(batch)
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.search_batch, [board for _, board, _ in batch])
+            except Exception as error:
+                for key, _, future in batch:
+                    del self.pending[key]
+                    future.set_exception(error)
+                continue
+            for (key, _, future), result in zip(batch, results):
+                del self.pending[key]
+                self.cache[key] = result
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+                future.set_result(result)
+
+    def search_batch(self, boards):
+        """Engine thread: (cell or -1, score) per board; the time left of the
+        batch budget is split evenly over the boards not yet searched"""
+        deadline = time.perf_counter() + self.time_limit
+        results = []
+        for searched, board in enumerate(boards):
+            engine = self.session.engine_for(board)
+            budget = max(0.0, deadline - time.perf_counter()) / (len(boards) - searched)
+            move = engine.choose_move(board, budget)
+            stats = getattr(engine, 'last_stats', None)
+            score = None if stats is None else stats.best_score
+            results.append((-1 if move is None else move[0] * board.size + move[1], score))
+        return results
+
+    def stats(self):
+        counters = self.counters
+        return {
+            'requests': counters['requests'],
+            'cache_hits': counters['cache_hits'],
+            'coalesced': counters['coalesced'],
+            'searched': counters['searched'],
+            'batches': counters['batches'],
+            'mean_batch': counters['searched'] / counters['batches'] if counters['batches'] else 0.0,
+            'rejected': counters['rejected'],
+            'queued': self.queue.qsize(),
+            'cache_size': len(self.cache),
+        }
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes"""
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.respond(writer, 400, {'error': "Malformed request line"}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1')
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.respond(writer, 400, {'error': "Bad Content-Length"}, False)
+                    break
+                if length > MAX_BODY:
+                    await self.respond(writer, 413, {'error': "Request too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                async with self.slots:
+                    status, payload, extra = await self.route(method, path.split('?')[0], body)
+                await self.respond(writer, status, payload, keep_alive, extra)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        """(status, JSON-able payload or (bytes, content type), extra headers)"""
+        if method == 'OPTIONS':
+            return 204, None, {}
+        if path == '/move':
+            if method != 'POST':
+                return 405, {'error': "Use POST"}, {}
+            try:
+                board = board_from_json(json.loads(body or b'null'))
+            except ValueError as error:
+                return 400, {'error': str(error)}, {}
+            try:
+                move, score, cached = await self.best_move(board)
+            except Busy:
+                return 503, {'error': "Busy, try again shortly"}, {'Retry-After': '1'}
+            except Exception as error:
+                return 500, {'error': f"Search failed: {error}"}, {}
+            return 200, {'move': None if move is None else list(move),
+                         'score': score, 'cached': cached}, {}
+        if path == '/stats' and method == 'GET':
+            return 200, self.stats(), {}
+        if path in STATIC_FILES and method == 'GET':
+            name, content_type = STATIC_FILES[path]
+            try:
+                with open(os.path.join(STATIC_DIR, name), 'rb') as f:
+                    return 200, (f.read(), content_type), {}
+            except OSError:
+                pass
+        return 404, {'error': "Not found"}, {}
+
+    async def respond(self, writer, status, payload, keep_alive, extra=None):
+        if payload is None:
+            data, content_type = b'', 'application/json'
+        elif isinstance(payload, tuple):
+            data, content_type = payload
+        else:
+            data, content_type = json.dumps(payload).encode(), 'application/json'
+        headers = [
+            f"HTTP/1.1 {status} {REASONS[status]}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(data)}",
+            # The page may be opened from another origin, e.g. a local file
+            "Access-Control-Allow-Origin: *",
+            "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+            "Access-Control-Allow-Headers: Content-Type",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        headers.extend(f"{name}: {value}" for name, value in (extra or {}).items())
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + data)
+        await writer.drain()
+
+
+async def serve(service, host, port, ready=None):
+    """Run the service until cancelled; ready(server) is called once listening"""
+    service.start()
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    if ready is not None:
+        ready(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON AI move service")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=8000, help="port to listen on")
+    parser.add_argument('--time-limit', type=float, default=DEFAULT_TIME_LIMIT,
+                        help="seconds shared by each batch of searches")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help="positions kept in the LRU cache")
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help="positions waiting for a search before requests get 503")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="most positions searched per batch")
+    parser.add_argument('--batch-window-ms', type=float, default=DEFAULT_BATCH_WINDOW * 1000,
+                        help="how long a batch waits to fill up")
+    parser.add_argument('--max-concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="requests handled at once")
+    args = parser.parse_args()
+
+    def make_engine(player, opponent):
+        return TicTacToeAI(player, opponent, time_limit=args.time_limit)
+
+    async def run():
+        service = MoveService(make_engine, args.cache_size, args.max_queue, args.batch_size,
+                              args.batch_window_ms / 1000, args.max_concurrency,
+                              args.time_limit)
+        await serve(service, args.host, args.port,
+                    lambda server: print(f"Serving on http://{args.host}:{args.port}/", flush=True))
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
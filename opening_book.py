@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Opening Book Module
+Precomputed AI moves for the first plies of a game, kept on disk
+
+The first AI reply is the most expensive search of a game on boards too
+large for the lookup table. The book builder searches every position with
+fewer than `plies` marks once, offline, and stores the result per
+canonical (symmetry-reduced) position: the set of best moves for the side
+to move and their score. Entries are sorted by key in a compact binary
+file; the loader memory-maps it on first use and finds positions by
+binary search.
+
+The header records a fingerprint of the search settings
+(ai_player.search_fingerprint), so a book built by a different version of
+the engine is ignored until it is rebuilt.
+
+Usage: python3 opening_book.py [--size 4] [--win-length 3] [--plies 4] [--output FILE]
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import time
+
+from game_logic import GameBoard, Geometry, SYMMETRY_MAX_CELLS
+from ai_player import TicTacToeAI, search_fingerprint
+
+MAGIC = b'TTTB'
+# Bump when the file layout changes
+BOOK_VERSION = 1
+# magic, layout version, size, win length, plies, search fingerprint, entries
+HEADER = struct.Struct('<4sHBBBxII')
+# canonical key, best-move mask (canonical orientation), score
+ENTRY = struct.Struct('<QIi')
+
+DEFAULT_PLIES = 4
+BOOK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def default_path(size, win_length):
+    return os.path.join(BOOK_DIR, f'opening_book_{size}x{size}_k{win_length}.bin')
+
+
+def canonical_form(geometry, x_mask, o_mask):
+    """Return (key, transform) for the canonical image of a position"""
+    shift = geometry.cells
+    return min(
+        (geometry.transform(x_mask, t) | geometry.transform(o_mask, t) << shift, t)
+        for t in range(8)
+    )
+
+
+def inverse_transform(transform):
+    """The symmetry that undoes a transform (reflections are their own inverse)"""
+    return (4 - transform) % 4 if transform < 4 else transform
+
+
+def opening_positions(size, win_length, plies):
+    """One board per canonical non-terminal position with fewer than plies marks"""
+    geometry = Geometry.get(size, win_length)
+    layer = {geometry.canonical_key(0, 0): GameBoard(size, win_length)}
+    for marks in range(plies):
+        next_layer = {}
+        for board in layer.values():
+            yield board
+            if marks + 1 == plies:
+                continue
+            player = board.current_player
+            for row, col in board.get_empty_cells():
+                child = board.copy()
+                child.make_move(row, col, player)
+                if child.check_winner(player) or child.is_full():
+                    continue
+                child.switch_player()
+                next_layer.setdefault(child.canonical_key(), child)
+        layer = next_layer
+
+
+def generate(size, win_length, plies=DEFAULT_PLIES, path=None, report=None):
+    """Search every opening position and write the book; returns the entry count"""
+    geometry = Geometry.get(size, win_length)
+    if geometry.symmetries is None:
+        raise ValueError(f"Opening books need boards of at most {SYMMETRY_MAX_CELLS} cells")
+    path = path or default_path(size, win_length)
+    ais = {'X': TicTacToeAI('X', 'O', use_lookup=False, use_book=False),
+           'O': TicTacToeAI('O', 'X', use_lookup=False, use_book=False)}
+    entries = []
+    for board in opening_positions(size, win_length, plies):
+        scores = ais[board.current_player].score_moves(board)
+        best = max(score for _, score in scores)
+        move_mask = 0
+        for (row, col), score in scores:
+            if score == best:
+                move_mask |= 1 << (row * size + col)
+        key, t = canonical_form(geometry, board.masks['X'], board.masks['O'])
+        entries.append((key, geometry.transform(move_mask, t), best))
+        if report and len(entries) % 100 == 0:
+            report(f"{len(entries):,} positions searched")
+    entries.sort()
+
+    data = bytearray(HEADER.size + ENTRY.size * len(entries))
+    HEADER.pack_into(data, 0, MAGIC, BOOK_VERSION, size, win_length, plies,
+                     search_fingerprint(), len(entries))
+    for n, entry in enumerate(entries):
+        ENTRY.pack_into(data, HEADER.size + ENTRY.size * n, *entry)
+
+    # Write to a temporary file first so readers never see a partial book
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    return len(entries)
+
+
+class OpeningBook:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        if len(self.data) < HEADER.size:
+            raise ValueError(f"{path} is too short for an opening book")
+        (self.magic, self.version, self.size, self.win_length, self.plies,
+         self.fingerprint, self.count) = HEADER.unpack_from(self.data, 0)
+        self.geometry = Geometry.get(self.size, self.win_length)
+
+    def close(self):
+        """Release the memory map"""
+        self.data.close()
+
+    def is_current(self):
+        """Check the layout and that the book was built by this search"""
+        return (self.magic == MAGIC and self.version == BOOK_VERSION
+                and self.fingerprint == search_fingerprint()
+                and len(self.data) == HEADER.size + ENTRY.size * self.count)
+
+    def probe(self, x_mask, o_mask):
+        """
+        Look up a position
+        Returns (move_mask, score) in the position's own orientation, or
+        None if the position is not in the book
+        """
+        key, t = canonical_form(self.geometry, x_mask, o_mask)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry = ENTRY.unpack_from(self.data, HEADER.size + ENTRY.size * middle)
+            if entry[0] < key:
+                low = middle + 1
+            elif entry[0] > key:
+                high = middle
+            else:
+                return self.geometry.transform(entry[1], inverse_transform(t)), entry[2]
+        return None
+
+    def best_move(self, game_board, player):
+        """
+        Book move for player, or None if the book cannot answer
+        Among equally good moves the first in row-major order is returned,
+        matching the search
+        """
+        x_mask = game_board.masks['X']
+        o_mask = game_board.masks['O']
+        x_count = x_mask.bit_count()
+        o_count = o_mask.bit_count()
+        if x_count + o_count >= self.plies:
+            return None
+        if player != ('X' if x_count == o_count else 'O'):
+            return None
+        result = self.probe(x_mask, o_mask)
+        if result is None:
+            return None
+        move_mask = result[0]
+        return divmod((move_mask & -move_mask).bit_length() - 1, self.size)
+
+
+_books = {}
+
+
+def get_book(size, win_length):
+    """
+    Memory-map the book for a board shape once per process
+    Returns None if the file is missing, unreadable or stale
+    """
+    key = (size, win_length)
+    if key not in _books:
+        try:
+            book = OpeningBook(default_path(size, win_length))
+        except (OSError, ValueError):
+            book = None
+        if book is not None and not book.is_current():
+            book.close()
+            book = None
+        _books[key] = book
+    return _books[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book")
+    parser.add_argument('--size', type=int, default=4, help="board size")
+    parser.add_argument('--win-length', type=int, default=None, help="marks in a row to win")
+    parser.add_argument('--plies', type=int, default=DEFAULT_PLIES,
+                        help="book positions with fewer than this many marks")
+    parser.add_argument('--output', help="book file (default: next to this module)")
+    args = parser.parse_args()
+
+    win_length = args.win_length or args.size
+    path = args.output or default_path(args.size, win_length)
+    start = time.perf_counter()
+    try:
+        count = generate(args.size, win_length, args.plies, path, report=print)
+    except ValueError as error:
+        parser.error(str(error))
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {count} positions to {path} ({os.path.getsize(path)} bytes) "
+          f"in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
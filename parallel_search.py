@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Parallel Search
+Root-split alpha-beta over a persistent process pool
+
+ParallelAI is a TicTacToeAI whose search hands the subtrees below the
+root moves (or, with split_depth=2, below every root move and reply) to
+worker processes. Tasks are a handful of ints: the board shape, the two
+masks and the move indexes, so IPC stays small. Workers share the best
+root score found so far through shared memory and read it before each
+subtree, so later subtrees search with a raised bound; at split depth 2
+they also share each root move's best reply so far, and skip replies
+once the move is refuted. The pool and each worker's engine (with its
+transposition table) are kept from one move to the next.
+
+The shared bound carries the best move's cell as well as its score, so
+workers apply the serial search's tie rule (the bound lowered by one for
+moves before the best in row-major order) and the move chosen is always
+the serial search's. The first root move is searched before the others
+are handed out, so they start with a bound. Searches with a time limit
+run serially, as do positions answered by the lookup table or a book.
+
+Run as a script to compare with the serial search on random positions:
+
+Usage: python3 parallel_search.py [--size 7] [--win-length 4] [--depth 4]
+                                  [--positions 10] [--workers N] [--split 1]
+"""
+
+import argparse
+import multiprocessing
+import time
+
+from ai_player import SearchTimeout, TicTacToeAI, WIN_SCORE, default_depth
+from game_logic import GameBoard
+from search_stats import SearchStats, RootMoveStats
+
+# Shared-memory sentinels: no root score yet, no reply searched yet
+NO_BOUND = -(1 << 62)
+NO_BETA = 1 << 62
+# The shared bound packs the best root score with its cell index, so that
+# the ordering of the packed values settles ties in row-major order
+CELL_BITS = 12
+CELL_LIMIT = (1 << CELL_BITS) - 1
+
+
+def bound_key(score, cell):
+    """Pack a root score and its cell; a bigger key is a better move"""
+    return score * (1 << CELL_BITS) + CELL_LIMIT - cell
+
+
+# Per-process state, built once by the pool initializer
+_worker = {}
+
+
+class _WorkerAI(TicTacToeAI):
+    """Worker engine that stops when the pool's shared stop flag is set"""
+
+    @property
+    def stop_requested(self):
+        return bool(_worker['stop'].value)
+
+    @stop_requested.setter
+    def stop_requested(self, value):
+        pass
+
+
+def _init_worker(player, opponent, table_size, bound, stop, betas, replies_left):
+    ai = _WorkerAI(player, opponent, table_size=table_size, use_lookup=False, use_book=False)
+    # Never reached, but makes minimax check the stop flag as it goes
+    ai.deadline = float('inf')
+    _worker['ai'] = ai
+    _worker['bound'] = bound
+    _worker['stop'] = stop
+    _worker['betas'] = betas
+    _worker['replies_left'] = replies_left
+
+
+def _raise_bound(score, cell):
+    """Publish a finished root move's score if it is the best so far"""
+    key = bound_key(score, cell)
+    bound = _worker['bound']
+    with bound.get_lock():
+        if key > bound.value:
+            bound.value = key
+
+
+def _search_task(task):
+    """Search one subtree; returns (root, score, counters), with score None
+    if the search was stopped"""
+    if _worker['stop'].value:
+        return task[4], None, None
+    ai = _worker['ai']
+    start = time.process_time()
+    ai.nodes_searched = 0
+    ai.max_ply = 0
+    hits, misses = ai.table.hits, ai.table.misses
+    try:
+        root, score = _search_subtree(ai, *task)
+    except SearchTimeout:
+        return task[4], None, None
+    # CPU time, so that summed over workers it shows how busy they were
+    counters = (ai.nodes_searched, time.process_time() - start, ai.max_ply,
+                ai.table.hits - hits, ai.table.misses - misses)
+    return root, score, counters
+
+
+def _search_subtree(ai, size, win_length, x_mask, o_mask, root, move, reply, limit):
+    board = GameBoard.from_masks(size, win_length, x_mask, o_mask)
+    board.make_move(*board.geometry.coords[move], ai.player)
+    key = _worker['bound'].value
+    if key == NO_BOUND:
+        alpha = float('-inf')
+    else:
+        # As in the serial search: one below the best so far if this move
+        # precedes the best in row-major order, so a tie still gets an
+        # exact score; a later move only matters if it does better
+        best = key >> CELL_BITS
+        alpha = best - 1 if move < CELL_LIMIT - (key & CELL_LIMIT) else best
+    if reply < 0:
+        score = ai.minimax(board, 0, False, alpha, float('inf'), limit)
+        _raise_bound(score, move)
+        return root, score
+
+    betas = _worker['betas']
+    beta = betas[root]
+    beta = float('inf') if beta == NO_BETA else beta
+    if alpha >= beta:
+        # Another reply already holds the move below the best
+        score = beta
+    else:
+        board.make_move(*board.geometry.coords[reply], ai.opponent)
+        score = ai.minimax(board, 1, True, alpha, beta, limit)
+    # The worker finishing a root move's last reply publishes its score
+    replies_left = _worker['replies_left']
+    with betas.get_lock():
+        if score < betas[root]:
+            betas[root] = score
+        replies_left[root] -= 1
+        finished = not replies_left[root]
+        value = betas[root]
+    if finished:
+        _raise_bound(value, move)
+    return root, score
+
+
+class ParallelAI(TicTacToeAI):
+    # Engine name used in game records
+    name = 'minimax-parallel'
+
+    def __init__(self, player='O', opponent='X', max_depth=None, workers=None,
+                 split_depth=1, **kwargs):
+        if split_depth not in (1, 2):
+            raise ValueError("split_depth must be 1 or 2")
+        super().__init__(player, opponent, max_depth, **kwargs)
+        self.workers = workers or multiprocessing.cpu_count()
+        self.split_depth = split_depth
+        self.table_size = kwargs.get('table_size', 100000)
+        self.pool = None
+        self.bound = None
+        self.stop_flag = None
+        self.betas = None
+        self.replies_left = None
+
+    def start_pool(self, cells):
+        """The worker pool, started on first use; restarted only if a
+        bigger board needs more room for per-move bounds"""
+        if self.pool is not None and len(self.betas) >= cells:
+            return self.pool
+        self.close()
+        self.bound = multiprocessing.Value('q', NO_BOUND)
+        self.stop_flag = multiprocessing.Value('b', 0, lock=False)
+        self.betas = multiprocessing.Array('q', cells)
+        # Guarded by the lock of betas
+        self.replies_left = multiprocessing.Array('q', cells, lock=False)
+        self.pool = multiprocessing.Pool(
+            self.workers, _init_worker,
+            (self.player, self.opponent, self.table_size, self.bound,
+             self.stop_flag, self.betas, self.replies_left))
+        return self.pool
+
+    def close(self):
+        """Shut the worker pool down"""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stop(self):
+        super().stop()
+        if self.stop_flag is not None:
+            self.stop_flag.value = 1
+
+    def search(self, game_board):
+        """get_best_move body: the root moves' subtrees are searched by the pool"""
+        if self.time_limit is not None:
+            return super().search(game_board)
+        start = time.perf_counter()
+        stats = self.last_stats = SearchStats()
+        self.stop_requested = False
+        move = self.probe_tables(game_board, stats)
+        if move is not None:
+            stats.wall_time = time.perf_counter() - start
+            return move
+
+        board = game_board.copy()
+        size = board.size
+        cells = board.geometry.cells
+        limit = self.max_depth or default_depth(board)
+        # A depth-1 search has no replies to split over
+        split_depth = self.split_depth if limit is None or limit >= 2 else 1
+        pool = self.start_pool(cells)
+        self.bound.value = NO_BOUND
+        self.stop_flag.value = 0
+
+        moves = self.order_moves(board, self.candidate_moves(board), -1)
+        shape = (size, board.win_length, board.masks['X'], board.masks['O'])
+        tasks = []
+        # Per root move: replies still out, lowest score so far, nodes, CPU seconds
+        pending = [0] * len(moves)
+        scores = [float('inf')] * len(moves)
+        nodes = [0] * len(moves)
+        seconds = [0.0] * len(moves)
+        for root, (row, col) in enumerate(moves):
+            index = row * size + col
+            board.make_move(row, col, self.player)
+            if board.check_winner(self.player):
+                scores[root] = WIN_SCORE
+            elif board.is_full():
+                scores[root] = 0
+            elif split_depth == 1:
+                tasks.append(shape + (root, index, -1, limit))
+                pending[root] = 1
+            else:
+                replies = self.order_moves(board, self.candidate_moves(board), 0)
+                self.betas[root] = NO_BETA
+                self.replies_left[root] = len(replies)
+                tasks.extend(shape + (root, index, reply_row * size + reply_col, limit)
+                             for reply_row, reply_col in replies)
+                pending[root] = len(replies)
+            board.pop()
+        # Root moves that end the game need no search
+        self.bound.value = max((bound_key(scores[root], row * size + col)
+                                for root, (row, col) in enumerate(moves) if not pending[root]),
+                               default=NO_BOUND)
+
+        # The first move (best by move ordering) is searched before the rest
+        # are handed out, so they start with its score as a bound
+        first = [task for task in tasks if task[4] == tasks[0][4]] if tasks else []
+        stopped = False
+        for batch in (first, tasks[len(first):]):
+            for root, score, counters in pool.imap_unordered(_search_task, batch):
+                if score is None:
+                    stopped = True
+                    continue
+                task_nodes, task_seconds, max_ply, hits, misses = counters
+                scores[root] = min(scores[root], score)
+                nodes[root] += task_nodes
+                seconds[root] += task_seconds
+                pending[root] -= 1
+                stats.max_depth = max(stats.max_depth, max_ply)
+                stats.cache_hits += hits
+                stats.cache_misses += misses
+
+        best_move = None
+        best_score = float('-inf')
+        for root, move in enumerate(moves):
+            if pending[root]:
+                continue
+            stats.root_moves.append(RootMoveStats(move, scores[root], seconds[root], nodes[root]))
+            if scores[root] > best_score or (scores[root] == best_score and move < best_move):
+                best_move, best_score = move, scores[root]
+        if best_move is None and moves:
+            # Stopped before any move was finished
+            best_move = moves[0]
+
+        stats.nodes = self.nodes_searched = sum(nodes)
+        stats.best_move = best_move
+        stats.best_score = None if best_score == float('-inf') else best_score
+        stats.timed_out = stopped
+        stats.workers = self.workers
+        stats.worker_time = sum(seconds)
+        stats.wall_time = time.perf_counter() - start
+        return best_move
+
+
+def compare(boards, max_depth, workers, split_depth):
+    """Time the serial and parallel searches on the same boards; returns
+    (serial seconds, parallel seconds, serial nodes, parallel nodes, moves
+    that differ)"""
+    serial_time = parallel_time = 0.0
+    serial_nodes = parallel_nodes = 0
+    mismatches = 0
+    with ParallelAI('X', 'O', max_depth, workers, split_depth, use_lookup=False,
+                    use_book=False) as parallel_x, \
+            ParallelAI('O', 'X', max_depth, workers, split_depth, use_lookup=False,
+                       use_book=False) as parallel_o:
+        parallel = {'X': parallel_x, 'O': parallel_o}
+        # Start the pools before timing anything
+        for ai in parallel.values():
+            ai.start_pool(boards[0].geometry.cells)
+        for board in boards:
+            player = board.current_player
+            opponent = 'O' if player == 'X' else 'X'
+            serial = TicTacToeAI(player, opponent, max_depth, use_lookup=False, use_book=False)
+            start = time.perf_counter()
+            expected = serial.get_best_move(board)
+            serial_time += time.perf_counter() - start
+            serial_nodes += serial.nodes_searched
+
+            start = time.perf_counter()
+            move = parallel[player].get_best_move(board)
+            parallel_time += time.perf_counter() - start
+            parallel_nodes += parallel[player].nodes_searched
+            mismatches += move != expected
+    return serial_time, parallel_time, serial_nodes, parallel_nodes, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel root-split search vs serial search")
+    parser.add_argument('--size', type=int, default=7, help="board size")
+    parser.add_argument('--win-length', type=int, default=4, help="marks in a row to win")
+    parser.add_argument('--depth', type=int, default=4, help="search depth (0 = default for the board)")
+    parser.add_argument('--positions', type=int, default=10, help="random positions to search")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--split', type=int, choices=(1, 2), default=1,
+                        help="split below root moves (1) or below replies too (2)")
+    parser.add_argument('--seed', type=int, default=0, help="RNG seed")
+    args = parser.parse_args()
+
+    from engine.protocol import parse_board
+    from load_generator import random_positions
+    boards = [parse_board(text, args.win_length) for text in
+              random_positions(args.positions, args.size, args.win_length, args.seed)]
+    workers = args.workers or multiprocessing.cpu_count()
+    serial_time, parallel_time, serial_nodes, parallel_nodes, mismatches = compare(
+        boards, args.depth or None, workers, args.split)
+
+    print(f"{len(boards)} positions on {args.size}x{args.size} ({args.win_length} in a row), "
+          f"depth {args.depth or 'default'}, {workers} workers, split depth {args.split}")
+    print(f"serial:   {serial_time:8.2f}s  {serial_nodes:>12,} nodes")
+    print(f"parallel: {parallel_time:8.2f}s  {parallel_nodes:>12,} nodes")
+    print(f"speedup {serial_time / parallel_time:.2f}x, "
+          f"search overhead {parallel_nodes / max(serial_nodes, 1):.2f}x nodes, "
+          f"{mismatches} moves differ from the serial search")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Players Module
+The player interface shared by every engine, and a factory for building them
+
+A player is created for one side, as Player(player, opponent), and offers:
+- choose_move(game_board, time_budget=None) -> (row, col), or None if the
+  game is over; time_budget is a soft limit in seconds, ignored by
+  engines without time control
+- stop() to make a search running on another thread return early
+- name, the engine name used in game records and tables
+
+TicTacToeAI, MCTSPlayer and RandomPlayer implement it, and UltimateAI
+does for ultimate boards. Players are described by spec strings:
+
+    minimax            TicTacToeAI (full search, table/book when available)
+    minimax:N          TicTacToeAI limited to N plies
+    minimax:LEVEL      TicTacToeAI at a difficulty level (easy, medium, hard, expert)
+    parallel[:WORKERS] ParallelAI: full search split over WORKERS processes
+                       (default: one per core; not inside other worker pools)
+    mcts[:SECONDS]     MCTSPlayer with SECONDS per move (default 1)
+    random             RandomPlayer
+    module.Class       any class with the interface, imported by name
+"""
+
+import importlib
+import random
+
+
+class RandomPlayer:
+    name = 'random'
+
+    def __init__(self, player='O', opponent='X', seed=None):
+        self.player = player
+        self.opponent = opponent
+        self.rng = random.Random(seed)
+
+    def stop(self):
+        pass
+
+    def choose_move(self, game_board, time_budget=None):
+        """Pick a uniformly random empty cell"""
+        if (game_board.check_winner(self.player) or game_board.check_winner(self.opponent)
+                or game_board.is_full()):
+            return None
+        return self.rng.choice(game_board.get_empty_cells())
+
+
+def make_player(spec, player, opponent, seed=None):
+    """Build a player for one side from a spec string; raises ValueError"""
+    name, _, arg = spec.partition(':')
+    try:
+        if name == 'minimax':
+            from ai_player import DIFFICULTY_LEVELS, TicTacToeAI
+            if arg in DIFFICULTY_LEVELS:
+                return TicTacToeAI(player, opponent, difficulty=arg)
+            return TicTacToeAI(player, opponent, max_depth=int(arg) if arg else None)
+        if name == 'parallel':
+            from parallel_search import ParallelAI
+            return ParallelAI(player, opponent, workers=int(arg) if arg else None)
+        if name == 'mcts':
+            from mcts_player import MCTSPlayer
+            return MCTSPlayer(player, opponent, time_limit=float(arg) if arg else 1.0,
+                              seed=seed)
+        if name == 'random':
+            return RandomPlayer(player, opponent, seed)
+    except ValueError:
+        raise ValueError(f"Bad argument in player spec: {spec}") from None
+    module_name, _, class_name = spec.rpartition('.')
+    if module_name:
+        try:
+            player_class = getattr(importlib.import_module(module_name), class_name)
+        except (ImportError, AttributeError):
+            raise ValueError(f"Cannot import player: {spec}") from None
+        return player_class(player, opponent)
+    raise ValueError(f"Unknown player: {spec}")
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Retrograde Solver Module
+Labels every state of a board configuration with its game-theoretic value
+
+Each state is a base-3 index over all cells (digit 0 = empty, 1 = X,
+2 = O, cell i weighs 3**i), so the results are flat arrays with one entry
+per index. States are grouped into layers by number of marks and solved
+backwards from the full board: a state's value follows from the values of
+its successors in the next layer, which are already final. Every layer is
+processed in vectorized NumPy chunks.
+
+Values are from the point of view of the side to move:
+  1 win, 0 draw, -1 loss, INVALID for states that cannot occur in a game
+  (wrong mark counts). dte is the number of plies to the end of the game
+  with best play: winners pick the fastest win, losers the slowest loss.
+
+Requires NumPy.
+
+Usage: python3 retrograde.py [--size 4] [--win-length 3] [--output FILE] [--validate N]
+"""
+
+import argparse
+import resource
+import sys
+import time
+
+import numpy as np
+
+from batch_eval import line_matrix
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+INVALID = -2
+
+# Flat arrays are indexed by position, so 3 ** cells entries must fit in memory
+MAX_CELLS = 16
+DEFAULT_CHUNK_SIZE = 1 << 18
+
+
+def _peak_memory_mb():
+    """Peak resident memory of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def _encode(value, dte):
+    """Order (value, dte) pairs so that max() picks the best move:
+    any win beats any draw beats any loss, quick wins and slow losses first"""
+    return value.astype(np.int32) * 512 + np.where(value == WIN, 256 - dte, dte)
+
+
+def _decode(key):
+    value = np.floor_divide(key + 256, 512)
+    dte = np.where(value == WIN, 256 - (key - 512), key - 512 * value)
+    return value.astype(np.int8), dte.astype(np.uint8)
+
+
+class RetrogradeSolver:
+    def __init__(self, size=3, win_length=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.size = size
+        self.win_length = win_length or size
+        self.cells = size * size
+        if self.cells > MAX_CELLS:
+            raise ValueError(f"At most {MAX_CELLS} cells are supported, got {self.cells}")
+        self.states = 3 ** self.cells
+        self.chunk_size = chunk_size
+        self.powers = 3 ** np.arange(self.cells, dtype=np.int64)
+        self.lines = line_matrix(size, self.win_length)
+        self.value = None
+        self.dte = None
+        self.layer_stats = []
+
+    def digits(self, indices):
+        """(len(indices), cells) int8 array of the cell contents of each state"""
+        return (indices[:, None] // self.powers % 3).astype(np.int8)
+
+    def index_layers(self):
+        """Base-3 indices of all valid states, grouped by number of marks"""
+        layers = [[] for _ in range(self.cells + 1)]
+        for start in range(0, self.states, self.chunk_size):
+            indices = np.arange(start, min(start + self.chunk_size, self.states), dtype=np.int64)
+            digits = self.digits(indices)
+            x_count = (digits == 1).sum(axis=1)
+            o_count = (digits == 2).sum(axis=1)
+            valid = (x_count == o_count) | (x_count == o_count + 1)
+            layer = x_count + o_count
+            for marks in range(self.cells + 1):
+                selected = indices[valid & (layer == marks)]
+                if len(selected):
+                    layers[marks].append(selected.astype(np.int32))
+        return [np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+                for parts in layers]
+
+    def solve_chunk(self, indices, marks):
+        """Values and dte for one chunk of states that all hold `marks` marks"""
+        digits = self.digits(indices.astype(np.int64))
+        win_length = self.win_length
+        won = ((digits == 1).astype(np.float32) @ self.lines >= win_length).any(axis=1)
+        won |= ((digits == 2).astype(np.float32) @ self.lines >= win_length).any(axis=1)
+
+        # A completed line means the previous mover won: the side to move lost
+        value = np.where(won, LOSS, DRAW).astype(np.int8)
+        dte = np.zeros(len(indices), dtype=np.uint8)
+        open_states = np.flatnonzero(~won)
+        if marks == self.cells or not len(open_states):
+            return value, dte
+
+        # X moves when both players have the same number of marks
+        mover = 1 if marks % 2 == 0 else 2
+        parents = indices[open_states].astype(np.int64)
+        empty = digits[open_states] == 0
+        best = np.full(len(open_states), np.iinfo(np.int32).min, dtype=np.int32)
+        for cell in range(self.cells):
+            rows = np.flatnonzero(empty[:, cell])
+            if not len(rows):
+                continue
+            children = parents[rows] + mover * self.powers[cell]
+            # The child's value is from the opponent's point of view
+            key = _encode(-self.value[children], self.dte[children].astype(np.int32) + 1)
+            best[rows] = np.maximum(best[rows], key)
+        value[open_states], dte[open_states] = _decode(best)
+        return value, dte
+
+    def solve(self, report=None):
+        """Solve every state; report(line) is called with per-layer progress"""
+        start = time.perf_counter()
+        layers = self.index_layers()
+        self.value = np.full(self.states, INVALID, dtype=np.int8)
+        self.dte = np.zeros(self.states, dtype=np.uint8)
+        if report:
+            indexed = sum(len(layer) for layer in layers)
+            report(f"{self.size}x{self.size} k={self.win_length}: indexed {indexed:,} valid "
+                   f"of {self.states:,} states in {time.perf_counter() - start:.2f}s")
+
+        self.layer_stats = []
+        for marks in range(self.cells, -1, -1):
+            layer_start = time.perf_counter()
+            indices = layers[marks]
+            for offset in range(0, len(indices), self.chunk_size):
+                chunk = indices[offset:offset + self.chunk_size]
+                self.value[chunk], self.dte[chunk] = self.solve_chunk(chunk, marks)
+            elapsed = time.perf_counter() - layer_start
+            self.layer_stats.append((marks, len(indices), elapsed))
+            if report:
+                report(f"layer {marks:>2}: {len(indices):>10,} states  {elapsed:7.3f}s  "
+                       f"peak memory {_peak_memory_mb():,.0f} MB")
+
+        if report:
+            table_mb = (self.value.nbytes + self.dte.nbytes) / (1 << 20)
+            layers_mb = sum(layer.nbytes for layer in layers) / (1 << 20)
+            report(f"solved in {time.perf_counter() - start:.2f}s; value/dte tables "
+                   f"{table_mb:,.1f} MB, layer indices {layers_mb:,.1f} MB")
+        return self.value, self.dte
+
+    def index_of(self, game_board):
+        """Base-3 index of a GameBoard position"""
+        index = 0
+        for cell in range(self.cells):
+            bit = 1 << cell
+            if game_board.masks['X'] & bit:
+                index += int(self.powers[cell])
+            elif game_board.masks['O'] & bit:
+                index += 2 * int(self.powers[cell])
+        return index
+
+    def save(self, path):
+        """Save the solved tables as a compressed .npz file"""
+        np.savez_compressed(path, value=self.value, dte=self.dte,
+                            size=self.size, win_length=self.win_length)
+
+
+def validate_ai(solver, samples=None, seed=0, report=print):
+    """
+    Check that TicTacToeAI keeps the game-theoretic value with every move
+    Tests every non-terminal valid state, or a random sample of them;
+    returns (positions checked, mistakes)
+    """
+    from game_logic import GameBoard
+    from ai_player import TicTacToeAI
+
+    candidates = np.flatnonzero((solver.value != INVALID) & (solver.dte > 0))
+    if samples is not None and samples < len(candidates):
+        candidates = np.random.default_rng(seed).choice(candidates, samples, replace=False)
+    ais = {}
+    mistakes = 0
+    size = solver.size
+    for index in candidates.tolist():
+        board = GameBoard(size, solver.win_length)
+        digits = solver.digits(np.array([index], dtype=np.int64))[0]
+        for cell in np.flatnonzero(digits).tolist():
+            board.make_move(cell // size, cell % size, 'X' if digits[cell] == 1 else 'O')
+        player = 'X' if (digits == 1).sum() == (digits == 2).sum() else 'O'
+        ai = ais.get(player)
+        if ai is None:
+            ai = ais[player] = TicTacToeAI(player, 'O' if player == 'X' else 'X', use_lookup=False)
+        row, col = ai.get_best_move(board)
+        child = index + (1 if player == 'X' else 2) * int(solver.powers[row * size + col])
+        if -solver.value[child] != solver.value[index]:
+            mistakes += 1
+    report(f"validated {len(candidates):,} positions: {mistakes:,} value-losing AI moves")
+    return len(candidates), mistakes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrograde full state-space solver")
+    parser.add_argument('--size', type=int, default=3, help="board size")
+    parser.add_argument('--win-length', type=int, default=None, help="marks in a row to win")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="states per batch")
+    parser.add_argument('--output', help="save the value/dte tables to this .npz file")
+    parser.add_argument('--validate', type=int, nargs='?', const=-1, default=None,
+                        help="check the AI against the solution (optionally on N sampled positions)")
+    args = parser.parse_args()
+
+    try:
+        solver = RetrogradeSolver(args.size, args.win_length, args.chunk_size)
+    except ValueError as error:
+        parser.error(str(error))
+    value, _ = solver.solve(report=print)
+    empty = value[0]
+    print(f"empty board: {'X wins' if empty == WIN else 'O wins' if empty == LOSS else 'draw'} "
+          f"in {solver.dte[0]} plies")
+    if args.output:
+        solver.save(args.output)
+    if args.validate is not None:
+        validate_ai(solver, None if args.validate < 0 else args.validate)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,14 @@ let gameState = {
     board: ['', '', '', '', '', '', '', '', ''],
     currentPlayer: 'X',
     gameMode: null,
-    gameActive: false
+    gameActive: false,
+    gameId: 0
 };
 
+// Move service (move_service.py); the local minimax below is the fallback
+// when the page is opened as a file or the service cannot be reached
+const MOVE_SERVICE_URL = '/move';
+
 // Game Elements
 const modeSelection = document.getElementById('modeSelection');
 const gameBoard = document.getElementById('gameBoard');
@@ -39,6 +44,10 @@ function handleCellClick(index) {
     if (!gameState.gameActive || gameState.board[index] !== '') {
         return;
     }
+    // Wait for the AI's reply
+    if (gameState.gameMode === 'ai' && gameState.currentPlayer === 'O') {
+        return;
+    }
     
     makeMove(index, gameState.currentPlayer);
     
@@ -63,12 +72,18 @@ function makeMove(index, player) {
 }
 
 // AI Move
-function aiMove() {
+async function aiMove() {
     if (!gameState.gameActive) return;
     
     statusLabel.textContent = 'AI is thinking...';
     
-    const bestMove = getBestMove();
+    const gameId = gameState.gameId;
+    let bestMove = await requestMove();
+    // The game was reset or left while waiting for the service
+    if (gameId !== gameState.gameId || !gameState.gameActive) return;
+    if (bestMove === null || gameState.board[bestMove] !== '') {
+        bestMove = getBestMove();
+    }
     
     if (bestMove !== null) {
         makeMove(bestMove, 'O');
@@ -81,6 +96,23 @@ function aiMove() {
     }
 }
 
+// Ask the move service; resolves to a cell index, or null if unavailable
+async function requestMove() {
+    if (!window.location.protocol.startsWith('http')) return null;
+    try {
+        const response = await fetch(MOVE_SERVICE_URL, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ board: gameState.board })
+        });
+        if (!response.ok) return null;
+        const reply = await response.json();
+        return reply.move === null ? null : reply.move[0] * 3 + reply.move[1];
+    } catch (error) {
+        return null;
+    }
+}
+
 // Get Best Move (Minimax)
 function getBestMove() {
     let bestScore = -Infinity;
@@ -213,6 +245,7 @@ function resetGame() {
     gameState.board = ['', '', '', '', '', '', '', '', ''];
     gameState.currentPlayer = 'X';
     gameState.gameActive = true;
+    gameState.gameId++;
     
     cells.forEach(cell => {
         cell.textContent = '';
@@ -0,0 +1,83 @@
+"""
+Search Statistics Module
+Per-call instrumentation collected by TicTacToeAI.get_best_move
+"""
+
+
+class RootMoveStats:
+    __slots__ = ('move', 'score', 'seconds', 'nodes')
+
+    def __init__(self, move, score, seconds, nodes):
+        self.move = move
+        self.score = score
+        self.seconds = seconds
+        self.nodes = nodes
+
+    def __repr__(self):
+        return (f"RootMoveStats(move={self.move}, score={self.score}, "
+                f"seconds={self.seconds:.6f}, nodes={self.nodes})")
+
+
+class SearchStats:
+    def __init__(self):
+        self.nodes = 0              # positions visited by minimax
+        self.terminal_nodes = 0     # positions ended by a win or a full board
+        self.evaluations = 0        # depth-limit leaves scored by the heuristic
+        self.max_depth = 0          # deepest ply reached below the root
+        self.cutoffs = 0            # alpha-beta cutoffs
+        self.cache_hits = 0         # transposition table hits
+        self.cache_misses = 0       # transposition table misses
+        self.lookup_hit = False     # answered from the precomputed table
+        self.book_hit = False       # answered from an opening book
+        self.iterations = 0         # iterative-deepening passes completed
+        self.timed_out = False      # the last pass was cut short by the deadline
+        self.root_moves = []        # RootMoveStats, in search order
+        self.workers = 0            # processes the search was split over (0 = serial)
+        self.worker_time = 0.0      # seconds spent in worker tasks, summed
+        self.best_move = None
+        self.best_score = None      # score of best_move for the side to move
+        self.wall_time = 0.0        # seconds for the whole call
+
+    @property
+    def nodes_per_sec(self):
+        return self.nodes / self.wall_time if self.wall_time > 0 else 0.0
+
+    def as_dict(self):
+        """Plain dict form, e.g. for JSON logs"""
+        return {
+            'nodes': self.nodes,
+            'terminal_nodes': self.terminal_nodes,
+            'evaluations': self.evaluations,
+            'max_depth': self.max_depth,
+            'cutoffs': self.cutoffs,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'lookup_hit': self.lookup_hit,
+            'book_hit': self.book_hit,
+            'iterations': self.iterations,
+            'timed_out': self.timed_out,
+            'root_moves': [
+                {'move': list(root.move), 'score': root.score,
+                 'seconds': root.seconds, 'nodes': root.nodes}
+                for root in self.root_moves
+            ],
+            'best_move': None if self.best_move is None else list(self.best_move),
+            'best_score': self.best_score,
+            'workers': self.workers,
+            'worker_time': self.worker_time,
+            'wall_time': self.wall_time,
+        }
+
+    def summary(self):
+        """One-line description for status bars and logs"""
+        if self.lookup_hit:
+            return f"table lookup | {self.wall_time * 1000:.1f} ms"
+        if self.book_hit:
+            return f"opening book | {self.wall_time * 1000:.1f} ms"
+        text = (f"{self.nodes:,} nodes | {self.wall_time * 1000:.1f} ms | depth {self.max_depth} | "
+                f"cache {self.cache_hits:,}/{self.cache_hits + self.cache_misses:,}")
+        if self.timed_out:
+            text += f" | deadline after {self.iterations} passes"
+        if self.workers and self.wall_time > 0:
+            text += f" | {self.workers} workers, {self.worker_time / self.wall_time:.1f}x busy"
+        return text
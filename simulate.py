@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Headless Self-Play Simulator
+Plays many games between configurable players across a process pool
+
+Players:
+- perfect        TicTacToeAI (table lookup on 3x3 when available)
+- random         uniformly random legal moves
+- epsilon[:EPS]  random move with probability EPS (default 0.1), else perfect
+- any other spec of players.py, e.g. minimax:2 or mcts:0.1
+
+Games are split into chunks; each chunk is played by one worker with its
+own RNG seeded from the base seed and the chunk number, so a run is
+reproducible regardless of how chunks are scheduled. Aggregate results are
+printed as chunks complete. Nothing here imports tkinter. With --record,
+every game is also appended to a binary game-record file (game_records.py).
+
+Usage: python3 simulate.py --games 1000000 --x perfect --o epsilon:0.2 [--record FILE]
+"""
+
+import argparse
+import multiprocessing
+import random
+import sys
+import time
+
+from game_logic import GameBoard
+from ai_player import TicTacToeAI
+from game_records import GameRecordWriter, pack_record, player_id, result_of
+from players import RandomPlayer, make_player
+
+DEFAULT_EPSILON = 0.1
+
+
+class EpsilonGreedyPlayer(RandomPlayer):
+    name = 'epsilon'
+
+    def __init__(self, player='O', opponent='X', epsilon=DEFAULT_EPSILON, seed=None):
+        super().__init__(player, opponent, seed)
+        self.epsilon = epsilon
+        self.ai = TicTacToeAI(player, opponent)
+
+    def choose_move(self, game_board, time_budget=None):
+        """Play randomly with probability epsilon, otherwise perfectly"""
+        if self.rng.random() < self.epsilon:
+            return super().choose_move(game_board)
+        return self.ai.get_best_move(game_board)
+
+
+def simulation_player(spec, player):
+    """Build a player from a spec: 'perfect' (minimax), 'epsilon[:EPS]', or
+    any spec players.make_player accepts; raises ValueError"""
+    opponent = 'O' if player == 'X' else 'X'
+    name, _, arg = spec.partition(':')
+    if name == 'perfect':
+        return make_player('minimax', player, opponent)
+    if name == 'epsilon':
+        try:
+            epsilon = float(arg) if arg else DEFAULT_EPSILON
+        except ValueError:
+            raise ValueError(f"Bad argument in player spec: {spec}") from None
+        return EpsilonGreedyPlayer(player, opponent, epsilon)
+    return make_player(spec, player, opponent)
+
+
+def play_game(game_board, players):
+    """Play one game to the end; returns (winner or None, number of moves)"""
+    game_board.reset()
+    moves = 0
+    while True:
+        player = players[game_board.current_player]
+        row, col = player.choose_move(game_board)
+        game_board.make_move(row, col, player.player)
+        moves += 1
+        if game_board.check_winner(player.player):
+            return player.player, moves
+        if game_board.is_full():
+            return None, moves
+        game_board.switch_player()
+
+
+# Per-process state, built once by the pool initializer
+_worker = {}
+
+
+def _init_worker(x_spec, o_spec, size, win_length, seed, record):
+    _worker['board'] = GameBoard(size, win_length)
+    _worker['players'] = {'X': simulation_player(x_spec, 'X'),
+                          'O': simulation_player(o_spec, 'O')}
+    _worker['seed'] = seed
+    # Record player IDs, or None when games are not recorded
+    _worker['record'] = ((player_id(x_spec.partition(':')[0]),
+                          player_id(o_spec.partition(':')[0])) if record else None)
+
+
+def _play_chunk(task):
+    """Play one chunk of games; returns (x_wins, o_wins, draws, length histogram,
+    packed game records)"""
+    chunk, games = task
+    rng = random.Random(_worker['seed'] * 1000003 + chunk)
+    board = _worker['board']
+    players = _worker['players']
+    # Players with randomness share the chunk's RNG
+    for player in players.values():
+        if hasattr(player, 'rng'):
+            player.rng = rng
+    record = _worker['record']
+    results = {'X': 0, 'O': 0, None: 0}
+    lengths = [0] * (board.size * board.size + 1)
+    records = bytearray()
+    for _ in range(games):
+        winner, moves = play_game(board, players)
+        results[winner] += 1
+        lengths[moves] += 1
+        if record is not None:
+            records += pack_record(board.size, [entry[0] for entry in board.history],
+                                   result_of(winner), *record)
+    return results['X'], results['O'], results[None], lengths, bytes(records)
+
+
+class Summary:
+    def __init__(self, cells):
+        self.games = 0
+        self.x_wins = 0
+        self.o_wins = 0
+        self.draws = 0
+        self.lengths = [0] * (cells + 1)
+
+    def add(self, result):
+        x_wins, o_wins, draws, lengths = result[:4]
+        self.x_wins += x_wins
+        self.o_wins += o_wins
+        self.draws += draws
+        self.games += x_wins + o_wins + draws
+        for moves, count in enumerate(lengths):
+            self.lengths[moves] += count
+
+    def format_line(self, elapsed):
+        total = max(self.games, 1)
+        rate = self.games / elapsed if elapsed > 0 else 0.0
+        return (f"{self.games:>10} games  X {100 * self.x_wins / total:5.1f}%  "
+                f"O {100 * self.o_wins / total:5.1f}%  draw {100 * self.draws / total:5.1f}%  "
+                f"{rate:,.0f} games/sec")
+
+    def format_histogram(self):
+        total = max(self.games, 1)
+        lines = ["Game length histogram:"]
+        for moves, count in enumerate(self.lengths):
+            if count:
+                lines.append(f"  {moves:>3} moves: {count:>10} ({100 * count / total:5.1f}%)")
+        return "\n".join(lines)
+
+
+def run(games, x_spec='perfect', o_spec='perfect', size=3, win_length=None,
+        workers=None, chunk_size=1000, seed=0, report_interval=1.0, out=sys.stdout,
+        record_path=None):
+    """Run a simulation, streaming progress to out; returns the final Summary.
+    Games are appended to the record file at record_path if one is given"""
+    # Validate the player specs before starting any workers
+    simulation_player(x_spec, 'X')
+    simulation_player(o_spec, 'O')
+    writer = GameRecordWriter(record_path, size, win_length) if record_path else None
+    workers = workers or multiprocessing.cpu_count()
+    tasks = []
+    remaining = games
+    while remaining > 0:
+        tasks.append((len(tasks), min(chunk_size, remaining)))
+        remaining -= chunk_size
+
+    summary = Summary(size * size)
+    start = time.perf_counter()
+    last_report = start
+    reported = 0
+    with multiprocessing.Pool(workers, _init_worker,
+                              (x_spec, o_spec, size, win_length, seed,
+                               writer is not None)) as pool:
+        for result in pool.imap_unordered(_play_chunk, tasks):
+            summary.add(result)
+            if writer is not None:
+                writer.write_packed(result[4])
+            now = time.perf_counter()
+            if now - last_report >= report_interval:
+                print(summary.format_line(now - start), file=out, flush=True)
+                last_report = now
+                reported = summary.games
+
+    if writer is not None:
+        writer.close()
+    if reported != summary.games:
+        print(summary.format_line(time.perf_counter() - start), file=out)
+    print(summary.format_histogram(), file=out)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Tic-Tac-Toe self-play simulator")
+    parser.add_argument('--games', type=int, default=100000, help="number of games to play")
+    parser.add_argument('--x', default='perfect', help="player spec for X")
+    parser.add_argument('--o', default='perfect', help="player spec for O")
+    parser.add_argument('--size', type=int, default=3, help="board size")
+    parser.add_argument('--win-length', type=int, default=None, help="marks in a row to win")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="games per task")
+    parser.add_argument('--seed', type=int, default=0, help="base RNG seed")
+    parser.add_argument('--report-interval', type=float, default=1.0, help="seconds between progress lines")
+    parser.add_argument('--record', metavar='FILE', help="append every game to this game-record file")
+    args = parser.parse_args()
+    try:
+        run(args.games, args.x, args.o, args.size, args.win_length, args.workers,
+            args.chunk_size, args.seed, args.report_interval, record_path=args.record)
+    except ValueError as error:
+        parser.error(str(error))
+
+
+if __name__ == "__main__":
+    main()
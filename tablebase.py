@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Tablebase Module
+Sharded, resumable builder for exact tablebases of boards up to 4x4
+
+States are numbered by their base-3 index (see retrograde.py), and only
+canonical states are kept: those whose index is the smallest among their
+8 symmetric images. The build runs in a work directory, in three steps:
+
+1. Index: the index space is cut into shards by index range. Worker
+   processes scan the shards and write out the valid canonical states of
+   each shard, grouped into layers by number of marks.
+2. Solve: layers are solved backwards from the full board. The shards of
+   a layer are solved in parallel, each worker reading the values of the
+   successor states from the previous layer's files through memory maps,
+   so no process holds more than one shard. Solved shards are merged into
+   one compact layer file (sorted indices plus one byte per state) and
+   deleted.
+3. Merge: the layer files are joined into a single tablebase file.
+
+Every file is written under a temporary name and renamed once complete,
+so an interrupted build picks up where it stopped when run again. Each
+step reports its throughput in positions per second.
+
+The tablebase file is a header, the number of states in each layer, the
+sorted canonical indices of all states (uint32, layer by layer), then
+one byte per state: the value for the side to move in the top two bits
+and the number of plies to the end with best play in the rest. Tablebase
+memory-maps the file and finds a position with a binary search in its
+layer.
+
+Requires NumPy.
+
+Usage: python3 tablebase.py [--size 4] [--win-length 3] [--workers N] [--shards N]
+                            [--work-dir DIR] [--output FILE] [--keep-work]
+"""
+
+import argparse
+import json
+import mmap
+import multiprocessing
+import os
+import shutil
+import struct
+import time
+
+import numpy as np
+
+from batch_eval import line_matrix
+from game_logic import Geometry
+from retrograde import WIN, DRAW, LOSS, _decode, _encode
+
+MAGIC = b'TTTD'
+# Bump when the file layout or the value encoding changes
+TABLEBASE_VERSION = 1
+HEADER = struct.Struct('<4sHBBI')
+# Indices are stored as uint32, so 3 ** cells must fit
+MAX_CELLS = 16
+DEFAULT_SHARDS = 32
+DEFAULT_CHUNK_SIZE = 1 << 18
+DTE_BITS = 6
+
+TABLEBASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def default_path(size, win_length):
+    return os.path.join(TABLEBASE_DIR, f'tablebase_{size}x{size}_k{win_length}.bin')
+
+
+def symmetry_powers(size):
+    """(cells, 8) array: the base-3 weight each cell gets in each symmetric image"""
+    geometry = Geometry.get(size, size)
+    return np.array([[3 ** (geometry.transform(1 << cell, t).bit_length() - 1)
+                      for t in range(8)]
+                     for cell in range(geometry.cells)], dtype=np.int64)
+
+
+def pack_values(value, dte):
+    """One byte per state: value + 1 in the top two bits, dte below"""
+    return ((value.astype(np.int16) + 1) << DTE_BITS | dte).astype(np.uint8)
+
+
+def unpack_values(packed):
+    """Inverse of pack_values: (value, dte) arrays"""
+    return ((packed >> DTE_BITS).astype(np.int8) - 1,
+            packed & ((1 << DTE_BITS) - 1))
+
+
+def _save_array(path, array):
+    """Write a .npy file under a temporary name, then rename it into place"""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(temp_path, path)
+
+
+class WorkDir:
+    """File names of the intermediate results of one build"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def params(self):
+        return os.path.join(self.path, 'params.json')
+
+    def shard_index(self, shard):
+        return os.path.join(self.path, f'index_{shard:04}.npz')
+
+    def solved(self, marks, shard):
+        return os.path.join(self.path, f'solved_{marks:02}_{shard:04}.npy')
+
+    def layer_index(self, marks):
+        return os.path.join(self.path, f'layer_{marks:02}_index.npy')
+
+    def layer_value(self, marks):
+        # Written after the index file, so it marks a finished layer
+        return os.path.join(self.path, f'layer_{marks:02}_value.npy')
+
+
+def index_shard(task):
+    """Worker: valid canonical states of one index range, saved by layer"""
+    size, work_path, shard, low, high, chunk_size = task
+    start = time.perf_counter()
+    cells = size * size
+    powers = 3 ** np.arange(cells, dtype=np.int64)
+    images = symmetry_powers(size).astype(np.float64)
+    layers = [[] for _ in range(cells + 1)]
+    for chunk_start in range(low, high, chunk_size):
+        indices = np.arange(chunk_start, min(chunk_start + chunk_size, high), dtype=np.int64)
+        digits = (indices[:, None] // powers % 3).astype(np.int8)
+        x_count = (digits == 1).sum(axis=1)
+        o_count = (digits == 2).sum(axis=1)
+        valid = (x_count == o_count) | (x_count == o_count + 1)
+        indices = indices[valid]
+        # Images stay below 2 * 3 ** 16, exact in float64
+        canonical = (digits[valid] @ images).min(axis=1).astype(np.int64) == indices
+        indices = indices[canonical]
+        marks = (x_count + o_count)[valid][canonical]
+        for layer in np.unique(marks).tolist():
+            layers[layer].append(indices[marks == layer].astype(np.uint32))
+
+    arrays = {f'm{marks}': np.concatenate(parts) if parts else np.empty(0, dtype=np.uint32)
+              for marks, parts in enumerate(layers)}
+    path = WorkDir(work_path).shard_index(shard)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(temp_path, path)
+    return high - low, time.perf_counter() - start
+
+
+def solve_chunk(indices, marks, size, win_length, next_index, next_value):
+    """Packed values of a chunk of states that all hold `marks` marks"""
+    cells = size * size
+    powers = 3 ** np.arange(cells, dtype=np.int64)
+    digits = (indices.astype(np.int64)[:, None] // powers % 3).astype(np.int8)
+    lines = line_matrix(size, win_length)
+    won = ((digits == 1).astype(np.float32) @ lines >= win_length).any(axis=1)
+    won |= ((digits == 2).astype(np.float32) @ lines >= win_length).any(axis=1)
+
+    # A completed line means the previous mover won: the side to move lost
+    value = np.where(won, LOSS, DRAW).astype(np.int8)
+    dte = np.zeros(len(indices), dtype=np.uint8)
+    open_states = np.flatnonzero(~won)
+    if marks == cells or not len(open_states):
+        return pack_values(value, dte)
+
+    # X moves when both players have the same number of marks
+    mover = 1 if marks % 2 == 0 else 2
+    weights = symmetry_powers(size)
+    images = (digits[open_states] @ weights.astype(np.float64)).astype(np.int64)
+    empty = digits[open_states] == 0
+    best = np.full(len(open_states), np.iinfo(np.int32).min, dtype=np.int32)
+    for cell in range(cells):
+        rows = np.flatnonzero(empty[:, cell])
+        if not len(rows):
+            continue
+        # Canonical index of each child: the smallest of its images
+        children = (images[rows] + mover * weights[cell]).min(axis=1)
+        child_value, child_dte = unpack_values(next_value[np.searchsorted(next_index, children)])
+        # The child's value is from the opponent's point of view
+        key = _encode(-child_value, child_dte.astype(np.int32) + 1)
+        best[rows] = np.maximum(best[rows], key)
+    value[open_states], dte[open_states] = _decode(best)
+    return pack_values(value, dte)
+
+
+def solve_shard(task):
+    """Worker: solve one shard of a layer against the merged next layer"""
+    size, win_length, work_path, marks, shard, chunk_size = task
+    start = time.perf_counter()
+    work = WorkDir(work_path)
+    with np.load(work.shard_index(shard)) as shard_file:
+        indices = shard_file[f'm{marks}']
+    next_index = next_value = None
+    if marks < size * size:
+        next_index = np.load(work.layer_index(marks + 1), mmap_mode='r')
+        next_value = np.load(work.layer_value(marks + 1), mmap_mode='r')
+    packed = np.empty(len(indices), dtype=np.uint8)
+    for offset in range(0, len(indices), chunk_size):
+        packed[offset:offset + chunk_size] = solve_chunk(
+            indices[offset:offset + chunk_size], marks, size, win_length, next_index, next_value)
+    _save_array(work.solved(marks, shard), packed)
+    return len(indices), time.perf_counter() - start
+
+
+def merge_layer(work, marks, shards):
+    """Join the solved shards of a layer into its layer files; returns the state count"""
+    indices = []
+    values = []
+    for shard in range(shards):
+        with np.load(work.shard_index(shard)) as shard_file:
+            indices.append(shard_file[f'm{marks}'])
+        values.append(np.load(work.solved(marks, shard)))
+    # Shards are consecutive index ranges, so the joined indices stay sorted
+    _save_array(work.layer_index(marks), np.concatenate(indices))
+    _save_array(work.layer_value(marks), np.concatenate(values))
+    for shard in range(shards):
+        os.remove(work.solved(marks, shard))
+    return sum(len(part) for part in indices)
+
+
+def write_tablebase(work, size, win_length, path):
+    """Join all layer files into the tablebase file; returns the state count"""
+    cells = size * size
+    layers = [(np.load(work.layer_index(marks), mmap_mode='r'),
+               np.load(work.layer_value(marks), mmap_mode='r'))
+              for marks in range(cells + 1)]
+    counts = np.array([len(index) for index, _ in layers], dtype=np.uint32)
+    positions = int(counts.sum())
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, TABLEBASE_VERSION, size, win_length, positions))
+        f.write(counts.tobytes())
+        for index, _ in layers:
+            f.write(np.ascontiguousarray(index, dtype=np.uint32).tobytes())
+        for _, value in layers:
+            f.write(np.ascontiguousarray(value).tobytes())
+    os.replace(temp_path, path)
+    return positions
+
+
+def _rate(count, seconds):
+    return f"{count / seconds:,.0f} positions/s" if seconds > 0 else "-"
+
+
+def build(size=4, win_length=None, path=None, work_path=None, workers=None,
+          shards=DEFAULT_SHARDS, chunk_size=DEFAULT_CHUNK_SIZE, keep_work=False, report=None):
+    """
+    Build (or finish building) the tablebase for a board shape
+    Returns the number of positions in the file
+    """
+    win_length = win_length or size
+    cells = size * size
+    if cells > MAX_CELLS:
+        raise ValueError(f"At most {MAX_CELLS} cells are supported, got {cells}")
+    Geometry.get(size, win_length)
+    path = path or default_path(size, win_length)
+    work_path = work_path or os.path.splitext(path)[0] + '.work'
+    report = report or (lambda line: None)
+    work = WorkDir(work_path)
+
+    # A work directory only resumes the build it was started for
+    params = {'version': TABLEBASE_VERSION, 'size': size, 'win_length': win_length,
+              'shards': shards}
+    os.makedirs(work_path, exist_ok=True)
+    if os.path.exists(work.params()):
+        with open(work.params()) as f:
+            if json.load(f) != params:
+                raise ValueError(f"{work_path} holds a build with other settings")
+        report(f"resuming the build in {work_path}")
+    else:
+        with open(work.params(), 'w') as f:
+            json.dump(params, f)
+
+    start = time.perf_counter()
+    states = 3 ** cells
+    bounds = [states * shard // shards for shard in range(shards + 1)]
+    with multiprocessing.Pool(workers or multiprocessing.cpu_count()) as pool:
+        tasks = [(size, work_path, shard, bounds[shard], bounds[shard + 1], chunk_size)
+                 for shard in range(shards) if not os.path.exists(work.shard_index(shard))]
+        if tasks:
+            step_start = time.perf_counter()
+            scanned = sum(count for count, _ in pool.imap_unordered(index_shard, tasks))
+            elapsed = time.perf_counter() - step_start
+            report(f"indexed {len(tasks)} shards, {scanned:,} states in {elapsed:.2f}s "
+                   f"({_rate(scanned, elapsed)})")
+
+        for marks in range(cells, -1, -1):
+            if os.path.exists(work.layer_value(marks)):
+                continue
+            step_start = time.perf_counter()
+            tasks = [(size, win_length, work_path, marks, shard, chunk_size)
+                     for shard in range(shards) if not os.path.exists(work.solved(marks, shard))]
+            for _ in pool.imap_unordered(solve_shard, tasks):
+                pass
+            count = merge_layer(work, marks, shards)
+            elapsed = time.perf_counter() - step_start
+            report(f"layer {marks:>2}: {count:>10,} positions  {elapsed:7.3f}s  "
+                   f"({_rate(count, elapsed)})")
+
+    positions = write_tablebase(work, size, win_length, path)
+    if not keep_work:
+        shutil.rmtree(work_path)
+    elapsed = time.perf_counter() - start
+    report(f"wrote {positions:,} canonical positions to {path} "
+           f"({os.path.getsize(path):,} bytes) in {elapsed:.2f}s ({_rate(positions, elapsed)})")
+    return positions
+
+
+class Tablebase:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        magic, version, self.size, self.win_length, self.positions = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != TABLEBASE_VERSION:
+            self.data.close()
+            raise ValueError(f"{path} is not a current tablebase file")
+        cells = self.size * self.size
+        offset = HEADER.size
+        counts = np.frombuffer(self.data, dtype=np.uint32, count=cells + 1, offset=offset)
+        # Start of each layer in the index and value arrays
+        self.starts = [0] + np.cumsum(counts, dtype=np.int64).tolist()
+        offset += counts.nbytes
+        self.indices = np.frombuffer(self.data, dtype=np.uint32, count=self.positions,
+                                     offset=offset)
+        self.values = np.frombuffer(self.data, dtype=np.uint8, count=self.positions,
+                                    offset=offset + 4 * self.positions)
+        self.images = symmetry_powers(self.size).tolist()
+
+    def close(self):
+        """Release the memory map"""
+        # The arrays are views of the map and must go first
+        self.indices = self.values = None
+        self.data.close()
+
+    def __len__(self):
+        return self.positions
+
+    def probe_masks(self, x_mask, o_mask):
+        """(value, dte) for the side to move, or None for impossible positions"""
+        marks = x_mask.bit_count() + o_mask.bit_count()
+        if not 0 <= x_mask.bit_count() - o_mask.bit_count() <= 1:
+            return None
+        index = min(
+            sum(weights[t] * (1 if x_mask >> cell & 1 else 2)
+                for cell, weights in enumerate(self.images) if (x_mask | o_mask) >> cell & 1)
+            for t in range(8)
+        )
+        low, high = self.starts[marks], self.starts[marks + 1]
+        position = low + int(np.searchsorted(self.indices[low:high], index))
+        if position >= high or self.indices[position] != index:
+            return None
+        packed = int(self.values[position])
+        return (packed >> DTE_BITS) - 1, packed & ((1 << DTE_BITS) - 1)
+
+    def probe(self, game_board):
+        """(value, dte) of a GameBoard position for the side to move:
+        WIN, DRAW or LOSS, and the plies to the end with best play"""
+        if (game_board.size, game_board.win_length) != (self.size, self.win_length):
+            raise ValueError("The tablebase is for a different board")
+        return self.probe_masks(game_board.masks['X'], game_board.masks['O'])
+
+    def best_move(self, game_board):
+        """
+        A move that keeps the position's value for the side to move: the
+        fastest win or the slowest loss, first in row-major order on ties
+        None if the game is over
+        """
+        x_mask, o_mask = game_board.masks['X'], game_board.masks['O']
+        x_to_move = x_mask.bit_count() == o_mask.bit_count()
+        if (game_board.check_winner('X') or game_board.check_winner('O')
+                or game_board.is_full()):
+            return None
+        best_key = None
+        best = None
+        for row, col in game_board.get_empty_cells():
+            bit = 1 << (row * self.size + col)
+            if x_to_move:
+                child = self.probe_masks(x_mask | bit, o_mask)
+            else:
+                child = self.probe_masks(x_mask, o_mask | bit)
+            value, dte = -child[0], child[1] + 1
+            key = value * 512 + (256 - dte if value == WIN else dte)
+            if best_key is None or key > best_key:
+                best_key, best = key, (row, col)
+        return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded, resumable tablebase builder")
+    parser.add_argument('--size', type=int, default=4, help="board size")
+    parser.add_argument('--win-length', type=int, default=None, help="marks in a row to win")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument('--shards', type=int, default=DEFAULT_SHARDS,
+                        help="index ranges per layer; keep it when resuming")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="states per batch in a worker")
+    parser.add_argument('--work-dir', help="directory for intermediate files "
+                                           "(default: next to the output file)")
+    parser.add_argument('--output', help="tablebase file (default: next to this module)")
+    parser.add_argument('--keep-work', action='store_true',
+                        help="keep the intermediate files after the build")
+    args = parser.parse_args()
+
+    win_length = args.win_length or args.size
+    path = args.output or default_path(args.size, win_length)
+    try:
+        build(args.size, win_length, path, args.work_dir, args.workers, args.shards,
+              args.chunk_size, args.keep_work, report=print)
+    except ValueError as error:
+        parser.error(str(error))
+
+    tablebase = Tablebase(path)
+    value, dte = tablebase.probe_masks(0, 0)
+    outcome = 'X wins' if value == WIN else 'O wins' if value == LOSS else 'draw'
+    print(f"empty board: {outcome} in {dte} plies")
+    tablebase.close()
+
+
+if __name__ == "__main__":
+    main()
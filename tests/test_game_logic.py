@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from game_logic import GameBoard
+
+SHAPES = [(3, 3), (4, 3), (5, 4), (7, 4)]
+
+
+def state(board):
+    """Everything push/pop must keep in step"""
+    return (board.masks.copy(), {player: marks[:] for player, marks in board.line_marks.items()},
+            board.won.copy(), board.empty_count, board.hash, board.current_player)
+
+
+def random_game(board, rng):
+    """Play random moves until the game ends; returns the states before each move"""
+    states = []
+    while not (board.check_winner('X') or board.check_winner('O') or board.is_full()):
+        states.append(state(board))
+        board.push(rng.choice(board.get_empty_cells()))
+    return states
+
+
+@pytest.mark.parametrize('size, win_length', SHAPES)
+def test_pop_restores_every_state(size, win_length):
+    rng = random.Random(size * 100 + win_length)
+    for _ in range(50):
+        board = GameBoard(size, win_length)
+        states = random_game(board, rng)
+        for expected in reversed(states):
+            board.pop()
+            assert state(board) == expected
+        assert not board.history
+
+
+@pytest.mark.parametrize('size, win_length', SHAPES)
+def test_incremental_state_matches_the_masks(size, win_length):
+    rng = random.Random(size * 100 + win_length)
+    for _ in range(50):
+        board = GameBoard(size, win_length)
+        random_game(board, rng)
+        x_mask, o_mask = board.masks['X'], board.masks['O']
+        for player, mask in (('X', x_mask), ('O', o_mask)):
+            assert board.check_winner(player) == board.geometry.has_win(mask)
+        assert board.is_full() == ((x_mask | o_mask) == board.geometry.full_mask)
+        assert board.empty_count == len(board.get_empty_cells())
+        # The same position built from its masks has the same incremental state
+        rebuilt = GameBoard.from_masks(size, win_length, x_mask, o_mask)
+        assert state(rebuilt) == state(board)
+
+
+def test_push_pop_round_trip_and_errors():
+    board = GameBoard()
+    board.push((1, 1))
+    assert board.get_cell(1, 1) == 'X'
+    assert board.current_player == 'O'
+    with pytest.raises(ValueError):
+        board.push((1, 1))
+    assert board.pop() == (1, 1)
+    assert board.current_player == 'X'
+    with pytest.raises(IndexError):
+        board.pop()
+
+
+def test_copy_is_independent():
+    board = GameBoard(4, 3)
+    board.push((0, 0))
+    copy = board.copy()
+    copy.push((1, 1))
+    assert board.get_cell(1, 1) == ''
+    assert len(board.history) == 1
+    copy.pop()
+    assert state(copy) == state(board)
+
+
+def test_from_masks_rejects_bad_positions():
+    with pytest.raises(ValueError):
+        GameBoard.from_masks(3, 3, 0b1, 0b1)
+    with pytest.raises(ValueError):
+        GameBoard.from_masks(3, 3, 1 << 9, 0)
+    with pytest.raises(ValueError):
+        GameBoard.from_masks(3, 4, 0, 0)
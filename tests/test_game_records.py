@@ -0,0 +1,68 @@
+import pytest
+
+from game_logic import GameBoard
+from game_records import (DRAW, HEADER, O_WINS, UNFINISHED, X_WINS, GameRecordReader,
+                          GameRecordWriter, pack_record, player_id, player_name)
+
+GAMES = [
+    ([0, 3, 1, 4, 2], X_WINS, 'human', 'minimax'),
+    ([4, 0, 8, 2, 1, 7, 6, 3, 5], DRAW, 'mcts', 'random'),
+    ([], UNFINISHED, 'human', 'human'),
+    ([0, 4, 1, 2, 8, 6], O_WINS, 'perfect', 'minimax-parallel'),
+]
+
+
+def read_all(path):
+    reader = GameRecordReader(path)
+    try:
+        return [(record.moves, record.result, player_name(record.x_player),
+                 player_name(record.o_player)) for record in reader]
+    finally:
+        reader.close()
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'games.rec')
+    with GameRecordWriter(path) as writer:
+        for moves, result, x, o in GAMES[:2]:
+            writer.write(moves, result, player_id(x), player_id(o))
+        moves, result, x, o = GAMES[2]
+        writer.write_packed(pack_record(3, moves, result, player_id(x), player_id(o)))
+    # Appending to an existing file keeps what is there
+    with GameRecordWriter(path) as writer:
+        board = GameBoard()
+        for cell in GAMES[3][0]:
+            board.push(divmod(cell, 3))
+        writer.write_board(board, O_WINS, player_id('perfect'), player_id('minimax-parallel'))
+    assert read_all(path) == GAMES
+
+
+@pytest.mark.parametrize('torn_bytes', [1, 3, 8])
+def test_torn_last_record_is_dropped(tmp_path, torn_bytes):
+    path = str(tmp_path / 'games.rec')
+    with GameRecordWriter(path) as writer:
+        writer.write(*GAMES[0][:2], player_id('human'), player_id('minimax'))
+    # A crash in the middle of a write leaves part of a record behind
+    with open(path, 'ab') as f:
+        f.write(b'\x07' * torn_bytes)
+    assert read_all(path) == GAMES[:1]
+    with GameRecordWriter(path) as writer:
+        for moves, result, x, o in GAMES[1:]:
+            writer.write(moves, result, player_id(x), player_id(o))
+    assert read_all(path) == GAMES
+
+
+def test_other_board_shape_is_refused(tmp_path):
+    path = str(tmp_path / 'games.rec')
+    GameRecordWriter(path).close()
+    with pytest.raises(ValueError):
+        GameRecordWriter(path, size=4)
+    with open(path, 'rb') as f:
+        assert len(f.read()) == HEADER.size
+
+
+def test_player_ids():
+    assert player_name(player_id('minimax')) == 'minimax'
+    assert player_id('no such engine') == 0
+    # IDs written by a newer version read as unknown
+    assert player_name(200) == 'unknown'
@@ -0,0 +1,62 @@
+import pytest
+
+import lookup_table
+from ai_player import TicTacToeAI
+from game_logic import GameBoard
+
+
+def reachable_positions(size=3):
+    """Every non-terminal position reachable in play, once each"""
+    seen = set()
+    positions = []
+
+    def visit(board):
+        key = (board.masks['X'], board.masks['O'])
+        if key in seen:
+            return
+        seen.add(key)
+        if board.check_winner('X') or board.check_winner('O') or board.is_full():
+            return
+        positions.append(board.copy())
+        for move in board.get_empty_cells():
+            board.push(move)
+            visit(board)
+            board.pop()
+
+    visit(GameBoard(size))
+    return positions
+
+
+@pytest.fixture(scope='module')
+def table(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('lookup') / 'table.bin')
+    lookup_table.generate(path)
+    table = lookup_table.LookupTable(path)
+    assert table.is_current()
+    yield table
+    table.close()
+
+
+def test_lookup_table_matches_the_search(table):
+    positions = reachable_positions()
+    assert len(positions) == 4520
+    for board in positions:
+        player = board.current_player
+        opponent = 'O' if player == 'X' else 'X'
+        search = TicTacToeAI(player, opponent, use_lookup=False, use_book=False)
+        assert table.best_move(board, player) == search.get_best_move(board)
+
+
+def test_engine_uses_the_table_when_given_one(table):
+    board = GameBoard()
+    board.push((0, 0))
+    ai = TicTacToeAI('O', 'X', use_lookup=False, use_book=False)
+    ai.lookup = table
+    assert ai.get_best_move(board) == (1, 1)
+    assert ai.nodes_searched == 0
+
+
+def test_table_answers_only_for_the_side_to_move(table):
+    board = GameBoard()
+    assert table.best_move(board, 'O') is None
+    assert table.best_move(GameBoard(4, 3), 'X') is None
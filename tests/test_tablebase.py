@@ -0,0 +1,50 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import tablebase
+from retrograde import INVALID, RetrogradeSolver
+
+
+def masks_of(index, cells):
+    """(X mask, O mask) of a base-3 state index"""
+    x_mask = o_mask = 0
+    for cell in range(cells):
+        index, digit = divmod(index, 3)
+        if digit == 1:
+            x_mask |= 1 << cell
+        elif digit == 2:
+            o_mask |= 1 << cell
+    return x_mask, o_mask
+
+
+@pytest.mark.parametrize('size, win_length', [(3, 3), (3, 2)])
+def test_tablebase_agrees_with_the_retrograde_solver(tmp_path, size, win_length):
+    path = str(tmp_path / 'tb.bin')
+    positions = tablebase.build(size, win_length, path, str(tmp_path / 'work'),
+                                workers=1, shards=4)
+    value, dte = RetrogradeSolver(size, win_length).solve()
+    table = tablebase.Tablebase(path)
+    try:
+        assert len(table) == positions
+        valid = np.flatnonzero(value != INVALID)
+        for index in valid.tolist():
+            expected = (int(value[index]), int(dte[index]))
+            assert table.probe_masks(*masks_of(index, size * size)) == expected
+    finally:
+        table.close()
+
+
+def test_build_resumes_from_its_work_directory(tmp_path):
+    path = str(tmp_path / 'tb.bin')
+    work = str(tmp_path / 'work')
+    first = tablebase.build(3, 3, path, work, workers=1, shards=4, keep_work=True)
+    with open(path, 'rb') as f:
+        data = f.read()
+    # A work directory only resumes the build it was started for
+    with pytest.raises(ValueError):
+        tablebase.build(3, 3, path, work, workers=1, shards=8)
+    # Every step is already done, so the same build only rewrites the file
+    assert tablebase.build(3, 3, path, work, workers=1, shards=4) == first
+    with open(path, 'rb') as f:
+        assert f.read() == data
@@ -8,6 +8,9 @@ Tic-Tac-Toe Game
 import tkinter as tk
 from tkinter import messagebox
 
+# Search order: center, then corners, then edges
+MOVE_ORDER = [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2), (0, 1), (1, 0), (1, 2), (2, 1)]
+
 class TicTacToe:
     def __init__(self, root):
         self.root = root
@@ -20,6 +23,10 @@ class TicTacToe:
         self.game_mode = None  # 'ai' or '2player'
         self.game_active = False
         
+        # Search statistics from the last AI move
+        self.nodes_searched = 0
+        self.cutoffs = 0
+        
         # Create UI
         self.create_mode_selection()
         
@@ -168,29 +175,43 @@ class TicTacToe:
         self.status_label.config(text="AI is thinking...")
         self.root.update()
         
-        best_score = float('-inf')
-        best_move = None
-        
-        # Try all possible moves
-        for i in range(3):
-            for j in range(3):
-                if self.board[i][j] == '':
-                    # Try this move
-                    self.board[i][j] = 'O'
-                    score = self.minimax(self.board, 0, False)
-                    self.board[i][j] = ''
-                    
-                    if score > best_score:
-                        best_score = score
-                        best_move = (i, j)
+        best_move = self.find_best_move(self.board)
         
         # Make the best move
         if best_move:
             row, col = best_move
             self.make_move(row, col)
             
-    def minimax(self, board, depth, is_maximizing):
-        """Minimax algorithm for AI"""
+    def find_best_move(self, board):
+        """Find the best move for O, sharing the alpha-beta window across root moves"""
+        self.nodes_searched = 0
+        self.cutoffs = 0
+        best_score = float('-inf')
+        best_move = None
+        
+        for i, j in MOVE_ORDER:
+            if board[i][j] == '':
+                # Try this move; ties go to the first move in row-major order
+                if best_move is None:
+                    alpha = float('-inf')
+                elif (i, j) < best_move:
+                    alpha = best_score - 1
+                else:
+                    alpha = best_score
+                board[i][j] = 'O'
+                score = self.minimax(board, 0, False, alpha, float('inf'))
+                board[i][j] = ''
+                
+                if score > best_score or (score == best_score and (i, j) < best_move):
+                    best_score = score
+                    best_move = (i, j)
+                    
+        return best_move
+        
+    def minimax(self, board, depth, is_maximizing, alpha=float('-inf'), beta=float('inf')):
+        """Minimax algorithm with alpha-beta pruning for AI"""
+        self.nodes_searched += 1
+        
         # Check terminal states
         if self.check_winner(board, 'O'):
             return 10 - depth
@@ -201,23 +222,29 @@ class TicTacToe:
             
         if is_maximizing:
             best_score = float('-inf')
-            for i in range(3):
-                for j in range(3):
-                    if board[i][j] == '':
-                        board[i][j] = 'O'
-                        score = self.minimax(board, depth + 1, False)
-                        board[i][j] = ''
-                        best_score = max(score, best_score)
+            for i, j in MOVE_ORDER:
+                if board[i][j] == '':
+                    board[i][j] = 'O'
+                    score = self.minimax(board, depth + 1, False, alpha, beta)
+                    board[i][j] = ''
+                    best_score = max(score, best_score)
+                    alpha = max(alpha, score)
+                    if alpha >= beta:
+                        self.cutoffs += 1
+                        break
             return best_score
         else:
             best_score = float('inf')
-            for i in range(3):
-                for j in range(3):
-                    if board[i][j] == '':
-                        board[i][j] = 'X'
-                        score = self.minimax(board, depth + 1, True)
-                        board[i][j] = ''
-                        best_score = min(score, best_score)
+            for i, j in MOVE_ORDER:
+                if board[i][j] == '':
+                    board[i][j] = 'X'
+                    score = self.minimax(board, depth + 1, True, alpha, beta)
+                    board[i][j] = ''
+                    best_score = min(score, best_score)
+                    beta = min(beta, score)
+                    if alpha >= beta:
+                        self.cutoffs += 1
+                        break
             return best_score
             
     def check_winner(self, board, player):
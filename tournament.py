@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Tournament Runner
+Round-robin matches between players across a process pool, with Elo tables
+
+Every pair of players meets in games_per_pair games. Games come in pairs
+that share a random opening (opening_plies moves played before the
+engines take over) with the colors swapped, so neither side of a pairing
+profits from the opening or from moving first. Each game is one pool
+task, seeded from the base seed and its number, so a run is reproducible
+however the games are scheduled. Results are printed as games finish.
+
+The final tables give each player's score with a 95% confidence interval,
+an Elo rating fitted to all results (Bradley-Terry, with one virtual draw
+per pairing so perfect scores stay finite) and the Elo difference of every
+pairing. Players are spec strings, see players.py.
+
+Usage: python3 tournament.py minimax minimax:2 random mcts:0.1 [--games 20] [--workers N]
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import sys
+import time
+
+from game_logic import GameBoard
+from players import make_player
+
+# z for a two-sided 95% interval
+Z_95 = 1.96
+ELO_ITERATIONS = 1000
+
+
+def play_match(task):
+    """
+    Play one game; returns a result dict
+    A player that returns no move or an illegal move forfeits the game
+    """
+    game, x_spec, o_spec, opening, seed, size, win_length, time_budget = task
+    board = GameBoard(size, win_length)
+    for move in opening:
+        board.push(move)
+    players = {'X': make_player(x_spec, 'X', 'O', seed),
+               'O': make_player(o_spec, 'O', 'X', seed + 1)}
+    think = {'X': 0.0, 'O': 0.0}
+    made = {'X': 0, 'O': 0}
+    winner = None
+    forfeit = False
+    start = time.perf_counter()
+    while True:
+        symbol = board.current_player
+        move_start = time.perf_counter()
+        move = players[symbol].choose_move(board, time_budget)
+        think[symbol] += time.perf_counter() - move_start
+        made[symbol] += 1
+        if move is None or not board.is_valid_move(*move):
+            winner = 'O' if symbol == 'X' else 'X'
+            forfeit = True
+            break
+        board.push(move)
+        if board.check_winner(symbol):
+            winner = symbol
+            break
+        if board.is_full():
+            break
+    for player in players.values():
+        close = getattr(player, 'close', None)
+        if close is not None:
+            close()
+    return {
+        'game': game, 'x': x_spec, 'o': o_spec, 'winner': winner,
+        'forfeit': forfeit, 'moves': len(board.history),
+        'seconds': time.perf_counter() - start,
+        'x_seconds': think['X'], 'o_seconds': think['O'],
+        'x_moves': made['X'], 'o_moves': made['O'],
+    }
+
+
+def random_opening(size, win_length, plies, rng, attempts=1000):
+    """A sequence of random moves that does not end the game"""
+    for _ in range(attempts):
+        board = GameBoard(size, win_length)
+        moves = []
+        for _ in range(plies):
+            move = rng.choice(board.get_empty_cells())
+            symbol = board.current_player
+            board.push(move)
+            moves.append(move)
+            if board.check_winner(symbol) or board.is_full():
+                break
+        else:
+            return moves
+    raise ValueError(f"Random openings of {plies} plies keep ending the game")
+
+
+def schedule(specs, games_per_pair, size, win_length, opening_plies, time_budget, seed):
+    """Round-robin task list; games_per_pair is rounded up to an even number"""
+    rng = random.Random(seed)
+    tasks = []
+    for i, first in enumerate(specs):
+        for second in specs[i + 1:]:
+            for _ in range((games_per_pair + 1) // 2):
+                opening = random_opening(size, win_length, opening_plies, rng)
+                for x_spec, o_spec in ((first, second), (second, first)):
+                    game = len(tasks)
+                    tasks.append((game, x_spec, o_spec, opening, seed * 1000003 + 2 * game,
+                                  size, win_length, time_budget))
+    return tasks
+
+
+class Standings:
+    """Win/draw/loss counts per player and per pairing"""
+
+    def __init__(self, specs):
+        self.specs = list(specs)
+        self.records = {spec: [0, 0, 0] for spec in specs}
+        # (player, opponent) -> [wins, draws, losses] of player
+        self.pairs = {}
+        self.forfeits = {spec: 0 for spec in specs}
+        # player -> [seconds thinking, moves made]
+        self.think = {spec: [0.0, 0] for spec in specs}
+
+    def add(self, result):
+        x, o = result['x'], result['o']
+        winner = result['winner']
+        for spec, opponent, symbol in ((x, o, 'X'), (o, x, 'O')):
+            outcome = 1 if winner is None else 0 if winner == symbol else 2
+            self.records[spec][outcome] += 1
+            self.pairs.setdefault((spec, opponent), [0, 0, 0])[outcome] += 1
+        if result['forfeit']:
+            self.forfeits[o if winner == 'X' else x] += 1
+        self.think[x][0] += result['x_seconds']
+        self.think[x][1] += result['x_moves']
+        self.think[o][0] += result['o_seconds']
+        self.think[o][1] += result['o_moves']
+
+    def ratings(self):
+        """Elo per player, from a Bradley-Terry fit (mean rating 0)"""
+        strength = {spec: 1.0 for spec in self.specs}
+        for _ in range(ELO_ITERATIONS):
+            updated = {}
+            for spec in self.specs:
+                score = 0.0
+                total = 0.0
+                for opponent in self.specs:
+                    record = self.pairs.get((spec, opponent))
+                    if record is None:
+                        continue
+                    wins, draws, losses = record
+                    # One virtual draw per pairing keeps ratings finite
+                    score += wins + 0.5 * draws + 0.5
+                    total += (wins + draws + losses + 1) / (strength[spec] + strength[opponent])
+                updated[spec] = score / total if total else 1.0
+            mean = math.exp(sum(math.log(value) for value in updated.values()) / len(updated))
+            strength = {spec: value / mean for spec, value in updated.items()}
+        return {spec: 400 * math.log10(value) for spec, value in strength.items()}
+
+
+def score_interval(wins, draws, losses):
+    """
+    Score fraction with a 95% Wilson interval: (score, low, high)
+    Draws count half; unlike the normal approximation the interval stays
+    meaningful for 0% and 100% scores
+    """
+    games = wins + draws + losses
+    if not games:
+        return 0.5, 0.0, 1.0
+    score = (wins + 0.5 * draws) / games
+    z2 = Z_95 * Z_95
+    center = (score + z2 / (2 * games)) / (1 + z2 / games)
+    margin = (Z_95 * math.sqrt(score * (1 - score) / games + z2 / (4 * games * games))
+              / (1 + z2 / games))
+    return score, max(center - margin, 0.0), min(center + margin, 1.0)
+
+
+def elo_difference(score):
+    """Elo difference implied by a score fraction (clamped away from 0 and 1)"""
+    score = min(max(score, 1e-3), 1 - 1e-3)
+    return 400 * math.log10(score / (1 - score))
+
+
+def elo_interval(wins, draws, losses):
+    """(Elo difference, low, high) for a 95% interval on the score"""
+    score, low, high = score_interval(wins, draws, losses)
+    return elo_difference(score), elo_difference(low), elo_difference(high)
+
+
+def format_tables(standings):
+    ratings = standings.ratings()
+    lines = [f"{'player':<20}{'Elo':>7}{'games':>7}{'W':>6}{'D':>6}{'L':>6}"
+             f"{'score':>8}{'95% CI':>16}{'ms/move':>9}"]
+    for spec in sorted(standings.specs, key=lambda spec: -ratings[spec]):
+        wins, draws, losses = standings.records[spec]
+        score, low, high = score_interval(wins, draws, losses)
+        seconds, moves = standings.think[spec]
+        interval = f"{100 * low:.1f}-{100 * high:.1f}%"
+        lines.append(
+            f"{spec:<20}{ratings[spec]:>7.0f}{wins + draws + losses:>7}{wins:>6}{draws:>6}"
+            f"{losses:>6}{100 * score:>7.1f}%{interval:>16}"
+            f"{1000 * seconds / max(moves, 1):>9.2f}")
+    lines.append("")
+    lines.append(f"{'pairing':<40}{'W-D-L':>14}{'Elo diff':>10}{'95% CI':>18}")
+    for i, first in enumerate(standings.specs):
+        for second in standings.specs[i + 1:]:
+            record = standings.pairs.get((first, second))
+            if record is None:
+                continue
+            diff, low, high = elo_interval(*record)
+            lines.append(f"{first + ' vs ' + second:<40}{'-'.join(map(str, record)):>14}"
+                         f"{diff:>+10.0f}{f'{low:+.0f} to {high:+.0f}':>18}")
+    return "\n".join(lines)
+
+
+def format_result(result):
+    winner = result['winner']
+    outcome = 'draw' if winner is None else f"{result[winner.lower()]} wins"
+    if result['forfeit']:
+        outcome += " (forfeit)"
+    return (f"game {result['game']:>5}: {result['x']} (X) vs {result['o']} (O): "
+            f"{outcome} in {result['moves']} moves, {result['seconds']:.2f}s")
+
+
+def run(specs, games_per_pair=10, size=3, win_length=None, opening_plies=2,
+        time_budget=None, workers=None, seed=0, quiet=False, out=sys.stdout):
+    """Play the tournament, streaming results to out; returns the Standings"""
+    if len(set(specs)) < 2:
+        raise ValueError("A tournament needs at least two different players")
+    # Validate the player specs before starting any workers
+    for spec in specs:
+        make_player(spec, 'X', 'O')
+    win_length = win_length or size
+    GameBoard(size, win_length)
+    specs = list(dict.fromkeys(specs))
+    tasks = schedule(specs, games_per_pair, size, win_length, opening_plies, time_budget, seed)
+    standings = Standings(specs)
+    workers = workers or multiprocessing.cpu_count()
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(play_match, tasks):
+            standings.add(result)
+            if not quiet:
+                print(format_result(result), file=out, flush=True)
+    print(format_tables(standings), file=out)
+    return standings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round-robin tournament between players")
+    parser.add_argument('players', nargs='+', help="player specs (see players.py)")
+    parser.add_argument('--games', type=int, default=10, help="games per pairing (even)")
+    parser.add_argument('--size', type=int, default=3, help="board size")
+    parser.add_argument('--win-length', type=int, default=None, help="marks in a row to win")
+    parser.add_argument('--opening-plies', type=int, default=2,
+                        help="random moves played before the engines take over")
+    parser.add_argument('--time-budget', type=float, default=None,
+                        help="seconds per move, for engines with time control")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--seed', type=int, default=0, help="base RNG seed")
+    parser.add_argument('--quiet', action='store_true', help="only print the final tables")
+    parser.add_argument('--output', help="save per-player results as JSON to this file")
+    args = parser.parse_args()
+    try:
+        standings = run(args.players, args.games, args.size, args.win_length,
+                        args.opening_plies, args.time_budget, args.workers, args.seed, args.quiet)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.output:
+        ratings = standings.ratings()
+        with open(args.output, 'w') as f:
+            json.dump({
+                spec: {'elo': ratings[spec], 'wins': record[0], 'draws': record[1],
+                       'losses': record[2], 'forfeits': standings.forfeits[spec]}
+                for spec, record in standings.records.items()
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Transposition Table Module
+Caches search results keyed by a canonical (symmetry-reduced) position key
+"""
+
+from collections import OrderedDict
+
+# Bound types describing how a stored score relates to the true value
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+EVICTION_POLICIES = ('lru', 'fifo')
+
+
+class TranspositionTable:
+    def __init__(self, max_entries=100000, policy='lru'):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_entries = max_entries
+        self.policy = policy
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Return the (score, bound, draft) stored for key, or None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.policy == 'lru':
+            self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key, score, bound=EXACT, draft=0):
+        """
+        Store a score, its bound type and the remaining search depth (draft)
+        it was computed with, evicting if the table is full
+        """
+        if key in self.entries:
+            self.entries[key] = (score, bound, draft)
+            if self.policy == 'lru':
+                self.entries.move_to_end(key)
+            return
+        if self.max_entries <= 0:
+            return
+        if len(self.entries) >= self.max_entries:
+            # Both policies evict from the front: the least recently used
+            # entry for 'lru', the oldest inserted entry for 'fifo'
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        self.entries[key] = (score, bound, draft)
+
+    def clear(self):
+        """Remove all entries and reset the counters"""
+        self.entries.clear()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the hit/miss/eviction counters"""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
@@ -1,33 +1,137 @@
 """
 UI Module
 Handles the graphical user interface using tkinter
+
+AI searches run on a background worker thread; results come back through a
+queue that the Tk main loop polls with after(), so the window never blocks.
+With debug enabled (or toggled with F12) a status bar under the board shows
+the node count and latency of the AI's last search. Given a recorder
+(game_records.GameRecordWriter), every game is appended to a record file.
+
+The 'ultimate' mode swaps in the nested 9x9 board (ultimate.py) and its
+MCTS engine; the sub-boards open for the next move are highlighted.
+
+The Hints button colors each empty cell by the engine's analysis of the
+move (TicTacToeAI.analyze): green wins, yellow draws, red loses, and
+shades in between for heuristic scores on large boards. The analysis runs
+on its own worker thread with an engine whose transposition table is kept
+from move to move, and only the cells whose color changed are redrawn.
+
+The board is drawn on one canvas (board_canvas.py) that only redraws the
+cells that changed. The menu and game screens are built once and swapped
+in and out, so resets and trips to the menu create no new widgets.
 """
 
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import messagebox
+from board_canvas import BoardCanvas, CELL_COLOR
 from game_logic import GameBoard
 from ai_player import TicTacToeAI
+from game_records import DRAW, UNFINISHED, player_id, result_of
+from ultimate import COORDS, OPEN, UltimateBoard
+from ultimate_ai import UltimateAI
+
+# Minimum time the AI appears to think, so instant replies don't feel abrupt
+AI_MIN_DELAY_MS = 500
+# How often the main loop checks for a finished search
+AI_POLL_MS = 20
+# Seconds the ultimate engine searches per move
+ULTIMATE_TIME_LIMIT = 1.0
+# Ultimate sub-board shading: open for the next move, or won by a player
+PLAYABLE_BG = '#FFF9C4'
+WON_BG = {'X': '#BBDEFB', 'O': '#FFCDD2'}
+# Hint heatmap colors by proven result of a move
+HINT_COLORS = {'win': '#81C784', 'draw': '#FFF176', 'loss': '#E57373'}
+
+
+def blend(low_color, high_color, fraction):
+    """Color fraction of the way from low_color to high_color"""
+    low = [int(low_color[i:i + 2], 16) for i in (1, 3, 5)]
+    high = [int(high_color[i:i + 2], 16) for i in (1, 3, 5)]
+    return '#' + ''.join(f"{round(a + (b - a) * fraction):02X}" for a, b in zip(low, high))
+
+
+def hint_color(entry, low, high):
+    """Heatmap color of an analysed move; heuristic scores are shaded
+    from red to green by where they fall between low and high"""
+    if entry.result is not None:
+        return HINT_COLORS[entry.result]
+    fraction = 0.5 if high == low else (entry.score - low) / (high - low)
+    return blend(HINT_COLORS['loss'], HINT_COLORS['win'], fraction)
 
 class TicTacToeUI:
-    def __init__(self, root):
+    def __init__(self, root, size=3, win_length=None, ai=None, debug=False, recorder=None):
         self.root = root
         self.root.title("Tic-Tac-Toe")
         self.root.resizable(False, False)
         
         # Game components
-        self.game_board = GameBoard()
-        self.ai = TicTacToeAI()
+        self.size = size
+        self.game_board = GameBoard(size, win_length)
+        # Any player with the interface in players.py, e.g. MCTSPlayer
+        self.ai = ai or TicTacToeAI()
+        # The regular board and AI, kept while the ultimate mode swaps them out
+        self.standard = (size, self.game_board, self.ai)
+        self.ultimate = (UltimateBoard.size, UltimateBoard(),
+                         UltimateAI(time_limit=ULTIMATE_TIME_LIMIT))
         
         # Game state
-        self.game_mode = None  # 'ai' or '2player'
+        self.game_mode = None  # 'ai', '2player' or 'ultimate'
         self.game_active = False
-        self.buttons = [[None for _ in range(3)] for _ in range(3)]
+        # Screens, built on first use and reused after that
+        self.mode_frame = None
+        self.game_frame = None
+        self.board_view = None
+        # Moves taken back with Undo, most recently undone last
+        self.redo_moves = []
+        self.recorder = recorder
+        # Set once the game on the board is in the record file, so undoing
+        # past the end and finishing again doesn't record it twice
+        self.game_recorded = False
+        
+        # Debug status bar, shown in the game screen while debug is on
+        self.debug = debug
+        self.debug_label = None
+        self.debug_text = "No search yet"
+        self.frame_text = ""
+        self.root.bind('<F12>', self.toggle_debug)
+        
+        # Background search: requests and results are tagged with a search id;
+        # bumping the id discards whatever is in flight
+        self.search_id = 0
+        self.ai_thinking = False
+        # When the AI's time budget runs out, for engines with a time limit
+        self.search_deadline = None
+        self.poll_job = None
+        self.search_requests = queue.Queue()
+        self.search_results = queue.Queue()
+        worker = threading.Thread(target=self.search_worker, daemon=True)
+        worker.start()
+        
+        # Hint overlay: a separate engine analyses positions on its own
+        # thread; hints holds ((X mask, O mask), {move: MoveAnalysis}) for
+        # the last position analysed
+        self.hints_on = False
+        self.hints = None
+        self.analyst = TicTacToeAI(use_lookup=False, use_book=False)
+        self.analysis_id = 0
+        self.analysis_job = None
+        self.analysis_requests = queue.Queue()
+        self.analysis_results = queue.Queue()
+        analysis_worker = threading.Thread(target=self.analysis_worker, daemon=True)
+        analysis_worker.start()
         
         # Start with mode selection
         self.show_mode_selection()
         
     def show_mode_selection(self):
         """Display mode selection screen"""
+        if self.mode_frame is not None:
+            self.mode_frame.pack()
+            return
         self.mode_frame = tk.Frame(self.root, padx=20, pady=20)
         self.mode_frame.pack()
         
@@ -69,24 +173,47 @@ class TicTacToeUI:
         )
         two_player_button.pack(pady=10)
         
+        ultimate_button = tk.Button(
+            self.mode_frame,
+            text="Ultimate vs AI",
+            font=('Arial', 14),
+            width=20,
+            height=2,
+            bg='#FF5722',
+            fg='white',
+            command=lambda: self.start_game('ultimate')
+        )
+        ultimate_button.pack(pady=10)
+        
+    @property
+    def vs_ai(self):
+        """True in the modes where the AI plays O"""
+        return self.game_mode in ('ai', 'ultimate')
+        
     def start_game(self, mode):
         """Initialize game with selected mode"""
         self.game_mode = mode
         self.game_active = True
+        self.game_recorded = False
+        self.size, self.game_board, self.ai = (
+            self.ultimate if mode == 'ultimate' else self.standard)
         self.game_board.reset()
-        self.mode_frame.destroy()
-        self.create_game_ui()
+        self.mode_frame.pack_forget()
+        if self.game_frame is None:
+            self.create_game_ui()
+        self.show_game_ui()
         
     def create_game_ui(self):
         """Create the game board interface"""
+        self.game_frame = tk.Frame(self.root)
+        
         # Top control panel
-        top_frame = tk.Frame(self.root, bg='#f0f0f0')
+        top_frame = tk.Frame(self.game_frame, bg='#f0f0f0')
         top_frame.pack(pady=10, fill=tk.X)
         
-        mode_text = "vs AI" if self.game_mode == 'ai' else "2 Player"
         self.mode_label = tk.Label(
             top_frame,
-            text=f"Mode: {mode_text}",
+            text="Mode:",
             font=('Arial', 12),
             bg='#f0f0f0'
         )
@@ -121,103 +248,385 @@ class TicTacToeUI:
         )
         menu_button.pack(side=tk.LEFT, padx=10)
         
+        undo_button = tk.Button(
+            top_frame,
+            text="Undo",
+            font=('Arial', 10),
+            bg='#9C27B0',
+            fg='white',
+            command=self.undo_move
+        )
+        undo_button.pack(side=tk.LEFT, padx=5)
+        
+        redo_button = tk.Button(
+            top_frame,
+            text="Redo",
+            font=('Arial', 10),
+            bg='#9C27B0',
+            fg='white',
+            command=self.redo_move
+        )
+        redo_button.pack(side=tk.LEFT, padx=5)
+        
+        self.hints_button = tk.Button(
+            top_frame,
+            text="Hints",
+            font=('Arial', 10),
+            bg='#009688',
+            fg='white',
+            relief=tk.RAISED,
+            command=self.toggle_hints
+        )
+        self.hints_button.pack(side=tk.LEFT, padx=5)
+        
         # Game board
-        board_frame = tk.Frame(self.root, bg='#333333', padx=5, pady=5)
-        board_frame.pack(pady=10)
-        
-        for i in range(3):
-            for j in range(3):
-                button = tk.Button(
-                    board_frame,
-                    text='',
-                    font=('Arial', 32, 'bold'),
-                    width=5,
-                    height=2,
-                    bg='white',
-                    command=lambda row=i, col=j: self.handle_click(row, col)
-                )
-                button.grid(row=i, column=j, padx=3, pady=3)
-                self.buttons[i][j] = button
+        self.board_view = BoardCanvas(self.game_frame, self.handle_click)
+        self.board_view.pack(pady=10)
+                
+        self.debug_label = tk.Label(
+            self.game_frame,
+            text=self.debug_text,
+            font=('Courier', 10),
+            anchor='w',
+            justify=tk.LEFT
+        )
+        if self.debug:
+            self.debug_label.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 5))
+            
+    def show_game_ui(self):
+        """Set the game screen up for the current mode and show it"""
+        mode_text = {'ai': "vs AI", '2player': "2 Player",
+                     'ultimate': "Ultimate vs AI"}[self.game_mode]
+        self.mode_label.config(text=f"Mode: {mode_text}")
+        # Wider gaps between the 3x3 sub-boards in ultimate mode
+        gaps = (3, 6) if self.game_mode == 'ultimate' else ()
+        self.board_view.set_shape(self.size, gaps)
+        self.refresh_board()
+        self.update_status()
+        self.game_frame.pack()
+        
+
+    def toggle_debug(self, event=None):
+        """Show or hide the debug status bar"""
+        self.debug = not self.debug
+        if self.debug_label is None:
+            return
+        if self.debug:
+            self.debug_label.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 5))
+        else:
+            self.debug_label.pack_forget()
+            
+    def show_search_stats(self, stats, elapsed_ms):
+        """Describe the last search in the debug status bar"""
+        if stats is not None:
+            self.debug_text = f"Last search: {stats.summary()}"
+        else:
+            # Engines without SearchStats still report a node count
+            nodes = getattr(self.ai, 'nodes_searched', 0)
+            self.debug_text = f"Last search: {nodes:,} nodes | {elapsed_ms:.1f} ms"
+            rate = getattr(self.ai, 'playouts_per_sec', None)
+            if rate is not None:
+                self.debug_text += f" | {rate:,.0f} playouts/s"
+        self.update_debug_label()
+        
+    def update_debug_label(self):
+        if self.debug_label is not None:
+            self.debug_label.config(text=f"{self.debug_text}\n{self.frame_text}")
                 
     def handle_click(self, row, col):
         """Handle player click on a cell"""
-        if not self.game_active or not self.game_board.is_valid_move(row, col):
+        if (not self.game_active or self.ai_thinking
+                or not self.game_board.is_valid_move(row, col)):
             return
             
-        # Make the move
-        current_player = self.game_board.current_player
-        self.game_board.make_move(row, col, current_player)
-        self.update_button(row, col, current_player)
+        # A new move abandons the undone moves
+        self.redo_moves.clear()
+        if self.play_move(row, col):
+            return
+            
+        # AI's turn if in AI mode
+        if self.vs_ai and self.game_board.current_player == 'O':
+            self.ai_make_move()
+            
+    def play_move(self, row, col):
+        """Play a move for the player to move; returns True if the game ended"""
+        player = self.game_board.current_player
+        self.game_board.push((row, col))
+        self.refresh_board()
         
         # Check game end conditions
-        if self.check_game_end(current_player):
-            return
+        if self.check_game_end(player):
+            return True
             
-        # Switch player
-        self.game_board.switch_player()
         self.update_status()
+        return False
         
-        # AI's turn if in AI mode
-        if self.game_mode == 'ai' and self.game_board.current_player == 'O':
-            self.root.after(500, self.ai_make_move)
+    def undo_move(self):
+        """Take back moves until it is a human player's turn again"""
+        if not self.game_board.history:
+            return
+        self.cancel_search()
+        while self.game_board.history:
+            row, col = self.game_board.pop()
+            self.redo_moves.append((row, col))
+            if not self.vs_ai or self.game_board.current_player == 'X':
+                break
+        self.game_active = True
+        self.refresh_board()
+        self.update_status()
+        
+    def redo_move(self):
+        """Replay undone moves up to the next human turn"""
+        if not self.redo_moves or self.ai_thinking or not self.game_active:
+            return
+        while self.redo_moves:
+            row, col = self.redo_moves.pop()
+            if self.play_move(row, col):
+                return
+            if not self.vs_ai or self.game_board.current_player == 'X':
+                break
+                
+        # The AI was still to reply when its move was undone
+        if self.vs_ai and self.game_board.current_player == 'O':
+            self.ai_make_move()
             
     def ai_make_move(self):
-        """Let the AI make a move"""
+        """Start a background search for the AI's move"""
         if not self.game_active:
             return
             
-        self.status_label.config(text="AI is thinking...")
-        self.root.update()
+        self.ai_thinking = True
+        budget = getattr(self.ai, 'time_limit', None)
+        self.search_deadline = None if budget is None else time.perf_counter() + budget
+        self.show_thinking()
+        self.search_id += 1
+        self.search_requests.put((self.search_id, self.ai, self.game_board.copy()))
+        self.poll_job = self.root.after(AI_POLL_MS, self.poll_search)
+        
+    def search_worker(self):
+        """Worker thread: run searches one at a time, skipping stale requests;
+        a failed search posts its error instead of a move"""
+        while True:
+            search_id, ai, board = self.search_requests.get()
+            if search_id != self.search_id:
+                continue
+            start = time.perf_counter()
+            try:
+                move = ai.choose_move(board)
+            except Exception as error:
+                self.search_results.put((search_id, None, 0.0, None, error))
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            stats = getattr(ai, 'last_stats', None)
+            self.search_results.put((search_id, move, elapsed_ms, stats, None))
+            
+    def poll_search(self):
+        """Main loop: pick up a finished search, or check again later"""
+        self.poll_job = None
+        try:
+            while True:
+                search_id, move, elapsed_ms, stats, error = self.search_results.get_nowait()
+                if search_id == self.search_id:
+                    break
+        except queue.Empty:
+            self.show_thinking()
+            self.poll_job = self.root.after(AI_POLL_MS, self.poll_search)
+            return
+            
+        if error is not None:
+            # Hand the move to the human rather than waiting forever
+            self.ai_thinking = False
+            messagebox.showerror("AI Error", f"The AI failed to move: {error}")
+            self.status_label.config(text="AI failed - make its move or undo")
+            return
+            
+        self.show_search_stats(stats, elapsed_ms)
+
+        # Only pad out the thinking time when the search itself was quicker
+        delay = int(AI_MIN_DELAY_MS - elapsed_ms)
+        if delay > 0:
+            self.poll_job = self.root.after(delay, self.apply_ai_move, search_id, move)
+        else:
+            self.apply_ai_move(search_id, move)
+            
+    def show_thinking(self):
+        """Status text while the AI searches, with the time it has left"""
+        if self.search_deadline is None:
+            text = "AI is thinking..."
+        else:
+            left = max(0.0, self.search_deadline - time.perf_counter())
+            text = f"AI is thinking... {left:.1f}s left"
+        self.status_label.config(text=text)
         
-        # Get best move from AI
-        move = self.ai.get_best_move(self.game_board)
+    def cancel_search(self):
+        """Discard any in-flight AI search"""
+        self.search_id += 1
+        self.ai_thinking = False
+        self.ai.stop()
+        if self.poll_job is not None:
+            self.root.after_cancel(self.poll_job)
+            self.poll_job = None
+            
+    def apply_ai_move(self, search_id, move):
+        """Play the move found by the background search"""
+        self.poll_job = None
+        if search_id != self.search_id or not self.game_active:
+            return
+        self.ai_thinking = False
         
         if move:
             row, col = move
-            self.game_board.make_move(row, col, 'O')
-            self.update_button(row, col, 'O')
+            self.play_move(row, col)
             
-            # Check game end
-            if self.check_game_end('O'):
-                return
-                
-            # Switch back to player
-            self.game_board.switch_player()
-            self.update_status()
-            
-    def update_button(self, row, col, player):
-        """Update button appearance after move"""
-        color = '#2196F3' if player == 'X' else '#F44336'
-        self.buttons[row][col].config(
-            text=player,
-            state='disabled',
-            disabledforeground=color
-        )
+    def refresh_board(self):
+        """Bring the canvas up to date with the board; only changed cells
+        are redrawn"""
+        shading = self.sub_board_shading() or self.hint_shading()
+        cells = [(mark, shading[row][col] if shading else CELL_COLOR)
+                 for row, marks in enumerate(self.game_board.board)
+                 for col, mark in enumerate(marks)]
+        self.board_view.render(cells)
+        view = self.board_view
+        self.frame_text = (f"Last frame: {view.cells_redrawn} cells redrawn "
+                           f"in {view.frame_ms:.2f} ms")
+        if self.debug:
+            self.update_debug_label()
+        self.request_analysis()
+        
+    def toggle_hints(self):
+        """Show or hide the hint heatmap"""
+        self.hints_on = not self.hints_on
+        self.hints_button.config(relief=tk.SUNKEN if self.hints_on else tk.RAISED)
+        self.refresh_board()
+        
+    def position_key(self):
+        return self.game_board.masks['X'], self.game_board.masks['O']
+        
+    def request_analysis(self):
+        """Queue the position for the hint overlay unless it is already
+        analysed (or hints are off, or the game is over)"""
+        board = self.game_board
+        if (not self.hints_on or self.game_mode == 'ultimate' or not self.game_active
+                or board.check_winner('X') or board.check_winner('O') or board.is_full()):
+            return
+        if self.hints is not None and self.hints[0] == self.position_key():
+            return
+        self.analysis_id += 1
+        self.analysis_requests.put((self.analysis_id, board.copy()))
+        if self.analysis_job is None:
+            self.analysis_job = self.root.after(AI_POLL_MS, self.poll_analysis)
+            
+    def analysis_worker(self):
+        """Worker thread: analyse positions for the hint overlay, skipping
+        ones the game has already moved past"""
+        while True:
+            analysis_id, board = self.analysis_requests.get()
+            if analysis_id != self.analysis_id:
+                continue
+            analysis = self.analyst.analyze(board)
+            if analysis is None:
+                # Stopped by cancel_analysis
+                continue
+            key = (board.masks['X'], board.masks['O'])
+            self.analysis_results.put(
+                (analysis_id, key, {entry.move: entry for entry in analysis}))
+            
+    def cancel_analysis(self):
+        """Discard any in-flight hint analysis"""
+        self.analysis_id += 1
+        self.analyst.stop()
+        if self.analysis_job is not None:
+            self.root.after_cancel(self.analysis_job)
+            self.analysis_job = None
+            
+    def poll_analysis(self):
+        """Main loop: show a finished analysis, or check again later"""
+        self.analysis_job = None
+        try:
+            while True:
+                analysis_id, key, analysis = self.analysis_results.get_nowait()
+                if analysis_id == self.analysis_id:
+                    break
+        except queue.Empty:
+            self.analysis_job = self.root.after(AI_POLL_MS, self.poll_analysis)
+            return
+        self.hints = (key, analysis)
+        self.refresh_board()
+            
+    def hint_shading(self):
+        """Cell backgrounds for the hint heatmap, or None when there is no
+        analysis of the current position to show"""
+        if (not self.hints_on or self.hints is None or not self.game_active
+                or self.hints[0] != self.position_key()):
+            return None
+        analysis = self.hints[1]
+        heuristic = [entry.score for entry in analysis.values() if entry.result is None]
+        low, high = (min(heuristic), max(heuristic)) if heuristic else (0, 0)
+        shading = [[CELL_COLOR] * self.size for _ in range(self.size)]
+        for (row, col), entry in analysis.items():
+            shading[row][col] = hint_color(entry, low, high)
+        return shading
         
     def check_game_end(self, player):
         """Check if game has ended (win or draw)"""
         if self.game_board.check_winner(player):
             self.game_active = False
-            if self.game_mode == 'ai':
+            if self.vs_ai:
                 winner_text = "You win!" if player == 'X' else "AI wins!"
             else:
                 winner_text = f"Player {player} wins!"
+            self.record_game(result_of(player))
             messagebox.showinfo("Game Over", winner_text)
             self.status_label.config(text=winner_text)
             return True
             
         if self.game_board.is_full():
             self.game_active = False
+            self.record_game(DRAW)
             messagebox.showinfo("Game Over", "It's a draw!")
             self.status_label.config(text="It's a draw!")
             return True
             
         return False
         
+    def record_game(self, result):
+        """Append the game on the board to the record file, if there is one"""
+        # Record files hold one board shape, so ultimate games are not logged
+        if (self.recorder is None or self.game_mode == 'ultimate'
+                or not self.game_board.history or self.game_recorded):
+            return
+        self.game_recorded = True
+        if self.game_mode == 'ai':
+            o_player = player_id(getattr(self.ai, 'name', 'unknown'))
+        else:
+            o_player = player_id('human')
+        self.recorder.write_board(self.game_board, result, player_id('human'), o_player)
+        # Games end rarely; write each one out right away
+        self.recorder.flush()
+        
+    def sub_board_shading(self):
+        """Ultimate mode: cell backgrounds that highlight the sub-boards open
+        for the next move and tint the ones already won (None otherwise)"""
+        if self.game_mode != 'ultimate':
+            return None
+        shading = [[CELL_COLOR] * self.size for _ in range(self.size)]
+        playable = self.game_board.playable_boards()
+        for b in range(9):
+            status = self.game_board.sub_board_status(b)
+            if status in WON_BG:
+                bg = WON_BG[status]
+            elif status is OPEN and playable >> b & 1:
+                bg = PLAYABLE_BG
+            else:
+                continue
+            for row, col in COORDS[b]:
+                shading[row][col] = bg
+        return shading
+                
     def update_status(self):
         """Update status label"""
         player = self.game_board.current_player
-        if self.game_mode == 'ai' and player == 'O':
+        if self.vs_ai and player == 'O':
             text = "AI's Turn"
         else:
             text = f"Player {player}'s Turn"
@@ -225,25 +634,27 @@ class TicTacToeUI:
         
     def reset_game(self):
         """Reset the current game"""
+        self.cancel_search()
+        self.cancel_analysis()
+        if self.game_active:
+            self.record_game(UNFINISHED)
         self.game_board.reset()
+        self.redo_moves.clear()
         self.game_active = True
-        
-        for i in range(3):
-            for j in range(3):
-                self.buttons[i][j].config(
-                    text='',
-                    state='normal',
-                    bg='white'
-                )
-                
+        self.game_recorded = False
+        self.refresh_board()
         self.update_status()
         
     def back_to_menu(self):
         """Return to main menu"""
-        for widget in self.root.winfo_children():
-            widget.destroy()
+        self.cancel_search()
+        self.cancel_analysis()
+        if self.game_active:
+            self.record_game(UNFINISHED)
+        self.game_frame.pack_forget()
             
         self.game_board.reset()
+        self.redo_moves.clear()
         self.game_mode = None
         self.game_active = False
         
@@ -0,0 +1,162 @@
+"""
+Ultimate Tic-Tac-Toe Module
+Board model for the nested 9x9 variant
+
+The board is a 3x3 grid of 3x3 sub-boards. Winning a sub-board claims
+that square of the 3x3 meta board, and three claimed squares in a row win
+the game. A move in cell c of a sub-board sends the opponent to sub-board
+c; if that sub-board is already won or full, the opponent may play in any
+open sub-board.
+
+Each sub-board is a pair of 9-bit masks, and whether a mask holds a line
+comes from a 512-entry table built once, so checking a sub-board or the
+meta board after a move is a single lookup. UltimateBoard offers the same
+interface as GameBoard (push/pop, is_valid_move, check_winner, is_full,
+get_cell, copy) on 9x9 (row, col) coordinates, so the UI and the player
+interface work with it unchanged.
+"""
+
+# Rows, columns and diagonals of a 3x3 grid, as 9-bit masks
+LINES = (0b000000111, 0b000111000, 0b111000000, 0b001001001,
+         0b010010010, 0b100100100, 0b100010001, 0b001010100)
+FULL = 0b111111111
+# LINE_WON[mask] is True when a 3x3 mask holds a complete line
+LINE_WON = tuple(any(mask & line == line for line in LINES) for mask in range(512))
+# Cell indices set in each 3x3 mask
+MASK_CELLS = tuple(tuple(c for c in range(9) if mask >> c & 1) for mask in range(512))
+# 9x9 (row, col) of each (sub-board, cell), and the reverse
+COORDS = tuple(tuple(((b // 3) * 3 + c // 3, (b % 3) * 3 + c % 3) for c in range(9))
+               for b in range(9))
+BOARD_CELL = {COORDS[b][c]: (b, c) for b in range(9) for c in range(9)}
+# Sub-board status values
+OPEN = None
+DRAWN = 'draw'
+
+
+class UltimateBoard:
+    size = 9
+    win_length = 3
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Start a new game"""
+        self.masks = {'X': [0] * 9, 'O': [0] * 9}
+        # Sub-boards won by each player, and sub-boards won or full
+        self.meta = {'X': 0, 'O': 0}
+        self.closed = 0
+        # Sub-board the player to move must play in, -1 for any open one
+        self.next_board = -1
+        self.won = {'X': False, 'O': False}
+        # (sub-board, cell, player, next_board, closed, meta, won) before each move
+        self.history = []
+        self.current_player = 'X'
+
+    def is_over(self):
+        return self.won['X'] or self.won['O'] or self.closed == FULL
+
+    def is_valid_move(self, row, col):
+        """Check that (row, col) may be played now"""
+        if not (0 <= row < 9 and 0 <= col < 9) or self.is_over():
+            return False
+        b, c = BOARD_CELL[row, col]
+        if self.closed >> b & 1 or self.next_board not in (-1, b):
+            return False
+        return not (self.masks['X'][b] | self.masks['O'][b]) >> c & 1
+
+    def push(self, move):
+        """Play (row, col) for the player to move and pass the turn"""
+        row, col = move
+        if not self.is_valid_move(row, col):
+            raise ValueError(f"Invalid move: {move}")
+        b, c = BOARD_CELL[row, col]
+        player = self.current_player
+        self.history.append((b, c, player, self.next_board, self.closed,
+                             self.meta[player], self.won[player]))
+        masks = self.masks[player]
+        masks[b] |= 1 << c
+        if LINE_WON[masks[b]]:
+            self.meta[player] |= 1 << b
+            self.closed |= 1 << b
+            self.won[player] = LINE_WON[self.meta[player]]
+        elif self.masks['X'][b] | self.masks['O'][b] == FULL:
+            self.closed |= 1 << b
+        self.next_board = -1 if self.closed >> c & 1 else c
+        self.current_player = 'O' if player == 'X' else 'X'
+
+    def pop(self):
+        """Undo the most recent move and return its (row, col)"""
+        if not self.history:
+            raise IndexError("No moves to undo")
+        b, c, player, self.next_board, self.closed, meta, won = self.history.pop()
+        self.masks[player][b] &= ~(1 << c)
+        self.meta[player] = meta
+        self.won[player] = won
+        self.current_player = player
+        return COORDS[b][c]
+
+    def check_winner(self, player):
+        """Check if player has won the meta board"""
+        return self.won[player]
+
+    def is_full(self):
+        """True when every sub-board is won or full, so no move is left"""
+        return self.closed == FULL
+
+    def get_cell(self, row, col):
+        b, c = BOARD_CELL[row, col]
+        if self.masks['X'][b] >> c & 1:
+            return 'X'
+        if self.masks['O'][b] >> c & 1:
+            return 'O'
+        return ''
+
+    @property
+    def board(self):
+        """The position as 9 rows of 9 strings (read-only view)"""
+        return [[self.get_cell(row, col) for col in range(9)] for row in range(9)]
+
+    def sub_board_status(self, b):
+        """'X' or 'O' if a player won sub-board b, DRAWN if it is full, else OPEN"""
+        if self.meta['X'] >> b & 1:
+            return 'X'
+        if self.meta['O'] >> b & 1:
+            return 'O'
+        return DRAWN if self.closed >> b & 1 else OPEN
+
+    def playable_boards(self):
+        """Mask of the sub-boards the next move may be played in"""
+        if self.is_over():
+            return 0
+        if self.next_board >= 0:
+            return 1 << self.next_board
+        return FULL & ~self.closed
+
+    def legal_moves(self):
+        """(sub-board, cell) pairs that may be played now"""
+        moves = []
+        boards = self.playable_boards()
+        for b in MASK_CELLS[boards]:
+            free = FULL & ~(self.masks['X'][b] | self.masks['O'][b])
+            moves.extend((b, c) for c in MASK_CELLS[free])
+        return moves
+
+    def get_empty_cells(self):
+        """Cells that may be played now, as 9x9 (row, col); unlike on a
+        GameBoard these are only the cells of the playable sub-boards"""
+        return [COORDS[b][c] for b, c in self.legal_moves()]
+
+    def copy(self):
+        new_board = UltimateBoard.__new__(UltimateBoard)
+        new_board.masks = {player: masks[:] for player, masks in self.masks.items()}
+        new_board.meta = self.meta.copy()
+        new_board.closed = self.closed
+        new_board.next_board = self.next_board
+        new_board.won = self.won.copy()
+        new_board.history = self.history[:]
+        new_board.current_player = self.current_player
+        return new_board
+
+    def switch_player(self):
+        self.current_player = 'O' if self.current_player == 'X' else 'X'
@@ -0,0 +1,242 @@
+"""
+Ultimate AI Module
+Monte Carlo Tree Search player for ultimate tic-tac-toe
+
+The branching factor of the nested board (up to 81 moves) rules out a
+full-width minimax, so this player runs UCT with random playouts under a
+fixed wall-clock limit per move, like MCTSPlayer does on large boards.
+The search works on a flat copy of the position: 18 sub-board masks (9
+for X, then 9 for O) and a small state list, updated with the same
+512-entry line table as UltimateBoard. The subtree under the opponent's
+reply is reused for the next move.
+
+UltimateAI implements the player interface from players.py and reports
+playouts per second after each search.
+"""
+
+import math
+import random
+import time
+
+from ultimate import COORDS, FULL, LINE_WON, MASK_CELLS
+
+DEFAULT_TIME_LIMIT = 1.0
+DEFAULT_EXPLORATION = 1.41
+WIN_REWARD = 1.0
+DRAW_REWARD = 0.5
+# Playout results besides a player number
+DRAW = -1
+
+
+class Node:
+    __slots__ = ('move', 'parent', 'children', 'untried', 'visits', 'wins',
+                 'mover', 'winner')
+
+    def __init__(self, move, parent, mover, untried, winner=None):
+        self.move = move          # sub-board * 9 + cell played to reach this node
+        self.parent = parent
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.0           # reward total for `mover`
+        self.mover = mover        # 0 = X, 1 = O
+        self.winner = winner      # None, 0, 1 or DRAW for terminal nodes
+
+
+def _state(game_board):
+    """Flat search state of an UltimateBoard: (masks, [meta X, meta O, closed, next board])"""
+    masks = game_board.masks['X'] + game_board.masks['O']
+    state = [game_board.meta['X'], game_board.meta['O'], game_board.closed,
+             game_board.next_board]
+    return masks, state
+
+
+def _play(masks, state, move, player):
+    """Apply a move; returns the winner, DRAW, or None if the game goes on"""
+    b, c = divmod(move, 9)
+    index = player * 9 + b
+    mask = masks[index] | 1 << c
+    masks[index] = mask
+    closed = state[2]
+    if LINE_WON[mask]:
+        meta = state[player] | 1 << b
+        state[player] = meta
+        if LINE_WON[meta]:
+            return player
+        closed |= 1 << b
+    elif mask | masks[(player ^ 1) * 9 + b] == FULL:
+        closed |= 1 << b
+    state[2] = closed
+    if closed == FULL:
+        return DRAW
+    state[3] = -1 if closed >> c & 1 else c
+    return None
+
+
+def _legal(masks, state):
+    """Legal moves as sub-board * 9 + cell"""
+    next_board = state[3]
+    boards = (next_board,) if next_board >= 0 else MASK_CELLS[FULL & ~state[2]]
+    moves = []
+    for b in boards:
+        base = b * 9
+        moves.extend(base + c for c in MASK_CELLS[FULL & ~(masks[b] | masks[b + 9])])
+    return moves
+
+
+def _playout(masks, state, player, rng):
+    """Play randomly to the end; returns the winner or DRAW"""
+    random_float = rng.random
+    while True:
+        next_board = state[3]
+        if next_board >= 0:
+            cells = MASK_CELLS[FULL & ~(masks[next_board] | masks[next_board + 9])]
+            move = next_board * 9 + cells[int(random_float() * len(cells))]
+        else:
+            moves = _legal(masks, state)
+            move = moves[int(random_float() * len(moves))]
+        result = _play(masks, state, move, player)
+        if result is not None:
+            return result
+        player ^= 1
+
+
+class UltimateAI:
+    name = 'ultimate-mcts'
+
+    def __init__(self, player='O', opponent='X', time_limit=DEFAULT_TIME_LIMIT,
+                 playouts=None, exploration=DEFAULT_EXPLORATION, reuse_tree=True, seed=None):
+        self.player = player
+        self.opponent = opponent
+        self.time_limit = time_limit
+        self.playouts = playouts
+        self.exploration = exploration
+        self.reuse_tree = reuse_tree
+        self.rng = random.Random(seed)
+        self.stop_requested = False
+        # Tree kept from the previous move, with the position at its root
+        self.root = None
+        self.root_position = None
+        # Statistics of the last search
+        self.playouts_done = 0
+        self.playouts_per_sec = 0.0
+        self.nodes_searched = 0
+        self.tree_reused = False
+
+    def stop(self):
+        """Ask a search running on another thread to return its best move so far"""
+        self.stop_requested = True
+
+    def choose_move(self, game_board, time_budget=None):
+        """Player interface (see players.py): search for time_budget seconds,
+        or for time_limit if none is given"""
+        if time_budget is None:
+            return self.get_best_move(game_board)
+        time_limit = self.time_limit
+        self.time_limit = time_budget
+        try:
+            return self.get_best_move(game_board)
+        finally:
+            self.time_limit = time_limit
+
+    def get_best_move(self, game_board):
+        """Most visited move as 9x9 (row, col), or None if the game is over"""
+        self.stop_requested = False
+        if game_board.is_over():
+            return None
+        masks, state = _state(game_board)
+        to_move = 0 if self.player == 'X' else 1
+
+        root = self.find_root(masks, state)
+        self.tree_reused = root is not None
+        if root is None:
+            root = Node(None, None, to_move ^ 1, _legal(masks, state))
+
+        start = time.perf_counter()
+        deadline = None if self.time_limit is None else start + self.time_limit
+        self.playouts_done = self.grow(root, masks, state, deadline)
+        elapsed = time.perf_counter() - start
+        self.nodes_searched = self.playouts_done
+        self.playouts_per_sec = self.playouts_done / elapsed if elapsed > 0 else 0.0
+        if not root.children:
+            return None
+
+        best = max(root.children, key=lambda child: (child.visits, -child.move))
+        # Keep the subtree under our move for the next search
+        best.parent = None
+        self.root = best
+        self.root_position = (masks[:], state[:])
+        _play(self.root_position[0], self.root_position[1], best.move, to_move)
+        b, c = divmod(best.move, 9)
+        return COORDS[b][c]
+
+    def find_root(self, masks, state):
+        """The node for the current position if it follows from the kept tree
+        by one opponent move"""
+        if not self.reuse_tree or self.root is None:
+            return None
+        root_masks, root_state = self.root_position
+        for child in self.root.children:
+            child_masks, child_state = root_masks[:], root_state[:]
+            _play(child_masks, child_state, child.move, child.mover)
+            if child_masks == masks and child_state == state:
+                child.parent = None
+                return child
+        return None
+
+    def grow(self, root, root_masks, root_state, deadline):
+        """Run MCTS iterations until the deadline (None for no time limit);
+        returns the number of playouts"""
+        rng = self.rng
+        exploration = self.exploration
+        log = math.log
+        sqrt = math.sqrt
+        playouts = 0
+        while not self.stop_requested:
+            if self.playouts is not None and playouts >= self.playouts:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+            # Selection
+            node = root
+            masks = root_masks[:]
+            state = root_state[:]
+            while not node.untried and node.children:
+                log_visits = log(node.visits)
+                best = None
+                best_value = -1.0
+                for child in node.children:
+                    value = (child.wins / child.visits
+                             + exploration * sqrt(log_visits / child.visits))
+                    if value > best_value:
+                        best, best_value = child, value
+                node = best
+                _play(masks, state, node.move, node.mover)
+
+            # Expansion
+            if node.untried and node.winner is None:
+                move = node.untried.pop(int(rng.random() * len(node.untried)))
+                mover = node.mover ^ 1
+                winner = _play(masks, state, move, mover)
+                untried = [] if winner is not None else _legal(masks, state)
+                child = Node(move, node, mover, untried, winner)
+                node.children.append(child)
+                node = child
+
+            # Simulation
+            if node.winner is not None:
+                winner = node.winner
+            else:
+                winner = _playout(masks, state, node.mover ^ 1, rng)
+
+            # Backpropagation
+            while node is not None:
+                node.visits += 1
+                if winner == node.mover:
+                    node.wins += WIN_REWARD
+                elif winner == DRAW:
+                    node.wins += DRAW_REWARD
+                node = node.parent
+            playouts += 1
+        return playouts